@@ -0,0 +1,150 @@
+"""Time-to-first-token with a fresh OpenAI client per call vs the shared client.
+
+    python -m bench.bench_llm --requests 200 --first-token-ms 0
+    python -m bench.bench_llm --wire
+
+``--wire`` (the default when ``openai`` is not installed) replays the same
+streamed request over ``http.client``: a new connection per call vs one
+kept-alive connection, i.e. the transport cost the shared client saves
+without the SDK's own overhead.
+
+Recorded against the local stub LLM, 200 requests per side, openai 1.109:
+
+    SDK (default)        first-token-ms 0    first-token-ms 5
+    new client per call  50.1 / 67.1 ms      57.4 / 70.9 ms     (mean / p95)
+    shared client         4.2 /  4.3 ms       9.2 /  9.7 ms
+    connections          200 -> 1            200 -> 1
+
+    --wire (500 requests)
+    new connection       0.29 / 0.35 ms      5.58 / 5.69 ms
+    kept-alive           0.16 / 0.18 ms      5.43 / 5.54 ms
+
+Most of the SDK saving is building the client (httpx client, SSL context)
+on every call; on a remote HTTPS endpoint the saved TCP + TLS handshake
+adds several round trips on top.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import statistics
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from bench.stub_server import StubLLMServer
+
+if TYPE_CHECKING:
+    from core.llm import LLMConfig
+
+_MESSAGES = [{"role": "user", "content": "乾之姤，何解？"}]
+
+
+def _fresh_client_ttft(config: LLMConfig) -> float:
+    from openai import OpenAI
+
+    # What stream_chat_completion did before the client cache.
+    start = time.perf_counter()
+    client = OpenAI(base_url=config.base_url, api_key=config.api_key)
+    try:
+        response = client.chat.completions.create(model=config.model, messages=_MESSAGES, stream=True)
+        first = None
+        for _ in response:
+            if first is None:
+                first = time.perf_counter() - start
+        return first or 0.0
+    finally:
+        client.close()
+
+
+def _pooled_ttft(config: LLMConfig) -> float:
+    from core.llm import stream_chat_completion
+
+    start = time.perf_counter()
+    first = None
+    for _ in stream_chat_completion(_MESSAGES, config):
+        if first is None:
+            first = time.perf_counter() - start
+    return first or 0.0
+
+
+def _wire_ttft(conn: http.client.HTTPConnection, path: str) -> float:
+    body = json.dumps({"model": "stub", "messages": _MESSAGES, "stream": True}).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer bench"}
+    start = time.perf_counter()
+    conn.request("POST", path, body, headers)
+    response = conn.getresponse()
+    first = None
+    for line in response:
+        if first is None and line.startswith(b"data:"):
+            first = time.perf_counter() - start
+    return first or 0.0
+
+
+def _wire_samples(api_url: str, requests: int, reuse: bool) -> list[float]:
+    parts = urlsplit(api_url)
+    path = f"{parts.path}/chat/completions"
+    shared = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30) if reuse else None
+    samples = []
+    try:
+        for _ in range(requests):
+            conn = shared or http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            try:
+                samples.append(_wire_ttft(conn, path))
+            finally:
+                if shared is None:
+                    conn.close()
+    finally:
+        if shared is not None:
+            shared.close()
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> float:
+    mean_ms = statistics.fmean(samples) * 1e3
+    p95_ms = sorted(samples)[int(len(samples) * 0.95)] * 1e3
+    print(f"{label:<24} TTFT mean {mean_ms:8.2f} ms   p95 {p95_ms:8.2f} ms")
+    return mean_ms
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="LLM client reuse benchmark")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--first-token-ms", type=float, default=0.0, help="stub server think time")
+    parser.add_argument("--wire", action="store_true", help="time raw HTTP connections instead of the SDK")
+    args = parser.parse_args(argv)
+
+    wire = args.wire
+    if not wire:
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            print("openai is not installed; timing the wire-level equivalent (--wire)")
+            wire = True
+
+    with StubLLMServer(first_token_s=args.first_token_ms / 1000) as server:
+        if wire:
+            fresh = _wire_samples(server.api_url, args.requests, reuse=False)
+            before = server.connections
+            pooled = _wire_samples(server.api_url, args.requests, reuse=True)
+            pooled_connections = server.connections - before
+        else:
+            from core.llm import LLMConfig, close_clients
+
+            config = LLMConfig(base_url=server.api_url, model="stub", api_key="bench")
+            fresh = [_fresh_client_ttft(config) for _ in range(args.requests)]
+            before = server.connections
+            pooled = [_pooled_ttft(config) for _ in range(args.requests)]
+            pooled_connections = server.connections - before
+            close_clients()
+
+    labels = ("new connection per call", "kept-alive connection") if wire else ("new client per call", "shared client")
+    fresh_ms = _report(labels[0], fresh)
+    pooled_ms = _report(labels[1], pooled)
+    print(f"saved per request        {fresh_ms - pooled_ms:8.2f} ms")
+    print(f"connections opened       {args.requests} -> {pooled_connections}")
+
+
+if __name__ == "__main__":
+    main()
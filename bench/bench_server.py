@@ -0,0 +1,168 @@
+"""Load test of the HTTP casting service against local stub QRNG and LLM servers.
+
+    python -m bench.bench_server --clients 32 --requests 2000
+    python -m bench.bench_server --path "/casts?n=100" --concurrency 4 --max-queue 8
+    python -m bench.bench_server --path /interpret --token-ms 5
+
+Each client thread keeps one keep-alive connection and reports latency
+percentiles and status counts (503 = shed by backpressure). For
+/interpret a distinct question is sent per request so the answer cache
+does not short-circuit the stub LLM.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http.client
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from urllib.parse import quote, urlsplit
+
+from bench.stub_server import StubLLMServer, StubQRNGServer
+from config.settings import get_settings
+from core.qrng import QRNGProvider
+from ui.server import CastServer, llm_interpreter
+
+
+class ServerThread:
+    """Runs a CastServer on its own event loop in a background thread."""
+
+    def __init__(self, server: CastServer) -> None:
+        self.server = server
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="cast-server-loop", daemon=True)
+
+    def start(self) -> "ServerThread":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self._loop).result(5)
+        return self
+
+    def stop(self, grace_s: float = 5.0) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.shutdown(grace_s), self._loop).result(grace_s + 5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+
+    def __enter__(self) -> "ServerThread":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def _target(path: str, i: int) -> str:
+    if urlsplit(path).path.rstrip("/") == "/interpret" and "question=" not in path:
+        sep = "&" if "?" in path else "?"
+        return f"{path}{sep}question={quote(f'问事{i}')}"
+    return path
+
+
+def run_load(base_url: str, path: str, requests: int, clients: int) -> dict:
+    """Fire ``requests`` GETs at ``path`` from ``clients`` threads; return a summary."""
+    parts = urlsplit(base_url)
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+
+    def client() -> None:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", _target(path, i))
+                    response = conn.getresponse()
+                    response.read()
+                    status = response.status
+                    if response.will_close:
+                        conn.close()
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    status = 0
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] += 1
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(client) for _ in range(clients)]:
+            future.result()
+    seconds = time.perf_counter() - start
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1e3 if ordered else 0.0
+
+    return {
+        "requests": len(latencies),
+        "seconds": seconds,
+        "rps": len(latencies) / seconds if seconds else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1e3 if ordered else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "status": dict(statuses),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="HTTP casting service load test")
+    parser.add_argument("--path", default="/cast", help="endpoint to load, e.g. /cast, '/casts?n=100', /interpret")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--qrng-ms", type=float, default=0.0, help="stub QRNG latency")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="stub LLM delay between tokens")
+    args = parser.parse_args(argv)
+
+    with StubQRNGServer() as qrng, StubLLMServer(chunk_chars=4, token_interval_s=args.token_ms / 1000) as llm:
+        qrng.configure("lfdr", latency_s=args.qrng_ms / 1000)
+        settings = replace(
+            get_settings(),
+            lfdr_url=f"{qrng.base_url}/lfdr",
+            backends=("lfdr",),
+            allow_fallback=False,
+            llm_base_url=llm.api_url,
+            llm_model="stub",
+            llm_api_key="bench",
+        )
+        try:
+            interpret = llm_interpreter(settings)
+        except ImportError as exc:
+            print(f"/interpret disabled: {exc}")
+            interpret = None
+        provider = QRNGProvider(settings)
+        server = CastServer(
+            provider, interpret, port=0, concurrency=args.concurrency, max_queue=args.max_queue
+        )
+        try:
+            with ServerThread(server):
+                result = run_load(server.base_url, args.path, args.requests, args.clients)
+                stats = server.stats()
+        finally:
+            provider.close()
+
+    print(f"{args.path}: {result['requests']} requests in {result['seconds']:.2f}s ({result['rps']:.0f} req/s)")
+    print(
+        f"latency mean {result['mean_ms']:.2f} ms  p50 {result['p50_ms']:.2f}  "
+        f"p95 {result['p95_ms']:.2f}  p99 {result['p99_ms']:.2f}"
+    )
+    print(f"status {result['status']}  server rejected {stats.rejected}  errors {stats.errors}")
+    print(f"QRNG connections {qrng.connections}  LLM connections {llm.connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-request latency of pooled keep-alive HTTP vs one connection per request.
+
+    python -m bench.bench_transport --requests 500
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from dataclasses import replace
+from urllib.request import urlopen
+
+from bench.stub_server import StubQRNGServer
+from config.settings import get_settings
+from core.qrng import LfdrClient
+from core.transport import HTTPTransport
+
+
+def _time_calls(fn, count: int) -> list[float]:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> float:
+    mean_us = statistics.fmean(samples) * 1e6
+    p95_us = sorted(samples)[int(len(samples) * 0.95)] * 1e6
+    print(f"{label:<22} mean {mean_us:8.1f} us   p95 {p95_us:8.1f} us")
+    return mean_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="QRNG transport benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    with StubQRNGServer() as server:
+        url = f"{server.base_url}/lfdr?length=2&format=HEX"
+        settings = replace(get_settings(), lfdr_url=f"{server.base_url}/lfdr")
+
+        fresh = _time_calls(lambda: urlopen(url, timeout=5).read(), args.requests)
+        before = server.connections
+        transport = HTTPTransport()
+        client = LfdrClient(settings, transport=transport)
+        pooled = _time_calls(lambda: client.get_bytes(2), args.requests)
+        pooled_connections = server.connections - before
+        transport.close()
+
+    fresh_us = _report("urlopen (new conn)", fresh)
+    pooled_us = _report("pooled keep-alive", pooled)
+    print(f"saved per request      {fresh_us - pooled_us:8.1f} us")
+    print(f"connections opened     {args.requests} -> {pooled_connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import TypeVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass
+class StubBehavior:
+    """Injected latency and failures for one stub backend.
+
+    ``error_mode`` is ``"status"`` (HTTP 503) or ``"json"`` (malformed body).
+    """
+
+    latency_s: float = 0.0
+    error_rate: float = 0.0
+    error_mode: str = "status"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "StubQRNGServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count_connection()
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        length = int(query.get("length", ["1"])[0])
+        backend = parts.path.strip("/").split("/")[0]
+        if backend not in self.server.behavior:
+            self.send_error(404)
+            return
+        behavior = self.server.behavior[backend]
+        if behavior.latency_s:
+            time.sleep(behavior.latency_s)
+        fail = self.server.roll(behavior.error_rate)
+        if fail and behavior.error_mode == "status":
+            self.send_error(503)
+            return
+
+        data = os.urandom(length)
+        if backend == "lfdr":
+            body = {"length": length, "qrn": data.hex()}
+        else:
+            body = {"success": True, "type": "uint8", "length": length, "data": list(data)}
+        payload = b"{not json" if fail else json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+_S = TypeVar("_S", bound="_StubServer")
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, handler: type[BaseHTTPRequestHandler]) -> None:
+        super().__init__((host, port), handler)
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def start(self: _S) -> _S:
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self: _S) -> _S:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+class StubQRNGServer(_StubServer):
+    """Local server speaking the LFDR (``/lfdr``) and ANU (``/anu``) JSON formats."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, seed: int | None = None) -> None:
+        super().__init__(host, port, _Handler)
+        self.behavior = {"lfdr": StubBehavior(), "anu": StubBehavior()}
+        self._random = random.Random(seed)
+
+    def configure(self, backend: str, **changes: object) -> None:
+        for name, value in changes.items():
+            setattr(self.behavior[backend], name, value)
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < probability
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "StubLLMServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count_connection()
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+        self.server.record(body)
+        model = body.get("model", "stub")
+        pieces = self.server.pieces()
+        if self.server.first_token_s:
+            time.sleep(self.server.first_token_s)
+        if not body.get("stream"):
+            self._send_json(
+                {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(pieces)},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, piece in enumerate(pieces):
+            if i and self.server.token_interval_s:
+                time.sleep(self.server.token_interval_s)
+            self._send_event(_completion_chunk(model, {"content": piece}, None))
+        self._send_event(_completion_chunk(model, {}, "stop"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_json(self, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_event(self, body: dict) -> None:
+        self._send_chunk(b"data: " + json.dumps(body, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+    def _send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def _completion_chunk(model: str, delta: dict, finish_reason: str | None) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+class StubLLMServer(_StubServer):
+    """Local OpenAI-compatible ``/v1/chat/completions`` endpoint (streaming and not).
+
+    Replies with ``reply`` split into ``chunk_chars``-sized deltas, after
+    ``first_token_s`` and with ``token_interval_s`` between deltas.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        reply: str = "卦象已明，动爻示变。",
+        chunk_chars: int = 2,
+        first_token_s: float = 0.0,
+        token_interval_s: float = 0.0,
+    ) -> None:
+        super().__init__(host, port, _LLMHandler)
+        self.reply = reply
+        self.chunk_chars = max(1, chunk_chars)
+        self.first_token_s = first_token_s
+        self.token_interval_s = token_interval_s
+        self.requests: list[dict] = []
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/v1"
+
+    def pieces(self) -> list[str]:
+        return [self.reply[i:i + self.chunk_chars] for i in range(0, len(self.reply), self.chunk_chars)]
+
+    def record(self, body: dict) -> None:
+        with self._lock:
+            self.requests.append(body)
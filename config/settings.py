@@ -1,11 +1,28 @@
 from __future__ import annotations
 
 import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+ENV_PATH = REPO_ROOT / ".env"
+
+# Values this module put into os.environ from the .env file, so that an
+# edited file can replace them without clobbering the real environment.
+_from_env_file: dict[str, str] = {}
+# Every variable read while building Settings; their current values decide
+# whether the cached object is still valid.
+_read_keys: set[str] = set()
+_cache_lock = threading.Lock()
+_cached: tuple[tuple, Settings] | None = None
+
 
 def _load_env_file(path: Path) -> None:
+    for key, value in list(_from_env_file.items()):
+        if os.environ.get(key) == value:
+            del os.environ[key]
+    _from_env_file.clear()
     if not path.exists():
         return
     for line in path.read_text(encoding="utf-8").splitlines():
@@ -15,7 +32,22 @@ def _load_env_file(path: Path) -> None:
         key, value = line.split("=", 1)
         key = key.strip()
         value = value.strip().strip('"').strip("'")
-        os.environ.setdefault(key, value)
+        if key not in os.environ:
+            os.environ[key] = value
+            _from_env_file[key] = value
+
+
+def _file_stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _getenv(name: str, default: str | None = None) -> str | None:
+    _read_keys.add(name)
+    return os.environ.get(name, default)
 
 
 @dataclass(frozen=True)
@@ -28,20 +60,125 @@ class Settings:
     llm_base_url: str
     llm_model: str
     llm_api_key: str | None
+    pool_size: int = 0
+    pool_block_size: int = 1024
+    pool_low_watermark: int | None = None
+    pool_high_watermark: int | None = None
+    hedge: bool = False
+    hedge_delay_s: float | None = None
+    breaker_failures: int = 3
+    breaker_cooldown_s: float = 30.0
+    max_in_flight: int = 8
+    backends: tuple[str, ...] = ("lfdr", "anu")
+    entropy_file: str | None = None
+    record_file: str | None = None
+    spool_dir: str | None = None
+    spool_target: int = 4096
+    spool_max: int = 1 << 20
+    history_capacity: int = 4096
+    health_tests: bool = True
+    health_min_entropy: float = 4.0
+    llm_cache_size: int = 512
+    llm_cache_ttl_s: float = 7 * 86400.0
+    llm_cache_path: str | None = None
+    baseline_path: str | None = None
+    llm_context_budget: int = 3000
+    session_entropy_rate: float = 1.0
+    session_entropy_burst: int = 32
+    session_llm_rate: float = 0.2
+    session_llm_burst: int = 5
+    llm_max_concurrency: int = 8
+    prefetch: bool = True
+    llm_speculative: bool = False
+    llm_speculative_timeout_s: float = 60.0
+    ui_debug: bool = False
+
+
+def _optional_int(name: str) -> int | None:
+    value = _getenv(name, "").strip()
+    return int(value) if value else None
+
+
+def _optional_float(name: str) -> float | None:
+    value = _getenv(name, "").strip()
+    return float(value) if value else None
+
+
+def _flag(name: str, default: str = "false") -> bool:
+    return _getenv(name, default).lower() in {"1", "true", "yes", "on"}
 
 
 def get_settings() -> Settings:
-    repo_root = Path(__file__).resolve().parents[1]
-    _load_env_file(repo_root / ".env")
+    """Return the current settings, parsed once and shared between callers.
+
+    The same frozen object is returned until the .env file changes (mtime or
+    size) or one of the environment variables it was built from does; call
+    ``reload_settings`` to force a re-read.
+    """
+    global _cached
+    stamp = _file_stamp(ENV_PATH)
+    with _cache_lock:
+        if _cached is not None and _cached[0] == (stamp, _env_snapshot()):
+            return _cached[1]
+        _load_env_file(ENV_PATH)
+        settings = _build_settings()
+        _cached = ((stamp, _env_snapshot()), settings)
+        return settings
+
+
+def reload_settings() -> Settings:
+    global _cached
+    with _cache_lock:
+        _cached = None
+    return get_settings()
+
+
+def _env_snapshot() -> tuple[tuple[str, str | None], ...]:
+    return tuple((key, os.environ.get(key)) for key in sorted(_read_keys))
+
 
+def _build_settings() -> Settings:
     return Settings(
-        lfdr_url=os.getenv("LFDR_URL", "https://lfdr.de/qrng_api/qrng"),
-        anu_url=os.getenv("ANU_URL", "https://api.quantumnumbers.anu.edu.au"),
-        anu_key=os.getenv("ANU_API_KEY"),
-        timeout_s=float(os.getenv("QRNG_TIMEOUT_S", "8")),
-        allow_fallback=os.getenv("QRNG_ALLOW_FALLBACK", "false").lower()
-        in {"1", "true", "yes", "on"},
-        llm_base_url=os.getenv("LLM_BASE_URL", "https://api.siliconflow.cn/v1"),
-        llm_model=os.getenv("LLM_MODEL", "deepseek-ai/DeepSeek-V3.2"),
-        llm_api_key=os.getenv("LLM_API_KEY"),
+        lfdr_url=_getenv("LFDR_URL", "https://lfdr.de/qrng_api/qrng"),
+        anu_url=_getenv("ANU_URL", "https://api.quantumnumbers.anu.edu.au"),
+        anu_key=_getenv("ANU_API_KEY"),
+        timeout_s=float(_getenv("QRNG_TIMEOUT_S", "8")),
+        allow_fallback=_flag("QRNG_ALLOW_FALLBACK"),
+        llm_base_url=_getenv("LLM_BASE_URL", "https://api.siliconflow.cn/v1"),
+        llm_model=_getenv("LLM_MODEL", "deepseek-ai/DeepSeek-V3.2"),
+        llm_api_key=_getenv("LLM_API_KEY"),
+        pool_size=int(_getenv("QRNG_POOL_SIZE", "0")),
+        pool_block_size=int(_getenv("QRNG_POOL_BLOCK", "1024")),
+        pool_low_watermark=_optional_int("QRNG_POOL_LOW"),
+        pool_high_watermark=_optional_int("QRNG_POOL_HIGH"),
+        hedge=_flag("QRNG_HEDGE"),
+        hedge_delay_s=_optional_float("QRNG_HEDGE_DELAY_S"),
+        breaker_failures=int(_getenv("QRNG_BREAKER_FAILURES", "3")),
+        breaker_cooldown_s=float(_getenv("QRNG_BREAKER_COOLDOWN_S", "30")),
+        max_in_flight=int(_getenv("QRNG_MAX_IN_FLIGHT", "8")),
+        backends=tuple(
+            name.strip() for name in _getenv("QRNG_BACKENDS", "lfdr,anu").split(",") if name.strip()
+        ),
+        entropy_file=_getenv("QRNG_ENTROPY_FILE") or None,
+        record_file=_getenv("QRNG_RECORD_FILE") or None,
+        spool_dir=_getenv("QRNG_SPOOL_DIR") or None,
+        spool_target=int(_getenv("QRNG_SPOOL_TARGET", "4096")),
+        spool_max=int(_getenv("QRNG_SPOOL_MAX", str(1 << 20))),
+        history_capacity=int(_getenv("QRNG_HISTORY_CAPACITY", "4096")),
+        health_tests=_flag("QRNG_HEALTH_TESTS", "true"),
+        health_min_entropy=float(_getenv("QRNG_HEALTH_MIN_ENTROPY", "4")),
+        llm_cache_size=int(_getenv("LLM_CACHE_SIZE", "512")),
+        llm_cache_ttl_s=float(_getenv("LLM_CACHE_TTL_S", str(7 * 86400))),
+        llm_cache_path=_getenv("LLM_CACHE_PATH") or None,
+        baseline_path=_getenv("LLM_BASELINE_PATH") or str(REPO_ROOT / "prompts" / "baseline.bin"),
+        llm_context_budget=int(_getenv("LLM_CONTEXT_BUDGET", "3000")),
+        session_entropy_rate=float(_getenv("QRNG_SESSION_RATE", "1")),
+        session_entropy_burst=int(_getenv("QRNG_SESSION_BURST", "32")),
+        session_llm_rate=float(_getenv("LLM_SESSION_RATE", "0.2")),
+        session_llm_burst=int(_getenv("LLM_SESSION_BURST", "5")),
+        llm_max_concurrency=int(_getenv("LLM_MAX_CONCURRENCY", "8")),
+        prefetch=_flag("QRNG_PREFETCH", "true"),
+        llm_speculative=_flag("LLM_SPECULATIVE"),
+        llm_speculative_timeout_s=float(_getenv("LLM_SPECULATIVE_TIMEOUT_S", "60")),
+        ui_debug=_flag("UI_DEBUG"),
     )
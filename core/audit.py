@@ -0,0 +1,362 @@
+"""Offline fairness audit over recorded entropy or cast logs.
+
+    python -m core.audit session.bin               # entropy file (+ .idx)
+    python -m core.audit casts.npy --workers 8     # cast log, process pool
+    python -m core.audit spool/seg-*.bin --out audit.json
+
+Entropy files (QRNG_RECORD_FILE recordings, spool segments, raw dumps) are
+decoded with core.casting, i.e. the production code path, per source run.
+Cast logs are ``.npy`` arrays with ``base``/``moving_line`` (and optional
+``source``) fields, or an ``(n, 2)`` uint8 array of (base, moving line), or
+Parquet files with those columns (needs pyarrow). Input is processed in
+bounded chunks; each chunk only contributes 384 (hexagram, line) counts per
+source, from which the hexagram and line marginals are derived.
+
+Every distribution gets a chi-square goodness-of-fit test against uniform
+and a KS test over the category order (conservative for discrete data).
+The exit status is 1 if any test's p-value is below ``--alpha``, or if the
+entropy cannot be decoded into casts at all (e.g. a stuck source whose
+bytes never satisfy the moving-line roller).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import mmap
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from core.casting import CAST_BYTES, BitReader, _decode_cast, _NeedMoreBytes, _ReplaySource, cast_many
+from core.entropy_file import INDEX_RECORD, SOURCES, index_path
+
+PAIRS = 64 * 6
+DEFAULT_CHUNK_BYTES = 8 << 20
+DEFAULT_CHUNK_ROWS = 4 << 20
+# A healthy stream leaves at most a partial cast undecoded at the end of a
+# chunk; a cast needing more than this many bytes (p < 2^-50) means the
+# data is not random, and its bytes are reported as undecodable.
+MAX_TAIL_BYTES = 8
+
+# INDEX_RECORD ("<BQI") as a packed NumPy record, to read huge indexes in bulk.
+_INDEX_DTYPE = np.dtype(
+    {
+        "names": ["sid", "offset", "length"],
+        "formats": ["u1", "<u8", "<u4"],
+        "offsets": [0, 1, 9],
+        "itemsize": INDEX_RECORD.size,
+    }
+)
+
+# (kind, path, source, start, stop): a byte range of one source's entropy,
+# or a row range of a cast log.
+Chunk = tuple[str, str, str, int, int]
+Counts = dict[str, np.ndarray]
+
+
+@dataclass(frozen=True)
+class TestResult:
+    name: str
+    categories: int
+    chi_square: float
+    chi_square_p: float
+    ks: float
+    ks_p: float
+    min_expected: float
+
+
+@dataclass(frozen=True)
+class SourceReport:
+    source: str
+    casts: int
+    tests: list[TestResult]
+    undecoded_bytes: int = 0
+
+
+def chi2_sf(x: float, df: int) -> float:
+    """Upper tail of chi-square(df): the regularized gamma function Q(df/2, x/2)."""
+    if x <= 0:
+        return 1.0
+    a, z = df / 2.0, x / 2.0
+    log_prefix = a * math.log(z) - z - math.lgamma(a)
+    if z < a + 1:
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= z / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Continued fraction (modified Lentz).
+    tiny = 1e-300
+    b = z + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10_000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, math.exp(log_prefix) * h)
+
+
+def ks_sf(statistic: float, n: int) -> float:
+    """Asymptotic Kolmogorov survival function at sqrt(n) * D."""
+    lam = math.sqrt(n) * statistic
+    if lam < 0.2:
+        return 1.0
+    total = sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return min(1.0, max(0.0, 2 * total))
+
+
+def uniformity(name: str, counts: np.ndarray) -> TestResult:
+    n = int(counts.sum())
+    k = len(counts)
+    expected = n / k
+    if n == 0:
+        return TestResult(name, k, 0.0, 1.0, 0.0, 1.0, 0.0)
+    chi = float(((counts - expected) ** 2).sum() / expected)
+    ecdf = np.cumsum(counts) / n
+    d = float(np.abs(ecdf - np.arange(1, k + 1) / k).max())
+    return TestResult(name, k, chi, chi2_sf(chi, k - 1), d, ks_sf(d, n), expected)
+
+
+def report(source: str, pairs: np.ndarray, undecoded_bytes: int = 0) -> SourceReport:
+    grid = pairs.reshape(64, 6)
+    return SourceReport(
+        source=source,
+        casts=int(pairs.sum()),
+        tests=[
+            uniformity("hexagram", grid.sum(axis=1)),
+            uniformity("line", grid.sum(axis=0)),
+            uniformity("pair", pairs),
+        ],
+        undecoded_bytes=undecoded_bytes,
+    )
+
+
+def _pair_index(base: np.ndarray, moving_line: np.ndarray) -> np.ndarray:
+    base = np.asarray(base, dtype=np.int64)
+    moving_line = np.asarray(moving_line, dtype=np.int64)
+    if base.size and (base.min() < 0 or base.max() > 63 or moving_line.min() < 1 or moving_line.max() > 6):
+        raise ValueError("cast log has base outside 0..63 or moving_line outside 1..6")
+    return base * 6 + (moving_line - 1)
+
+
+def decode_entropy(data: bytes) -> tuple[np.ndarray, np.ndarray, int]:
+    """Decode ``data`` as one cast stream with cast_many / cast_hexagram.
+
+    Returns the base and moving-line columns and the number of trailing
+    bytes that did not complete a cast.
+    """
+    source = _ReplaySource(data)
+    batches = []
+    # cast_many asks for 2 bytes per cast (plus one for each rare irregular
+    # cast), so a third of the remaining bytes per call only runs dry on
+    # non-random data. Then the batch is dropped and decoded cast by cast.
+    while len(data) - source.offset >= 3 * 1024:
+        start = source.offset
+        try:
+            batch = cast_many(source, (len(data) - start) // 3)
+        except _NeedMoreBytes:
+            source.offset = start
+            break
+        batches.append((batch.base, batch.moving_line))
+    base, moving = [], []
+    while True:
+        start = source.offset
+        try:
+            result = _decode_cast(BitReader(source, prefetch=CAST_BYTES))
+        except _NeedMoreBytes:
+            break
+        base.append(result.base.to_int())
+        moving.append(result.moving_line)
+    batches.append((np.array(base, dtype=np.uint8), np.array(moving, dtype=np.uint8)))
+    return (
+        np.concatenate([b for b, _ in batches]),
+        np.concatenate([m for _, m in batches]),
+        len(data) - start,
+    )
+
+
+def _entropy_runs(path: Path) -> Iterator[tuple[str, int, int]]:
+    """Contiguous ``(source, start, stop)`` byte ranges, merging same-source runs."""
+    size = path.stat().st_size
+    idx = index_path(path)
+    if not idx.exists():
+        if size:
+            yield "UNKNOWN", 0, size
+        return
+    usable = idx.stat().st_size // INDEX_RECORD.size  # ignore a torn last record
+    if usable == 0:
+        return
+    records = np.memmap(idx, dtype=_INDEX_DTYPE, mode="r", shape=(usable,))
+    sid = np.asarray(records["sid"])
+    offset = np.asarray(records["offset"], dtype=np.int64)
+    end = offset + np.asarray(records["length"], dtype=np.int64)
+    breaks = np.flatnonzero((sid[1:] != sid[:-1]) | (offset[1:] != end[:-1])) + 1
+    for lo, hi in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(sid)]))):
+        stop = min(int(end[hi - 1]), size)  # data torn by a crash is not counted
+        if stop > offset[lo]:
+            yield SOURCES[sid[lo]] if sid[lo] < len(SOURCES) else "UNKNOWN", int(offset[lo]), stop
+
+
+def _cast_log_rows(path: Path) -> int:
+    return len(np.load(path, mmap_mode="r"))
+
+
+def plan(paths: Iterable[str], chunk_bytes: int = DEFAULT_CHUNK_BYTES, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> list[Chunk]:
+    chunks: list[Chunk] = []
+    for name in paths:
+        path = Path(name)
+        if path.suffix == ".npy":
+            rows = _cast_log_rows(path)
+            chunks += [("npy", name, "", lo, min(lo + chunk_rows, rows)) for lo in range(0, rows, chunk_rows)]
+        elif path.suffix == ".parquet":
+            chunks.append(("parquet", name, "", 0, 0))
+        else:
+            for source, start, stop in _entropy_runs(path):
+                # Each chunk is decoded as its own cast stream.
+                chunks += [
+                    ("entropy", name, source, lo, min(lo + chunk_bytes, stop))
+                    for lo in range(start, stop, chunk_bytes)
+                ]
+    return chunks
+
+
+def _count_columns(base: np.ndarray, moving_line: np.ndarray, source: np.ndarray | None) -> Counts:
+    pairs = _pair_index(base, moving_line)
+    if source is None:
+        return {"UNKNOWN": np.bincount(pairs, minlength=PAIRS)}
+    source = np.asarray(source)
+    if source.dtype.kind in "iu":
+        names: list[str] = list(SOURCES)
+        ids = np.where(source < len(SOURCES), source, 0).astype(np.int64)
+    else:
+        unique, ids = np.unique(source.astype(str), return_inverse=True)
+        names = [str(name) for name in unique]
+    grid = np.bincount(ids.reshape(-1) * PAIRS + pairs, minlength=len(names) * PAIRS)
+    grid = grid.reshape(len(names), PAIRS)
+    return {name: grid[i] for i, name in enumerate(names) if grid[i].any()}
+
+
+def _split_columns(table: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    if table.dtype.names:
+        source = table["source"] if "source" in table.dtype.names else None
+        return np.asarray(table["base"]), np.asarray(table["moving_line"]), source
+    if table.ndim == 2 and table.shape[1] == 2:
+        return np.asarray(table[:, 0]), np.asarray(table[:, 1]), None
+    raise ValueError("cast log must have base/moving_line fields or shape (n, 2)")
+
+
+def count_chunk(chunk: Chunk) -> tuple[Counts, dict[str, int]]:
+    """Pair counts per source, and undecodable entropy bytes per source."""
+    kind, name, source, start, stop = chunk
+    if kind == "entropy":
+        with open(name, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[start:stop]
+        base, moving, left = decode_entropy(data)
+        pairs = np.bincount(_pair_index(base, moving), minlength=PAIRS)
+        return {source: pairs}, {source: left if left > MAX_TAIL_BYTES else 0}
+    if kind == "npy":
+        return _count_columns(*_split_columns(np.load(name, mmap_mode="r")[start:stop])), {}
+    return _count_parquet(name), {}
+
+
+def _count_parquet(name: str) -> Counts:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise SystemExit("Parquet input needs pyarrow: pip install pyarrow") from exc
+    totals: Counts = {}
+    parquet = pq.ParquetFile(name)
+    columns = [c for c in ("base", "moving_line", "source") if c in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=DEFAULT_CHUNK_ROWS, columns=columns):
+        source = batch.column("source").to_numpy(zero_copy_only=False) if "source" in columns else None
+        counts = _count_columns(
+            batch.column("base").to_numpy(), batch.column("moving_line").to_numpy(), source
+        )
+        _merge(totals, counts)
+    return totals
+
+
+def _merge(totals: Counts, counts: Counts) -> None:
+    for source, pairs in counts.items():
+        if source in totals:
+            totals[source] += pairs
+        else:
+            totals[source] = pairs.copy()
+
+
+def audit(paths: Iterable[str], workers: int = 0, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> list[SourceReport]:
+    """Per-source reports, preceded by an ``ALL`` report over every cast."""
+    chunks = plan(paths, chunk_bytes=chunk_bytes)
+    totals: Counts = {}
+    undecoded: dict[str, int] = {}
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(count_chunk, chunks))
+    else:
+        results = [count_chunk(chunk) for chunk in chunks]
+    for counts, left in results:
+        _merge(totals, counts)
+        for source, n in left.items():
+            undecoded[source] = undecoded.get(source, 0) + n
+    overall = sum(totals.values(), np.zeros(PAIRS, dtype=np.int64))
+    reports = [report("ALL", overall, sum(undecoded.values()))]
+    if len(totals) > 1:
+        reports += [report(source, totals[source], undecoded.get(source, 0)) for source in sorted(totals)]
+    return reports
+
+
+def _print_reports(reports: list[SourceReport], alpha: float) -> None:
+    print(f"{'source':<10}{'casts':>14}  {'test':<10}{'chi2':>10}{'df':>5}{'p':>10}{'KS D':>10}{'p':>10}  status")
+    for rep in reports:
+        for i, t in enumerate(rep.tests):
+            status = "low n" if t.min_expected < 5 else "ok"
+            if min(t.chi_square_p, t.ks_p) < alpha:
+                status = "FAIL"
+            head = f"{rep.source:<10}{rep.casts:>14}" if i == 0 else " " * 24
+            print(
+                f"{head}  {t.name:<10}{t.chi_square:>10.1f}{t.categories - 1:>5}{t.chi_square_p:>10.4f}"
+                f"{t.ks:>10.5f}{t.ks_p:>10.4f}  {status}"
+            )
+    for rep in reports:
+        if rep.undecoded_bytes:
+            print(f"{rep.source}: {rep.undecoded_bytes} bytes could not be decoded into casts (stuck source?)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Q-Oracle cast distribution audit")
+    parser.add_argument("paths", nargs="+", help="entropy files, .npy or .parquet cast logs")
+    parser.add_argument("--workers", type=int, default=0, help="process pool size (0 = in-process)")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / (1 << 20), help="entropy bytes per chunk")
+    parser.add_argument("--alpha", type=float, default=1e-3, help="flag tests with p below this")
+    parser.add_argument("--out", help="write the reports as JSON to this path")
+    args = parser.parse_args(argv)
+
+    reports = audit(args.paths, workers=args.workers, chunk_bytes=max(CAST_BYTES, int(args.chunk_mb * (1 << 20))))
+    _print_reports(reports, args.alpha)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump([asdict(r) for r in reports], fh, indent=2)
+    failed = any(min(t.chi_square_p, t.ks_p) < args.alpha for r in reports for t in r.tests)
+    undecodable = reports[0].undecoded_bytes > 0 or reports[0].casts == 0
+    return 1 if failed or undecodable else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
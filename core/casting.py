@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
 
 from core.hexagrams import Hexagram
 from core.qrng import QRNGProvider
+from core.qrng_async import AsyncQRNGProvider
 
 
 @dataclass(frozen=True)
@@ -13,41 +19,297 @@ class CastingResult:
     moving_line: int  # 1..6, bottom -> top
 
 
-def _rand_int(provider: QRNGProvider, max_inclusive: int) -> int:
-    if max_inclusive < 0 or max_inclusive > 255:
-        raise ValueError("max_inclusive must be between 0 and 255")
-    span = max_inclusive + 1
-    limit = (256 // span) * span
+# 6 line bits + the moving line (Fast Dice Roller over 1..6) fit in 2 bytes
+# unless the roller rejects four times in a row (p = 1/256).
+CAST_BYTES = 2
+
+
+class BitReader:
+    """Hands out exact bit counts from a provider's byte stream, LSB first.
+
+    The first fetch pulls ``prefetch`` bytes in one call; later refills pull
+    one byte at a time, so no bits are discarded between draws.
+    """
+
+    def __init__(self, provider: QRNGProvider, prefetch: int = 1) -> None:
+        self._provider = provider
+        self._next_fetch = max(1, prefetch)
+        self._buffer = 0
+        self._available = 0
+
+    def read_bit(self) -> int:
+        if self._available == 0:
+            data = self._provider.get_bytes(self._next_fetch)
+            self._buffer = int.from_bytes(data, "little")
+            self._available = 8 * len(data)
+            self._next_fetch = 1
+        bit = self._buffer & 1
+        self._buffer >>= 1
+        self._available -= 1
+        return bit
+
+    def read_bits(self, count: int) -> list[int]:
+        return [self.read_bit() for _ in range(count)]
+
+    def randbelow(self, n: int) -> int:
+        """Uniform integer in [0, n) via Lumbroso's Fast Dice Roller."""
+        if n < 1:
+            raise ValueError("n must be >= 1")
+        v, c = 1, 0
+        while True:
+            v <<= 1
+            c = (c << 1) | self.read_bit()
+            if v >= n:
+                if c < n:
+                    return c
+                v -= n
+                c -= n
+
+
+class _NeedMoreBytes(Exception):
+    pass
+
+
+class _ReplaySource:
+    """Serves a fixed byte string, then defers to ``then`` (if any).
+
+    Without ``then`` it raises _NeedMoreBytes once the data runs out.
+    """
+
+    def __init__(self, data: bytes, then: QRNGProvider | None = None) -> None:
+        self._data = data
+        self._then = then
+        self.offset = 0
+
+    def get_bytes(self, length: int) -> bytes:
+        end = self.offset + length
+        if end > len(self._data):
+            if self._then is None:
+                raise _NeedMoreBytes
+            head = self._data[self.offset:]
+            # Only the bytes not fetched by an earlier overflow read.
+            fresh = self._then.get_bytes(end - max(self.offset, len(self._data)))
+            self.offset = end
+            return head + fresh
+        out = self._data[self.offset:end]
+        self.offset = end
+        return out
+
+
+def _decode_cast(reader: BitReader) -> CastingResult:
+    index = 0
+    for line in range(6):
+        index |= reader.read_bit() << line
+    base = Hexagram.from_int(index)
+
+    moving_line = reader.randbelow(6) + 1  # 1..6
+    changed = base.changed(moving_line)
+
+    return CastingResult(base=base, changed=changed, moving_line=moving_line)
+
+
+def cast_hexagram(provider: QRNGProvider | None = None, reserved: bytes = b"") -> CastingResult:
+    """Cast one hexagram; ``reserved`` bytes (fetched ahead) are read first."""
+    provider = provider or QRNGProvider()
+    if reserved:
+        provider = _ReplaySource(reserved, then=provider)
+    return _decode_cast(BitReader(provider, prefetch=max(CAST_BYTES, len(reserved))))
+
+
+async def cast_hexagram_async(
+    provider: AsyncQRNGProvider | None = None,
+    deadline_s: float | None = None,
+) -> CastingResult:
+    """Async cast_hexagram; consumes the byte stream exactly like the sync one."""
+    if provider is None:
+        provider = AsyncQRNGProvider()
+        try:
+            return await cast_hexagram_async(provider, deadline_s)
+        finally:
+            await provider.aclose()
+    data = await provider.get_bytes(CAST_BYTES, deadline_s)
     while True:
-        value = provider.get_bytes(1)[0]
-        if value < limit:
-            return value % span
-
-
-def _rand_bits(provider: QRNGProvider, count: int) -> list[int]:
-    if count < 1:
-        return []
-    byte_len = (count + 7) // 8
-    raw = provider.get_bytes(byte_len)
-    bits: list[int] = []
-    for b in raw:
-        for i in range(8):
-            bits.append((b >> i) & 1)
-            if len(bits) == count:
-                return bits
-    return bits
-
-
-def cast_hexagram(provider: QRNGProvider | None = None) -> CastingResult:
+        try:
+            return _decode_cast(BitReader(_ReplaySource(data), prefetch=len(data)))
+        except _NeedMoreBytes:
+            data += await provider.get_bytes(1, deadline_s)
+
+
+@dataclass(frozen=True)
+class CastBatch:
+    """Columnar cast results; indexing materializes CastingResult lazily."""
+
+    base: np.ndarray  # uint8 hexagram index (bit i = line i + 1)
+    moving_line: np.ndarray  # uint8, 1..6
+    changed: np.ndarray  # uint8 hexagram index
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def __getitem__(self, i: int) -> CastingResult:
+        return CastingResult(
+            base=Hexagram.from_int(int(self.base[i])),
+            changed=Hexagram.from_int(int(self.changed[i])),
+            moving_line=int(self.moving_line[i]),
+        )
+
+    def __iter__(self) -> Iterator[CastingResult]:
+        return (self[i] for i in range(len(self)))
+
+
+def _fdr6_block(buf: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized cast decode for a cast starting at every offset of ``buf``.
+
+    Returns ``(moving_index, regular)``: the Fast Dice Roller result (0..5)
+    for a cast that fits in its 2 bytes, and whether it did. The 10 bits
+    after the 6 line bits allow four roller attempts; an irregular cast
+    (p = 1/256) needs more bytes and is decoded by the scalar path.
+    """
+    b0 = buf[:-1]
+    b1 = buf[1:]
+    r = [(b0 >> 6) & 1, (b0 >> 7) & 1] + [(b1 >> i) & 1 for i in range(8)]
+    c = (r[0] << 2) | (r[1] << 1) | r[2]
+    moving = c.copy()
+    regular = c < 6
+    for first in (3, 5, 7):
+        c = ((c - 6) << 2) | (r[first] << 1) | r[first + 1]
+        fresh = ~regular & (c < 6)
+        moving[fresh] = c[fresh]
+        regular |= fresh
+    return moving, regular
+
+
+def _decode_block(
+    buf: np.ndarray,
+    out_base: np.ndarray,
+    out_moving: np.ndarray,
+    provider: QRNGProvider,
+) -> tuple[int, int]:
+    """Decode up to ``len(out_base)`` casts from ``buf``; return (casts, bytes used)."""
+    size = len(buf)
+    limit = len(out_base)
+    if size < CAST_BYTES or limit == 0:
+        return 0, 0
+    moving, regular = _fdr6_block(buf)
+    irregular = np.flatnonzero(~regular)
+    by_parity = (irregular[irregular % 2 == 0], irregular[irregular % 2 == 1])
+
+    count = 0
+    start = 0
+    while count < limit and start + CAST_BYTES <= size:
+        stops = by_parity[start & 1]
+        k = int(np.searchsorted(stops, start))
+        stop = int(stops[k]) if k < len(stops) else size
+        run = min((stop - start) // 2, limit - count, (size - start) // 2)
+        end = start + 2 * run
+        out_base[count:count + run] = buf[start:end:2] & 0x3F
+        out_moving[count:count + run] = moving[start:end:2] + 1
+        count += run
+        start = end
+        if count >= limit or start != stop or start + CAST_BYTES > size:
+            continue
+        # Irregular cast: replay it through the scalar reader, pulling any
+        # bytes past the buffer from the provider as cast_hexagram would.
+        source = _ReplaySource(buf[start:].tobytes(), then=provider)
+        result = _decode_cast(BitReader(source, prefetch=CAST_BYTES))
+        out_base[count] = result.base.to_int()
+        out_moving[count] = result.moving_line
+        count += 1
+        start += source.offset
+    return count, min(start, size)
+
+
+def cast_many(provider: QRNGProvider | None, n: int) -> CastBatch:
+    """Cast ``n`` hexagrams from one bulk fetch, decoded with NumPy.
+
+    The output is identical to ``n`` sequential cast_hexagram calls over the
+    same byte stream, and no byte beyond what those calls would read is
+    taken from the provider.
+    """
+    if n < 0:
+        raise ValueError("n must be >= 0")
     provider = provider or QRNGProvider()
+    base = np.empty(n, dtype=np.uint8)
+    moving = np.empty(n, dtype=np.uint8)
+    buf = np.empty(0, dtype=np.uint8)
+    done = 0
+    while done < n:
+        need = CAST_BYTES * (n - done)
+        if len(buf) < need:
+            fresh = np.frombuffer(provider.get_bytes(need - len(buf)), dtype=np.uint8)
+            buf = np.concatenate([buf, fresh]) if len(buf) else fresh
+        count, used = _decode_block(buf, base[done:], moving[done:], provider)
+        done += count
+        buf = buf[used:]
+    changed = base ^ (np.uint8(1) << (moving - 1))
+    return CastBatch(base=base, moving_line=moving, changed=changed)
 
-    bits = _rand_bits(provider, 6)
-    base = Hexagram(bits=tuple(bits))
 
-    moving_line = _rand_int(provider, 5) + 1  # 1..6
-    changed_bits = list(base.bits)
-    idx = moving_line - 1
-    changed_bits[idx] = 1 - changed_bits[idx]
-    changed = Hexagram(bits=tuple(changed_bits))
+class _PipelinedSource:
+    """Reads a provider in ``block_size`` blocks with ``depth`` requests in flight.
 
-    return CastingResult(base=base, changed=changed, moving_line=moving_line)
+    Blocks are requested on worker threads ahead of the caller, which keeps
+    decoding the current one, and are consumed in request order. Prefetching
+    stops once ``budget`` bytes have been requested and anything needed past
+    that is fetched on demand, so no more than the casts use is read.
+    """
+
+    def __init__(self, provider: QRNGProvider, block_size: int, budget: int, depth: int = 4) -> None:
+        self._provider = provider
+        self._block_size = max(1, block_size)
+        self._depth = max(1, depth)
+        self._budget = budget
+        self._requested = 0
+        self._buffer = b""
+        self._executor = ThreadPoolExecutor(max_workers=self._depth, thread_name_prefix="qrng-bulk")
+        self._pending: deque[Future] = deque()
+        self._fill()
+
+    def _fill(self) -> None:
+        while len(self._pending) < self._depth and self._requested < self._budget:
+            size = min(self._block_size, self._budget - self._requested)
+            self._requested += size
+            self._pending.append(self._executor.submit(self._provider.get_bytes, size))
+
+    def get_bytes(self, length: int) -> bytes:
+        while len(self._buffer) < length and self._pending:
+            block = self._pending.popleft().result()
+            self._fill()
+            self._buffer = self._buffer + block if self._buffer else block
+        if len(self._buffer) < length:
+            self._buffer += self._provider.get_bytes(length - len(self._buffer))
+        out, self._buffer = self._buffer[:length], self._buffer[length:]
+        return out
+
+    def close(self) -> None:
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+
+def cast_stream(
+    provider: QRNGProvider | None,
+    count: int,
+    block_size: int = 1024,
+    depth: int = 4,
+) -> Iterator[CastBatch]:
+    """Yield ``count`` casts as CastBatch chunks, one entropy block at a time.
+
+    Up to ``depth`` blocks are fetched ahead while the current one is
+    decoded, so memory stays bounded and the network overlaps the decode.
+    With ``depth=1`` an ordered source (e.g. a replay file) gives the same
+    casts as ``cast_many(provider, count)``; with more, concurrent requests
+    may be served in any order.
+    """
+    if count < 0:
+        raise ValueError("count must be >= 0")
+    batch = max(1, block_size // CAST_BYTES)
+    source = _PipelinedSource(provider or QRNGProvider(), block_size, CAST_BYTES * count, depth)
+    try:
+        done = 0
+        while done < count:
+            n = min(batch, count - done)
+            yield cast_many(source, n)
+            done += n
+    finally:
+        source.close()
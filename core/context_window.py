@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+Message = dict[str, str]
+# (previous summary, turns to fold in) -> new summary
+Summarize = Callable[[str, list[Message]], str]
+
+# Per-message framing overhead (role, separators) in the token estimate.
+_MESSAGE_OVERHEAD = 4
+SUMMARY_PREFIX = "此前对话摘要："
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _background() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-compact")
+        return _executor
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per ~4 other characters."""
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message["content"]) + _MESSAGE_OVERHEAD
+
+
+class ConversationWindow:
+    """Token-budgeted view of a chat for the model.
+
+    ``view`` keeps the first ``pinned`` messages (the seed prompt), a rolling
+    summary of older turns and as many recent turns as fit in
+    ``budget_tokens``. Turns that fall out of the window are folded into the
+    summary by ``summarize`` on a background thread; until that finishes they
+    are simply left out, so a request never waits on compaction. The caller
+    keeps the full history; the window only remembers how far the summary
+    reaches.
+    """
+
+    def __init__(self, budget_tokens: int, summarize: Summarize | None = None, pinned: int = 1) -> None:
+        self.budget_tokens = budget_tokens
+        self.pinned = pinned
+        self._summarize = summarize
+        self._lock = threading.Lock()
+        self._summary = ""
+        self._summarized = 0  # body messages covered by the summary
+        self._pending: Future | None = None
+        self.compactions = 0
+        self.last_error: str | None = None
+
+    @property
+    def summary(self) -> str:
+        with self._lock:
+            return self._summary
+
+    def view(self, messages: list[Message]) -> list[Message]:
+        if self.budget_tokens <= 0:
+            return list(messages)
+        head, body = messages[: self.pinned], messages[self.pinned:]
+        with self._lock:
+            if self._summarized > len(body):  # history was replaced
+                self._summary, self._summarized = "", 0
+            summary, summarized = self._summary, self._summarized
+        prefix = list(head)
+        if summary:
+            prefix.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+        left = self.budget_tokens - sum(message_tokens(m) for m in prefix)
+
+        start = len(body)
+        while start > 0:
+            cost = message_tokens(body[start - 1])
+            if cost > left and start < len(body):
+                break
+            left -= cost
+            start -= 1
+        if start > summarized:
+            self._compact(body[summarized:start], summarized, start)
+        return prefix + body[max(start, summarized):]
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until a running compaction (if any) has finished."""
+        pending = self._pending
+        if pending is not None:
+            pending.exception(timeout)
+
+    def _compact(self, turns: list[Message], start: int, stop: int) -> None:
+        if self._summarize is None:
+            return
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return
+            summary = self._summary
+            self._pending = _background().submit(self._run, summary, turns, start, stop)
+
+    def _run(self, summary: str, turns: list[Message], start: int, stop: int) -> None:
+        try:
+            fresh = self._summarize(summary, turns).strip()
+        except Exception as exc:  # noqa: BLE001 - retried on the next view
+            with self._lock:
+                self.last_error = str(exc)
+            return
+        with self._lock:
+            if self._summarized == start and fresh:
+                self._summary = fresh
+                self._summarized = stop
+                self.compactions += 1
+                self.last_error = None
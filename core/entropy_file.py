@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import struct
+import threading
+from pathlib import Path
+
+# Persistent source ids used by the on-disk index. Append only: ids are
+# written to files and must keep their meaning.
+SOURCES = ("UNKNOWN", "LFDR", "ANU", "CLASSIC", "FILE", "SPOOL")
+_SOURCE_IDS = {name: idx for idx, name in enumerate(SOURCES)}
+
+# One index record per appended run: source id, data-file offset, length.
+INDEX_RECORD = struct.Struct("<BQI")
+
+
+def source_id(name: str) -> int:
+    return _SOURCE_IDS.get(name, 0)
+
+
+def source_name(ident: int) -> str:
+    return SOURCES[ident] if 0 <= ident < len(SOURCES) else "UNKNOWN"
+
+
+def index_path(path: str | os.PathLike) -> Path:
+    return Path(f"{os.fspath(path)}.idx")
+
+
+def offset_path(path: str | os.PathLike) -> Path:
+    return Path(f"{os.fspath(path)}.offset")
+
+
+def write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="ascii") as fh:
+        fh.write(text)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def read_index(path: str | os.PathLike) -> list[tuple[str, int, int]]:
+    """``(source, offset, length)`` runs recorded next to an entropy file."""
+    idx = index_path(path)
+    if not idx.exists():
+        return []
+    raw = idx.read_bytes()
+    usable = len(raw) - len(raw) % INDEX_RECORD.size  # ignore a torn last record
+    return [
+        (source_name(sid), offset, length)
+        for sid, offset, length in INDEX_RECORD.iter_unpack(raw[:usable])
+    ]
+
+
+class EntropyRecorder:
+    """Appends entropy to ``path`` and a ``(source, offset, length)`` index."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        idx = index_path(self.path)
+        if idx.exists():
+            # Drop a record torn by a crash so new records stay aligned.
+            size = idx.stat().st_size
+            os.truncate(idx, size - size % INDEX_RECORD.size)
+        self._data = open(self.path, "ab")
+        self._index = open(idx, "ab")
+        self._offset = self._data.tell()
+
+    def append(self, source: str, data: bytes) -> None:
+        if not data:
+            return
+        with self._lock:
+            self._data.write(data)
+            self._data.flush()
+            self._index.write(INDEX_RECORD.pack(source_id(source), self._offset, len(data)))
+            self._index.flush()
+            self._offset += len(data)
+
+    @property
+    def size(self) -> int:
+        return self._offset
+
+    def close(self) -> None:
+        with self._lock:
+            self._data.close()
+            self._index.close()
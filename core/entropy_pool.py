@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+
+Fetch = Callable[[int], tuple[str, bytes]]
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    capacity: int
+    fill: int
+    refills: int
+    refill_bytes: int
+    refill_errors: int
+    waits: int
+    last_error: str | None
+
+
+class EntropyPool:
+    """Ring buffer of prefetched entropy, refilled by a background thread.
+
+    ``fetch(length)`` returns ``(source, data)``; the source tag is kept per
+    byte run so callers can still tell where every byte came from.
+    """
+
+    def __init__(
+        self,
+        fetch: Fetch,
+        capacity: int,
+        block_size: int = 1024,
+        low_watermark: int | None = None,
+        high_watermark: int | None = None,
+        retry_delay_s: float = 1.0,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self._fetch = fetch
+        self.capacity = capacity
+        self.block_size = max(1, min(block_size, capacity))
+        self.high_watermark = min(high_watermark or capacity, capacity)
+        self.low_watermark = min(
+            low_watermark if low_watermark is not None else capacity // 4,
+            self.high_watermark,
+        )
+        self._retry_delay_s = retry_delay_s
+
+        self._buf = bytearray(capacity)
+        self._head = 0
+        self._size = 0
+        self._tags: deque[list] = deque()  # [source, count] runs, oldest first
+
+        self._refills = 0
+        self._refill_bytes = 0
+        self._refill_errors = 0
+        self._waits = 0
+        self._waiting = 0
+        self._last_error: str | None = None
+
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="qrng-pool", daemon=True)
+        self._thread.start()
+
+    def take(self, length: int, timeout_s: float) -> list[tuple[str, bytes]] | None:
+        """Pop ``length`` bytes as ``(source, data)`` runs, or None on timeout."""
+        if length < 1 or length > self.capacity:
+            raise ValueError("length must be between 1 and capacity")
+        deadline = time.monotonic() + timeout_s
+        with self._cond:
+            if self._size < length:
+                self._waits += 1
+                self._waiting += 1
+                self._cond.notify_all()
+                try:
+                    while self._size < length and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return None
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                if self._size < length:
+                    return None
+            segments = self._pop(length)
+            if self._size <= self.low_watermark:
+                self._cond.notify_all()
+            return segments
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            return PoolStats(
+                capacity=self.capacity,
+                fill=self._size,
+                refills=self._refills,
+                refill_bytes=self._refill_bytes,
+                refill_errors=self._refill_errors,
+                waits=self._waits,
+                last_error=self._last_error,
+            )
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+
+    def _pop(self, length: int) -> list[tuple[str, bytes]]:
+        segments: list[tuple[str, bytes]] = []
+        remaining = length
+        while remaining:
+            run = self._tags[0]
+            n = min(run[1], remaining)
+            segments.append((run[0], self._read(n)))
+            run[1] -= n
+            if run[1] == 0:
+                self._tags.popleft()
+            remaining -= n
+        return segments
+
+    def _read(self, n: int) -> bytes:
+        end = self._head + n
+        if end <= self.capacity:
+            out = bytes(self._buf[self._head:end])
+        else:
+            out = bytes(self._buf[self._head:]) + bytes(self._buf[: end - self.capacity])
+        self._head = end % self.capacity
+        self._size -= n
+        return out
+
+    def _write(self, source: str, data: bytes) -> None:
+        n = len(data)
+        tail = (self._head + self._size) % self.capacity
+        first = min(n, self.capacity - tail)
+        self._buf[tail:tail + first] = data[:first]
+        if first < n:
+            self._buf[: n - first] = data[first:]
+        self._size += n
+        if self._tags and self._tags[-1][0] == source:
+            self._tags[-1][1] += n
+        else:
+            self._tags.append([source, n])
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and self._size > self.low_watermark and not self._waiting:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            self._refill()
+
+    def _refill(self) -> None:
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                want = min(self.block_size, self.capacity - self._size)
+                if want < 1 or (self._size >= self.high_watermark and not self._waiting):
+                    return
+            try:
+                source, data = self._fetch(want)
+            except Exception as exc:  # noqa: BLE001 - keep the refill thread alive
+                with self._cond:
+                    self._refill_errors += 1
+                    self._last_error = str(exc)
+                    self._cond.wait(self._retry_delay_s)
+                continue
+            with self._cond:
+                data = data[: self.capacity - self._size]
+                if data:
+                    self._write(source, data)
+                    self._refills += 1
+                    self._refill_bytes += len(data)
+                    self._last_error = None
+                    self._cond.notify_all()
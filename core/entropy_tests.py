@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import math
+import threading
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+
+# False-alarm probability per test decision (SP 800-90B recommends 2^-20..2^-40).
+DEFAULT_ALPHA = 2.0 ** -20
+# Assessed min-entropy per byte that the cutoffs are derived from. Lower is
+# more tolerant; 8 would claim every byte is full entropy.
+DEFAULT_MIN_ENTROPY = 4.0
+APT_WINDOW = 512
+CHI_SQUARE_WINDOW = 4096
+# Batches up to this size (e.g. the 2 bytes of a cast) take the plain Python
+# RCT/APT path; NumPy's per-call overhead only pays off on larger ones.
+SCALAR_MAX_BYTES = 64
+
+
+def rct_cutoff(min_entropy: float, alpha: float = DEFAULT_ALPHA) -> int:
+    """Repetition count test cutoff: C = 1 + ceil(-log2(alpha) / H)."""
+    return 1 + math.ceil(-math.log2(alpha) / min_entropy)
+
+
+def apt_cutoff(min_entropy: float, window: int = APT_WINDOW, alpha: float = DEFAULT_ALPHA) -> int:
+    """Adaptive proportion test cutoff: 1 + CRITBINOM(W, 2^-H, 1 - alpha)."""
+    p = 2.0 ** -min_entropy
+    pmf = (1.0 - p) ** window
+    cdf = pmf
+    k = 0
+    while cdf < 1.0 - alpha and k < window:
+        pmf *= (window - k) / (k + 1) * p / (1.0 - p)
+        cdf += pmf
+        k += 1
+    return min(window, 1 + k)
+
+
+def chi_square_cutoff(alpha: float = DEFAULT_ALPHA, df: int = 255) -> float:
+    """Upper critical value of chi-square(df), Wilson-Hilferty approximation."""
+    z = NormalDist().inv_cdf(1.0 - alpha)
+    h = 2.0 / (9.0 * df)
+    return df * (1.0 - h + z * math.sqrt(h)) ** 3
+
+
+@dataclass(frozen=True)
+class EntropyTestSnapshot:
+    name: str
+    samples: int
+    longest_run: int
+    rct_cutoff: int
+    apt_peak: int
+    apt_cutoff: int
+    chi_square: float | None
+    chi_square_cutoff: float
+    failures: int
+    last_failure: str | None
+
+
+class EntropyHealthTest:
+    """Continuous SP 800-90B style health tests over one source's byte stream.
+
+    Runs the repetition count test, the adaptive proportion test and a
+    byte-frequency chi-square over consecutive windows. State is a handful of
+    counters plus the bytes of the current, not yet full chi-square window.
+    Small batches are checked byte by byte, large ones with NumPy, and the
+    histogram is only computed once a window has filled. A failure does not clear the
+    current run, so a stuck source keeps failing on every batch instead of
+    passing again until the run rebuilds; the adaptive proportion test starts
+    a fresh window.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        min_entropy: float = DEFAULT_MIN_ENTROPY,
+        alpha: float = DEFAULT_ALPHA,
+        apt_window: int = APT_WINDOW,
+        chi_window: int = CHI_SQUARE_WINDOW,
+    ) -> None:
+        self.name = name
+        self.rct_cutoff = rct_cutoff(min_entropy, alpha)
+        self.apt_window = apt_window
+        self.apt_cutoff = apt_cutoff(min_entropy, apt_window, alpha)
+        self.chi_window = chi_window
+        self.chi_cutoff = chi_square_cutoff(alpha)
+        self._lock = threading.Lock()
+        self._samples = 0
+        self._failures = 0
+        self._last_failure: str | None = None
+        self._chi_square: float | None = None
+        self._reset()
+
+    def update(self, data: bytes) -> str | None:
+        """Feed ``data``; return why a test failed, or None if all passed."""
+        if not data:
+            return None
+        with self._lock:
+            self._samples += len(data)
+            if len(data) <= SCALAR_MAX_BYTES:
+                reason = self._repetition_count_scalar(data) or self._adaptive_proportion_scalar(data)
+            else:
+                arr = np.frombuffer(data, dtype=np.uint8)
+                reason = self._repetition_count(arr) or self._adaptive_proportion(arr)
+            reason = reason or self._chi_square_test(data)
+            if reason is not None:
+                self._failures += 1
+                self._last_failure = reason
+            return reason
+
+    def snapshot(self) -> EntropyTestSnapshot:
+        with self._lock:
+            return EntropyTestSnapshot(
+                name=self.name,
+                samples=self._samples,
+                longest_run=self._longest_run,
+                rct_cutoff=self.rct_cutoff,
+                apt_peak=self._apt_peak,
+                apt_cutoff=self.apt_cutoff,
+                chi_square=self._chi_square,
+                chi_square_cutoff=self.chi_cutoff,
+                failures=self._failures,
+                last_failure=self._last_failure,
+            )
+
+    def _reset(self) -> None:
+        self._run_value = -1
+        self._run_length = 0
+        self._longest_run = 0
+        self._apt_value = -1
+        self._apt_count = 0
+        self._apt_seen = 0
+        self._apt_peak = 0
+        self._chi_pending = b""
+
+    def _repetition_count_scalar(self, data: bytes) -> str | None:
+        value, length, longest = self._run_value, self._run_length, 0
+        for byte in data:
+            if byte == value:
+                length += 1
+            else:
+                value, length = byte, 1
+            if length > longest:
+                longest = length
+        self._run_value, self._run_length = value, length
+        self._longest_run = max(self._longest_run, longest)
+        if longest >= self.rct_cutoff:
+            return f"repetition count test: run of {longest} >= {self.rct_cutoff}"
+        return None
+
+    def _adaptive_proportion_scalar(self, data: bytes) -> str | None:
+        for byte in data:
+            if self._apt_seen == 0:
+                self._apt_value = byte
+                self._apt_count = 0
+            if byte == self._apt_value:
+                self._apt_count += 1
+                if self._apt_count > self._apt_peak:
+                    self._apt_peak = self._apt_count
+                if self._apt_count >= self.apt_cutoff:
+                    self._apt_seen = 0
+                    return f"adaptive proportion test: {self._apt_count}/{self.apt_window} >= {self.apt_cutoff}"
+            self._apt_seen += 1
+            if self._apt_seen == self.apt_window:
+                self._apt_seen = 0
+        return None
+
+    def _repetition_count(self, arr: np.ndarray) -> str | None:
+        edges = np.flatnonzero(arr[1:] != arr[:-1]) + 1
+        runs = np.diff(np.concatenate(([0], edges, [arr.size])))
+        if arr[0] == self._run_value:
+            runs[0] += self._run_length
+        longest = int(runs.max())
+        self._run_value = int(arr[-1])
+        self._run_length = int(runs[-1])
+        self._longest_run = max(self._longest_run, longest)
+        if longest >= self.rct_cutoff:
+            return f"repetition count test: run of {longest} >= {self.rct_cutoff}"
+        return None
+
+    def _adaptive_proportion(self, arr: np.ndarray) -> str | None:
+        pos = 0
+        while pos < arr.size:
+            if self._apt_seen == 0:
+                self._apt_value = int(arr[pos])
+                self._apt_count = 0
+            take = min(self.apt_window - self._apt_seen, arr.size - pos)
+            self._apt_count += int(np.count_nonzero(arr[pos:pos + take] == self._apt_value))
+            self._apt_seen += take
+            pos += take
+            self._apt_peak = max(self._apt_peak, self._apt_count)
+            if self._apt_count >= self.apt_cutoff:
+                self._apt_seen = 0
+                return f"adaptive proportion test: {self._apt_count}/{self.apt_window} >= {self.apt_cutoff}"
+            if self._apt_seen == self.apt_window:
+                self._apt_seen = 0
+        return None
+
+    def _chi_square_test(self, data: bytes) -> str | None:
+        pending = self._chi_pending + data
+        windows = len(pending) // self.chi_window
+        if windows == 0:
+            self._chi_pending = pending
+            return None
+        used = windows * self.chi_window
+        self._chi_pending = pending[used:]
+        # One histogram per full window, all windows in a single bincount.
+        arr = np.frombuffer(pending, dtype=np.uint8, count=used).reshape(windows, self.chi_window)
+        offsets = (np.arange(windows, dtype=np.int32) * 256)[:, None]
+        counts = np.bincount((arr + offsets).ravel(), minlength=256 * windows).reshape(windows, 256)
+        expected = self.chi_window / 256
+        stats = ((counts - expected) ** 2).sum(axis=1) / expected
+        failed = np.flatnonzero(stats > self.chi_cutoff)
+        stat = float(stats[failed[0]] if failed.size else stats[-1])
+        self._chi_square = stat
+        if failed.size:
+            return f"chi-square test: {stat:.1f} > {self.chi_cutoff:.1f}"
+        return None
+
+
+def format_entropy_test(snapshot: EntropyTestSnapshot) -> str:
+    chi = "-" if snapshot.chi_square is None else f"{snapshot.chi_square:.0f}/{snapshot.chi_square_cutoff:.0f}"
+    return (
+        f"{snapshot.name} 检测 {snapshot.samples}B 重复 {snapshot.longest_run}/{snapshot.rct_cutoff} "
+        f"比例 {snapshot.apt_peak}/{snapshot.apt_cutoff} 卡方 {chi} 失败 {snapshot.failures}"
+    )
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class BackendHealthSnapshot:
+    name: str
+    state: BreakerState
+    latency_ewma_s: float | None
+    error_rate: float
+    successes: int
+    failures: int
+    last_error: str | None
+
+
+class BackendHealth:
+    """Latency EWMA, error-rate EWMA and circuit breaker for one QRNG backend.
+
+    The breaker opens after ``failure_threshold`` consecutive failures. An
+    open backend is only re-tried by an off-path probe once ``cooldown_s``
+    has elapsed: ``begin_probe`` moves it to half-open, and the probe's
+    ``record_success`` closes it again or ``record_failure`` re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown_s: float = 30.0,
+    ) -> None:
+        self.name = name
+        self._alpha = alpha
+        self._failure_threshold = max(1, failure_threshold)
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._state = BreakerState.CLOSED
+        self._latency_ewma: float | None = None
+        self._error_rate = 0.0
+        self._successes = 0
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._last_error: str | None = None
+        self._recent: deque[float] = deque(maxlen=64)
+
+    @property
+    def state(self) -> BreakerState:
+        return self._state
+
+    @property
+    def latency_ewma_s(self) -> float | None:
+        return self._latency_ewma
+
+    def available(self) -> bool:
+        return self._state is BreakerState.CLOSED
+
+    def latency_quantile(self, q: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            samples = sorted(self._recent)
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def record_success(self, latency_s: float) -> None:
+        with self._lock:
+            self._successes += 1
+            self._consecutive_failures = 0
+            self._recent.append(latency_s)
+            if self._latency_ewma is None:
+                self._latency_ewma = latency_s
+            else:
+                self._latency_ewma += self._alpha * (latency_s - self._latency_ewma)
+            self._error_rate *= 1 - self._alpha
+            self._state = BreakerState.CLOSED
+
+    def record_failure(self, error: str, trip: bool = False) -> None:
+        """Count a failure; ``trip`` opens the breaker regardless of the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._error_rate += self._alpha * (1 - self._error_rate)
+            self._last_error = error
+            if (
+                trip
+                or self._state is BreakerState.HALF_OPEN
+                or self._consecutive_failures >= self._failure_threshold
+            ):
+                self._state = BreakerState.OPEN
+                self._opened_at = time.monotonic()
+
+    def begin_probe(self) -> bool:
+        """Move an open backend whose cooldown has elapsed to half-open."""
+        with self._lock:
+            if self._state is not BreakerState.OPEN:
+                return False
+            if time.monotonic() - self._opened_at < self.cooldown_s:
+                return False
+            self._state = BreakerState.HALF_OPEN
+            return True
+
+    def snapshot(self) -> BackendHealthSnapshot:
+        with self._lock:
+            return BackendHealthSnapshot(
+                name=self.name,
+                state=self._state,
+                latency_ewma_s=self._latency_ewma,
+                error_rate=self._error_rate,
+                successes=self._successes,
+                failures=self._failures,
+                last_error=self._last_error,
+            )
+
+
+def format_health(snapshot: BackendHealthSnapshot) -> str:
+    latency = "-" if snapshot.latency_ewma_s is None else f"{snapshot.latency_ewma_s:.2f}s"
+    return (
+        f"{snapshot.name} {snapshot.state.value} "
+        f"延迟 {latency} 错误率 {snapshot.error_rate:.0%}"
+    )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import FrozenInstanceError
 
 
 TRIGRAMS_BY_LINES = {
@@ -82,48 +82,106 @@ HEXAGRAM_NAMES = {
 }
 
 
-@dataclass(frozen=True)
+def _line_str(bit: int) -> str:
+    return "-----" if bit == 1 else "-- --"
+
+
+def _render(bits: tuple[int, ...], moving_line: int | None) -> str:
+    lines = []
+    for idx in range(5, -1, -1):
+        line = _line_str(bits[idx])
+        if moving_line is not None and moving_line - 1 == idx:
+            line = f"{line}  *"
+        lines.append(line)
+    return "\n".join(lines)
+
+
 class Hexagram:
+    """One of the 64 hexagrams; instances are interned singletons.
+
+    ``Hexagram(bits=...)`` and ``Hexagram.from_int`` return the shared
+    instance built at import time, with names and ASCII renderings (for
+    every moving-line position) precomputed. ``index`` packs the bits with
+    line 1 (bottom) as bit 0.
+    """
+
+    __slots__ = (
+        "bits",
+        "index",
+        "lower_trigram",
+        "upper_trigram",
+        "lower_name",
+        "upper_name",
+        "hexagram_name",
+        "display_name",
+        "_renders",
+    )
+
     bits: tuple[int, int, int, int, int, int]  # bottom -> top
 
-    @property
-    def lower_trigram(self) -> int:
-        return (self.bits[0], self.bits[1], self.bits[2])
+    def __new__(cls, bits: tuple[int, ...]) -> "Hexagram":
+        try:
+            return _BY_BITS[tuple(bits)]
+        except KeyError:
+            raise ValueError(f"Invalid hexagram bits: {bits!r}") from None
 
-    @property
-    def upper_trigram(self) -> int:
-        return (self.bits[3], self.bits[4], self.bits[5])
+    @classmethod
+    def _build(cls, index: int) -> "Hexagram":
+        self = object.__new__(cls)
+        bits = tuple((index >> i) & 1 for i in range(6))
+        lower = bits[:3]
+        upper = bits[3:]
+        lower_name = TRIGRAMS_BY_LINES[lower]
+        upper_name = TRIGRAMS_BY_LINES[upper]
+        hexagram_name = HEXAGRAM_NAMES.get(
+            (upper_name, lower_name), f"上{upper_name}下{lower_name}"
+        )
+        values = {
+            "bits": bits,
+            "index": index,
+            "lower_trigram": lower,
+            "upper_trigram": upper,
+            "lower_name": lower_name,
+            "upper_name": upper_name,
+            "hexagram_name": hexagram_name,
+            "display_name": f"上{upper_name}下{lower_name}（{hexagram_name}）",
+            "_renders": tuple(_render(bits, line) for line in (None, 1, 2, 3, 4, 5, 6)),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+        return self
 
-    @property
-    def upper_name(self) -> str:
-        return TRIGRAMS_BY_LINES[self.upper_trigram]
+    def __setattr__(self, name: str, value: object) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
 
-    @property
-    def lower_name(self) -> str:
-        return TRIGRAMS_BY_LINES[self.lower_trigram]
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
 
-    @property
-    def hexagram_name(self) -> str:
-        key = (self.upper_name, self.lower_name)
-        if key in HEXAGRAM_NAMES:
-            return HEXAGRAM_NAMES[key]
-        return f"上{self.upper_name}下{self.lower_name}"
+    def __repr__(self) -> str:
+        return f"Hexagram(bits={self.bits!r})"
 
-    @property
-    def display_name(self) -> str:
-        return f"上{self.upper_name}下{self.lower_name}（{self.hexagram_name}）"
+    def __reduce__(self) -> tuple:
+        return (Hexagram.from_int, (self.index,))
 
     @property
     def name(self) -> str:
         return self.hexagram_name
 
     def to_int(self) -> int:
-        value = 0
-        for idx, bit in enumerate(self.bits):
-            value |= (bit & 1) << idx
-        return value
+        return self.index
 
     @staticmethod
     def from_int(value: int) -> "Hexagram":
-        bits = tuple((value >> i) & 1 for i in range(6))
-        return Hexagram(bits=bits)
+        return _TABLE[value & 0x3F]
+
+    def changed(self, moving_line: int) -> "Hexagram":
+        """The hexagram with ``moving_line`` (1..6, bottom -> top) flipped."""
+        return _TABLE[self.index ^ (1 << (moving_line - 1))]
+
+    def render(self, moving_line: int | None = None) -> str:
+        """ASCII rendering, top line first; the moving line is marked with ``*``."""
+        return self._renders[moving_line or 0]
+
+
+_TABLE: tuple[Hexagram, ...] = tuple(Hexagram._build(index) for index in range(64))
+_BY_BITS: dict[tuple[int, ...], Hexagram] = {h.bits: h for h in _TABLE}
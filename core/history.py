@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from core.entropy_file import SOURCES, source_id, source_name
+
+# High bit of a per-byte source id: this byte starts a new history entry.
+_ENTRY_START = 0x80
+
+
+@dataclass(frozen=True)
+class HistoryStats:
+    requests: int
+    fallbacks: int
+    fallback_rate: float
+    bytes_by_source: dict[str, int]
+    retained: int
+    capacity: int
+
+
+class EntropyHistory:
+    """Bounded record of served entropy, tagged with its source.
+
+    The last ``capacity`` bytes live in one preallocated ``bytearray`` ring,
+    with a parallel ``array('B')`` of source ids. Iterating yields the same
+    ``(source, bytes)`` entries the provider used to append to a list.
+    ``mark()``/``since(mark)`` give the entries of one cast without scanning
+    the whole history. Per-source byte counts, request count and fallback
+    rate cover everything ever recorded, in constant memory.
+    """
+
+    def __init__(self, capacity: int = 4096, primary: str = "LFDR") -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._primary = primary
+        self._data = bytearray(capacity)
+        self._sources = array("B", bytes(capacity))
+        self._total = 0
+        self._bytes_by_source = array("Q", [0] * len(SOURCES))
+        self._requests = 0
+        self._fallbacks = 0
+        self._lock = threading.Lock()
+
+    def record(self, segments: Iterable[tuple[str, bytes]]) -> None:
+        """Record the ``(source, bytes)`` runs served for one request."""
+        segments = list(segments)
+        with self._lock:
+            self._requests += 1
+            if any(source != self._primary for source, _ in segments):
+                self._fallbacks += 1
+            for source, data in segments:
+                self._append(source_id(source), data)
+
+    def mark(self) -> int:
+        """Position to pass to ``since`` to get everything recorded after now."""
+        with self._lock:
+            return self._total
+
+    def since(self, mark: int) -> list[tuple[str, bytes]]:
+        with self._lock:
+            return list(self._entries(max(mark, self._total - self.capacity)))
+
+    def stats(self) -> HistoryStats:
+        with self._lock:
+            return HistoryStats(
+                requests=self._requests,
+                fallbacks=self._fallbacks,
+                fallback_rate=self._fallbacks / self._requests if self._requests else 0.0,
+                bytes_by_source={
+                    SOURCES[sid]: count for sid, count in enumerate(self._bytes_by_source) if count
+                },
+                retained=min(self._total, self.capacity),
+                capacity=self.capacity,
+            )
+
+    def __iter__(self) -> Iterator[tuple[str, bytes]]:
+        return iter(self.since(0))
+
+    def __len__(self) -> int:
+        return len(self.since(0))
+
+    def _append(self, sid: int, data: bytes) -> None:
+        n = len(data)
+        if n == 0:
+            return
+        self._bytes_by_source[sid] += n
+        if n > self.capacity:
+            self._total += n - self.capacity
+            data = data[-self.capacity:]
+            n = self.capacity
+        pos = self._total % self.capacity
+        first = min(n, self.capacity - pos)
+        tags = array("B", [sid]) * n
+        tags[0] = sid | _ENTRY_START
+        self._data[pos:pos + first] = data[:first]
+        self._sources[pos:pos + first] = tags[:first]
+        if first < n:
+            self._data[: n - first] = data[first:]
+            self._sources[: n - first] = tags[first:]
+        self._total += n
+
+    def _entries(self, start: int) -> Iterator[tuple[str, bytes]]:
+        end = self._total
+        if start >= end:
+            return
+        out = bytearray()
+        current = -1
+        for position in range(start, end):
+            idx = position % self.capacity
+            tag = self._sources[idx]
+            sid = tag & ~_ENTRY_START
+            if out and (tag & _ENTRY_START or sid != current):
+                yield source_name(current), bytes(out)
+                out.clear()
+            current = sid
+            out.append(self._data[idx])
+        yield source_name(current), bytes(out)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import atexit
+import threading
 from dataclasses import dataclass
-from typing import Generator, Iterable
+from typing import Callable, ContextManager, Generator, Iterable
 
-from openai import OpenAI, OpenAIError
+import httpx
+from openai import DefaultHttpxClient, OpenAI, OpenAIError
 
 from config.settings import Settings, get_settings
+from core.context_window import ConversationWindow, Summarize, estimate_tokens  # noqa: F401 - re-exported
+from core.response_cache import ResponseCache, cache_key
 
 
 class LLMError(RuntimeError):
@@ -30,17 +35,89 @@ def build_llm_config(settings: Settings | None = None) -> LLMConfig:
     )
 
 
+# Keep-alive limits for the shared clients: a handful of warm connections
+# per endpoint, kept long enough to span a user's follow-up questions.
+_MAX_CONNECTIONS = 32
+_MAX_KEEPALIVE = 8
+_KEEPALIVE_EXPIRY_S = 120.0
+
+_clients: dict[LLMConfig, OpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(config: LLMConfig) -> OpenAI:
+    """Process-wide OpenAI client for ``config``; safe to share across threads."""
+    with _clients_lock:
+        client = _clients.get(config)
+        if client is None:
+            client = OpenAI(
+                base_url=config.base_url,
+                api_key=config.api_key,
+                http_client=DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=_MAX_CONNECTIONS,
+                        max_keepalive_connections=_MAX_KEEPALIVE,
+                        keepalive_expiry=_KEEPALIVE_EXPIRY_S,
+                    )
+                ),
+            )
+            _clients[config] = client
+        return client
+
+
+def reset_client(config: LLMConfig) -> None:
+    """Close the cached client for ``config``; the next call builds a new one."""
+    with _clients_lock:
+        client = _clients.pop(config, None)
+    if client is not None:
+        client.close()
+
+
+def close_clients() -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_clients)
+
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache(settings: Settings | None = None) -> ResponseCache | None:
+    """Process-wide interpretation cache, or None when LLM_CACHE_SIZE is 0."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            settings = settings or get_settings()
+            if settings.llm_cache_size <= 0:
+                return None
+            _response_cache = ResponseCache(
+                capacity=settings.llm_cache_size,
+                ttl_s=settings.llm_cache_ttl_s,
+                path=settings.llm_cache_path,
+            )
+        return _response_cache
+
+
 def stream_chat_completion(
     messages: list[dict[str, str]],
     config: LLMConfig,
+    timeout_s: float | None = None,
 ) -> Generator[str, None, None]:
-    client = OpenAI(base_url=config.base_url, api_key=config.api_key)
+    """Stream the reply; ``timeout_s`` bounds each network wait (default: the client's)."""
+    client = get_client(config)
+    options = {} if timeout_s is None else {"timeout": timeout_s}
     try:
         response = client.chat.completions.create(
             model=config.model,
             messages=messages,
             stream=True,
             temperature=0.7,
+            **options,
         )
         for chunk in response:
             if not chunk.choices:
@@ -55,3 +132,63 @@ def stream_chat_completion(
                 yield piece
     except OpenAIError as exc:
         raise LLMError(f"LLM request error: {exc}") from exc
+
+
+def stream_interpretation(
+    prompt: str,
+    config: LLMConfig,
+    cache: ResponseCache | None = None,
+    question: str = "",
+    timeout_s: float | None = None,
+) -> Generator[str, None, None]:
+    """First-turn interpretation of a rendered prompt, served from the cache if possible.
+
+    ``question`` is the one rendered into ``prompt``; it is normalized for
+    the cache key only.
+    """
+    messages = [{"role": "system", "content": prompt}]
+    cache = cache or get_response_cache()
+    if cache is None:
+        yield from stream_chat_completion(messages, config, timeout_s)
+        return
+    key = cache_key(prompt, config.model, question)
+    yield from cache.stream(key, lambda: stream_chat_completion(messages, config, timeout_s))
+
+
+_SUMMARY_PROMPT = (
+    "请把已有摘要与新增的占卦对话合并为一段简洁的中文摘要，"
+    "保留所问之事、卦象与解读要点、用户的追问及得到的结论，不超过 300 字，只输出摘要。"
+)
+
+
+def summarizer(config: LLMConfig, admit: Callable[[], ContextManager[object]] | None = None) -> Summarize:
+    """Summarize callback for ConversationWindow backed by the chat model.
+
+    ``admit`` wraps each call, e.g. to hold a concurrency slot and charge the
+    session's LLM quota; it raises to skip a compaction until the next view.
+    """
+
+    def summarize(previous: str, turns: list[dict[str, str]]) -> str:
+        lines = [f"已有摘要：{previous}"] if previous else []
+        for message in turns:
+            speaker = "问" if message["role"] == "user" else "答"
+            lines.append(f"{speaker}：{message['content']}")
+        messages = [
+            {"role": "system", "content": _SUMMARY_PROMPT},
+            {"role": "user", "content": "\n".join(lines)},
+        ]
+        if admit is None:
+            return "".join(stream_chat_completion(messages, config))
+        with admit():
+            return "".join(stream_chat_completion(messages, config))
+
+    return summarize
+
+
+def context_window(
+    config: LLMConfig,
+    settings: Settings | None = None,
+    admit: Callable[[], ContextManager[object]] | None = None,
+) -> ConversationWindow:
+    settings = settings or get_settings()
+    return ConversationWindow(settings.llm_context_budget, summarizer(config, admit))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable
+
+from core.casting import CAST_BYTES
+from core.qrng import QRNGError, QRNGProvider
+from core.quota import SessionQuotas
+
+
+@dataclass(frozen=True)
+class PrefetchStats:
+    reserved: int
+    takes: int
+    ready: int  # bytes were already there when the user clicked
+    waited: int  # fetch still in flight at the click, finished in time
+    missed: int  # no reservation, or it failed / timed out
+    discarded: int
+    pending: int
+    skipped: int = 0  # not reserved: session out of quota or too many pending
+
+    @property
+    def ready_rate(self) -> float:
+        return self.ready / self.takes if self.takes else 0.0
+
+
+class EntropyPrefetcher:
+    """Fetches one cast's bytes per session before the user asks for them.
+
+    ``reserve`` starts a background fetch bound to a session; ``take`` hands
+    the bytes out exactly once and forgets them, ``discard`` drops them
+    unused. Reservations older than ``max_age_s`` are discarded rather than
+    served, so a cast never uses bytes that sat around for long.
+
+    A reservation is charged to the session's bucket in ``quota`` when it is
+    made (and skipped if the bucket is empty), and at most ``max_pending``
+    are outstanding at once, so prefetching never draws more entropy than
+    the casts it stands in for. A reservation that is never served (stale,
+    discarded, or failed at ``take``) is refunded, so a session that keeps
+    rerunning without casting is not charged for bytes it never used.
+    """
+
+    def __init__(
+        self,
+        provider: QRNGProvider,
+        length: int = CAST_BYTES,
+        workers: int = 4,
+        max_age_s: float = 300.0,
+        quota: SessionQuotas | None = None,
+        max_pending: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._provider = provider
+        self.length = length
+        self.max_age_s = max_age_s
+        self.max_pending = max_pending
+        self._quota = quota
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="qrng-prefetch")
+        self._lock = threading.Lock()
+        self._reservations: dict[str, tuple[float, Future]] = {}
+        self._reserved = self._takes = self._ready = self._waited = self._missed = self._discarded = 0
+        self._skipped = 0
+
+    def reserve(self, session: str) -> bool:
+        """Start fetching the session's next cast; False if it was not reserved."""
+        with self._lock:
+            self._expire(self._clock())
+            if session in self._reservations:
+                return True
+            if len(self._reservations) >= self.max_pending or (
+                self._quota is not None and self._quota.try_take(session, self.length)
+            ):
+                self._skipped += 1
+                return False
+            future = self._executor.submit(self._provider.get_bytes, self.length)
+            self._reservations[session] = (self._clock(), future)
+            self._reserved += 1
+            return True
+
+    def take(self, session: str, timeout: float | None = None) -> bytes | None:
+        """The session's reserved bytes (waiting up to ``timeout``), or None."""
+        with self._lock:
+            self._expire(self._clock())
+            entry = self._reservations.pop(session, None)
+            self._takes += 1
+            if entry is None:
+                self._missed += 1
+                return None
+            future = entry[1]
+            ready = future.done()
+        try:
+            data = future.result(timeout)
+        except (QRNGError, FutureTimeout) as exc:
+            if isinstance(exc, FutureTimeout):
+                future.cancel()
+            with self._lock:
+                self._missed += 1
+            self._refund(session)
+            return None
+        with self._lock:
+            if ready:
+                self._ready += 1
+            else:
+                self._waited += 1
+        return data
+
+    def discard(self, session: str) -> None:
+        with self._lock:
+            entry = self._reservations.pop(session, None)
+            if entry is not None:
+                entry[1].cancel()
+                self._discarded += 1
+        if entry is not None:
+            self._refund(session)
+
+    def stats(self) -> PrefetchStats:
+        with self._lock:
+            self._expire(self._clock())
+            return PrefetchStats(
+                reserved=self._reserved,
+                takes=self._takes,
+                ready=self._ready,
+                waited=self._waited,
+                missed=self._missed,
+                discarded=self._discarded,
+                pending=len(self._reservations),
+                skipped=self._skipped,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            for _, future in self._reservations.values():
+                future.cancel()
+            self._reservations.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _expire(self, now: float) -> None:
+        stale = [s for s, (created, _) in self._reservations.items() if now - created > self.max_age_s]
+        for session in stale:
+            self._reservations.pop(session)[1].cancel()
+            self._discarded += 1
+            self._refund(session)
+
+    def _refund(self, session: str) -> None:
+        if self._quota is not None:
+            self._quota.refund(session, self.length)
+
+
+def format_prefetch(stats: PrefetchStats) -> str:
+    return f"预取就绪 {stats.ready}/{stats.takes} · 等待 {stats.waited} · 未命中 {stats.missed}"
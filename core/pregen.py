@@ -0,0 +1,256 @@
+"""Pre-generate a baseline interpretation for all 384 (hexagram, moving line) casts.
+
+    python -m core.pregen                      # resume into LLM_BASELINE_PATH
+    python -m core.pregen --workers 8 --rate 4 --retries 5
+    python -m core.pregen --fresh              # discard existing results
+
+Each pair's prompt is the regular template rendered with a generic
+question. Results are appended to a compact indexed file as soon as they
+arrive, so an interrupted run resumes where it stopped. The page shows the
+stored text while the personalized answer is still on its way.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable
+
+from config.settings import Settings, get_settings
+from core.casting import CastingResult
+from core.entropy_file import index_path, write_atomic
+from core.hexagrams import Hexagram
+from core.prompts import format_prompt, load_prompt_template
+
+GENERIC_QUESTION = "近期整体运势如何，应当如何把握"
+PAIRS = 64 * 6
+
+# One index record per stored answer: pair index, data offset, compressed length.
+_RECORD = struct.Struct("<HQI")
+
+
+def pair_index(base_index: int, moving_line: int) -> int:
+    return base_index * 6 + moving_line - 1
+
+
+def all_casts() -> list[CastingResult]:
+    casts = []
+    for index in range(64):
+        base = Hexagram.from_int(index)
+        for line in range(1, 7):
+            casts.append(CastingResult(base=base, changed=base.changed(line), moving_line=line))
+    return casts
+
+
+def _meta_path(path: Path) -> Path:
+    return Path(f"{os.fspath(path)}.meta.json")
+
+
+class InterpretationStore:
+    """Append-only file of zlib-compressed answers plus a fixed-size record index.
+
+    A later record for the same pair wins; a torn trailing record (crash
+    during append) is ignored on load and truncated before writing.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._blobs: dict[int, bytes] = {}
+        self._data = None
+        self._index = None
+        if self.path.exists():
+            data = self.path.read_bytes()
+            idx = index_path(self.path)
+            raw = idx.read_bytes() if idx.exists() else b""
+            usable = len(raw) - len(raw) % _RECORD.size
+            for pair, offset, length in _RECORD.iter_unpack(raw[:usable]):
+                if pair < PAIRS and offset + length <= len(data):
+                    self._blobs[pair] = data[offset:offset + length]
+
+    @property
+    def meta(self) -> dict | None:
+        path = _meta_path(self.path)
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+    def write_meta(self, meta: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(_meta_path(self.path), json.dumps(meta, ensure_ascii=True, sort_keys=True))
+
+    def get(self, base_index: int, moving_line: int) -> str | None:
+        blob = self._blobs.get(pair_index(base_index, moving_line))
+        return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+    def get_cast(self, result: CastingResult) -> str | None:
+        return self.get(result.base.to_int(), result.moving_line)
+
+    def done(self) -> set[int]:
+        with self._lock:
+            return set(self._blobs)
+
+    def append(self, pair: int, text: str) -> None:
+        blob = zlib.compress(text.encode("utf-8"), 9)
+        with self._lock:
+            if self._data is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                idx = index_path(self.path)
+                if idx.exists():
+                    size = idx.stat().st_size
+                    os.truncate(idx, size - size % _RECORD.size)
+                self._data = open(self.path, "ab")
+                self._index = open(idx, "ab")
+            offset = self._data.tell()
+            self._data.write(blob)
+            self._data.flush()
+            self._index.write(_RECORD.pack(pair, offset, len(blob)))
+            self._index.flush()
+            self._blobs[pair] = blob
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def close(self) -> None:
+        with self._lock:
+            for fh in (self._data, self._index):
+                if fh is not None:
+                    fh.close()
+            self._data = self._index = None
+
+    @staticmethod
+    def remove(path: str | os.PathLike) -> None:
+        path = Path(path)
+        for target in (path, index_path(path), _meta_path(path)):
+            target.unlink(missing_ok=True)
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate_per_s`` apart across threads."""
+
+    def __init__(self, rate_per_s: float) -> None:
+        self._interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def pregenerate(
+    store: InterpretationStore,
+    complete: Callable[[str], str],
+    workers: int = 4,
+    rate_per_s: float = 2.0,
+    retries: int = 3,
+    backoff_s: float = 2.0,
+    question: str = GENERIC_QUESTION,
+    template: str | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> list[tuple[CastingResult, str]]:
+    """Generate every missing pair; return the casts that still failed."""
+    template = load_prompt_template() if template is None else template
+    done = store.done()
+    todo = [cast for cast in all_casts() if pair_index(cast.base.to_int(), cast.moving_line) not in done]
+    limiter = RateLimiter(rate_per_s)
+
+    def generate(cast: CastingResult) -> str:
+        prompt = format_prompt(cast, question, template)
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                text = complete(prompt).strip()
+                if text:
+                    return text
+                error: Exception = ValueError("empty answer")
+            except Exception as exc:  # noqa: BLE001 - any LLM/transport failure is retried
+                error = exc
+            if attempt < retries:
+                time.sleep(backoff_s * 2 ** attempt)
+        raise error
+
+    failed: list[tuple[CastingResult, str]] = []
+    finished = len(done)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pregen") as pool:
+        futures = {pool.submit(generate, cast): cast for cast in todo}
+        for future in as_completed(futures):
+            cast = futures[future]
+            label = f"{cast.base.display_name} 第{cast.moving_line}爻"
+            try:
+                store.append(pair_index(cast.base.to_int(), cast.moving_line), future.result())
+            except Exception as exc:  # noqa: BLE001 - reported, resumable later
+                failed.append((cast, str(exc)))
+                status = f"failed: {exc}"
+            else:
+                finished += 1
+                status = "ok"
+            if progress is not None:
+                progress(f"[{finished}/{PAIRS}] {label} {status}")
+    return failed
+
+
+def _llm_complete(settings: Settings) -> Callable[[str], str]:
+    # Imported here so that reading a baseline file needs no LLM SDK.
+    from core.llm import build_llm_config, stream_chat_completion
+
+    config = build_llm_config(settings)
+    return lambda prompt: "".join(stream_chat_completion([{"role": "system", "content": prompt}], config))
+
+
+def main(argv: list[str] | None = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Pre-generate baseline interpretations")
+    parser.add_argument("--out", default=settings.baseline_path, help="store path (default LLM_BASELINE_PATH)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="max LLM requests per second")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--question", default=GENERIC_QUESTION)
+    parser.add_argument("--fresh", action="store_true", help="discard existing results first")
+    args = parser.parse_args(argv)
+    if not args.out:
+        parser.error("no output path: pass --out or set LLM_BASELINE_PATH")
+
+    template = load_prompt_template()
+    meta = {
+        "model": settings.llm_model,
+        "question": args.question,
+        "template_sha256": hashlib.sha256(template.encode("utf-8")).hexdigest(),
+    }
+    if args.fresh:
+        InterpretationStore.remove(args.out)
+    store = InterpretationStore(args.out)
+    if store.meta not in (None, meta):
+        store.close()
+        print("Existing results used another model, question or template; rerun with --fresh.", file=sys.stderr)
+        return 2
+    store.write_meta(meta)
+    try:
+        failed = pregenerate(
+            store,
+            _llm_complete(settings),
+            workers=args.workers,
+            rate_per_s=args.rate,
+            retries=args.retries,
+            question=args.question,
+            template=template,
+            progress=lambda line: print(line, file=sys.stderr),
+        )
+    finally:
+        store.close()
+    print(f"{PAIRS - len(failed)}/{PAIRS} stored in {args.out}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import string
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from core.casting import CastingResult
+
+PROMPT_PATH = Path(__file__).resolve().parents[1] / "prompts" / "llm_prompt.txt"
+_FALLBACK_TEMPLATE = "我起卦占断，所问：{question}\n本卦：{base_name}\n动爻：第 {moving_line} 爻\n之卦：{changed_name}\n请结合卦象给出解读与建议。"
+FIELDS = frozenset({"question", "base_name", "moving_line", "changed_name"})
+
+_lock = threading.Lock()
+# path -> (file mtime/size stamp, compiled template)
+_loaded: dict[Path, tuple[tuple[int, int] | None, PromptTemplate]] = {}
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A template checked once up front and bound to ``str.format``."""
+
+    text: str
+    fields: frozenset[str]
+
+    def render(self, result: CastingResult, question: str) -> str:
+        return self.text.format(
+            question=question.strip(),
+            base_name=result.base.display_name,
+            moving_line=result.moving_line,
+            changed_name=result.changed.display_name,
+        )
+
+
+@lru_cache(maxsize=16)
+def compile_prompt(text: str) -> PromptTemplate:
+    fields = frozenset(name for _, name, _, _ in string.Formatter().parse(text) if name is not None)
+    unknown = fields - FIELDS
+    if unknown:
+        raise ValueError(f"unknown prompt field(s): {', '.join(sorted(unknown))}")
+    return PromptTemplate(text=text, fields=fields)
+
+
+def _stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_prompt_template(path: Path = PROMPT_PATH) -> PromptTemplate:
+    """Compiled template for ``path``; re-read only when the file's mtime or size changes."""
+    stamp = _stamp(path)
+    with _lock:
+        entry = _loaded.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        text, stamp = _FALLBACK_TEMPLATE, None
+    template = compile_prompt(text)
+    with _lock:
+        _loaded[path] = (stamp, template)
+    return template
+
+
+def reload_prompt_templates() -> None:
+    with _lock:
+        _loaded.clear()
+
+
+def load_prompt_template(path: Path = PROMPT_PATH) -> str:
+    return get_prompt_template(path).text
+
+
+def format_prompt(result: CastingResult, question: str, template: str | None = None) -> str:
+    compiled = get_prompt_template() if template is None else compile_prompt(template)
+    return compiled.render(result, question)
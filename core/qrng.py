@@ -1,108 +1,487 @@
 from __future__ import annotations
 
 import json
+import mmap
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 import os
-from typing import Iterable
-from urllib.error import URLError
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Iterable
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
 from config.settings import Settings, get_settings
+from core.entropy_file import EntropyRecorder, offset_path, write_atomic
+from core.entropy_pool import EntropyPool, PoolStats
+from core.entropy_tests import EntropyHealthTest, EntropyTestSnapshot
+from core.health import BackendHealth, BackendHealthSnapshot, BreakerState
+from core.history import EntropyHistory
+from core.spool import EntropySpool, SpoolStats
+from core.transport import HTTPTransport, TransportError, default_transport
 
 
 class QRNGError(RuntimeError):
     pass
 
 
-def _read_json(url: str, headers: dict[str, str] | None, timeout_s: float) -> dict:
-    req = Request(url, headers=headers or {})
+class EntropyHealthError(QRNGError):
+    """A backend answered, but its bytes failed the streaming health tests."""
+
+
+def _parse_json(payload: bytes) -> dict:
+    text = payload.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise QRNGError(f"Invalid JSON response: {text[:200]}") from exc
+
+
+def _read_json(
+    url: str,
+    headers: dict[str, str] | None,
+    timeout_s: float,
+    transport: HTTPTransport | None = None,
+) -> dict:
+    transport = transport or default_transport()
     try:
-        with urlopen(req, timeout=timeout_s) as resp:
-            payload = resp.read().decode("utf-8")
-    except URLError as exc:
+        payload = transport.get(url, headers, timeout_s)
+    except TransportError as exc:
         raise QRNGError(str(exc)) from exc
+    return _parse_json(payload)
+
+
+# Request building and response validation are shared by the sync clients
+# below and the asyncio clients in core.qrng_async.
+
+
+def _check_length(length: int) -> None:
+    if length < 1:
+        raise QRNGError("Length must be >= 1")
 
+
+def _lfdr_request(settings: Settings, length: int) -> tuple[str, dict[str, str] | None]:
+    _check_length(length)
+    query = urlencode({"length": str(length), "format": "HEX"})
+    return f"{settings.lfdr_url}?{query}", None
+
+
+def _parse_lfdr(data: dict, length: int) -> bytes:
+    if "qrn" not in data:
+        raise QRNGError(f"Unexpected LFDR response: {data}")
     try:
-        return json.loads(payload)
-    except json.JSONDecodeError as exc:
-        raise QRNGError(f"Invalid JSON response: {payload[:200]}") from exc
+        raw = bytes.fromhex(data["qrn"])
+    except ValueError as exc:
+        raise QRNGError("LFDR hex decode failed") from exc
+    if len(raw) != length:
+        raise QRNGError("LFDR returned unexpected byte length")
+    return raw
+
+
+def _anu_request(settings: Settings, length: int) -> tuple[str, dict[str, str] | None]:
+    _check_length(length)
+    if not settings.anu_key:
+        raise QRNGError("ANU API key not configured")
+    query = urlencode({"length": str(length), "type": "uint8"})
+    return f"{settings.anu_url}?{query}", {"x-api-key": settings.anu_key}
+
+
+def _parse_anu(data: dict, length: int) -> bytes:
+    if "data" not in data or not isinstance(data["data"], Iterable):
+        raise QRNGError(f"Unexpected ANU response: {data}")
+    values = list(data["data"])
+    if len(values) != length:
+        raise QRNGError("ANU returned unexpected array length")
+    try:
+        return bytes(int(v) & 0xFF for v in values)
+    except (TypeError, ValueError) as exc:
+        raise QRNGError("ANU data decode failed") from exc
 
 
 @dataclass(frozen=True)
 class LfdrClient:
     settings: Settings
+    transport: HTTPTransport | None = None
 
     def get_bytes(self, length: int) -> bytes:
-        if length < 1:
-            raise QRNGError("Length must be >= 1")
-        query = urlencode({"length": str(length), "format": "HEX"})
-        url = f"{self.settings.lfdr_url}?{query}"
-        data = _read_json(url, headers=None, timeout_s=self.settings.timeout_s)
-        if "qrn" not in data:
-            raise QRNGError(f"Unexpected LFDR response: {data}")
-        try:
-            raw = bytes.fromhex(data["qrn"])
-        except ValueError as exc:
-            raise QRNGError("LFDR hex decode failed") from exc
-        if len(raw) != length:
-            raise QRNGError("LFDR returned unexpected byte length")
-        return raw
+        url, headers = _lfdr_request(self.settings, length)
+        data = _read_json(url, headers, self.settings.timeout_s, self.transport)
+        return _parse_lfdr(data, length)
 
 
 @dataclass(frozen=True)
 class AnuClient:
     settings: Settings
+    transport: HTTPTransport | None = None
+
+    def get_bytes(self, length: int) -> bytes:
+        url, headers = _anu_request(self.settings, length)
+        data = _read_json(url, headers, self.settings.timeout_s, self.transport)
+        return _parse_anu(data, length)
+
+
+class FileClient:
+    """QRNG backend serving a pre-downloaded entropy file through ``mmap``.
+
+    The read offset is persisted in ``<path>.offset`` before bytes are handed
+    out, so a byte is never served twice, even across restarts.
+    """
+
+    def __init__(self, path: str | os.PathLike | None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._mmap: mmap.mmap | None = None
+        self._offset = 0
 
     def get_bytes(self, length: int) -> bytes:
+        return bytes(self.view(length))
+
+    def view(self, length: int) -> memoryview:
+        """Zero-copy slice of the next ``length`` unread bytes."""
         if length < 1:
             raise QRNGError("Length must be >= 1")
-        if not self.settings.anu_key:
-            raise QRNGError("ANU API key not configured")
-
-        query = urlencode({"length": str(length), "type": "uint8"})
-        url = f"{self.settings.anu_url}?{query}"
-        headers = {"x-api-key": self.settings.anu_key}
-        data = _read_json(url, headers=headers, timeout_s=self.settings.timeout_s)
-        if "data" not in data or not isinstance(data["data"], Iterable):
-            raise QRNGError(f"Unexpected ANU response: {data}")
-        values = list(data["data"])
-        if len(values) != length:
-            raise QRNGError("ANU returned unexpected array length")
-        try:
-            return bytes(int(v) & 0xFF for v in values)
-        except (TypeError, ValueError) as exc:
-            raise QRNGError("ANU data decode failed") from exc
+        with self._lock:
+            mapped = self._open()
+            start = self._offset
+            end = start + length
+            if end > len(mapped):
+                raise QRNGError(
+                    f"Entropy file exhausted ({len(mapped) - start} bytes left, {length} requested)"
+                )
+            write_atomic(offset_path(self.path), str(end))
+            self._offset = end
+            return memoryview(mapped)[start:end]
+
+    def remaining(self) -> int:
+        with self._lock:
+            mapped = self._open()
+            return len(mapped) - self._offset
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                try:
+                    self._mmap.close()
+                except BufferError:
+                    pass  # a view is still alive; the map closes when it is released
+                self._mmap = None
+
+    def _open(self) -> mmap.mmap:
+        if self._mmap is not None:
+            return self._mmap
+        if self.path is None:
+            raise QRNGError("Entropy file not configured")
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            raise QRNGError(f"Entropy file missing or empty: {self.path}")
+        with open(self.path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        saved = offset_path(self.path)
+        self._offset = int(saved.read_text(encoding="ascii").strip() or 0) if saved.exists() else 0
+        return self._mmap
+
+
+# Backends that serve local data: they keep their configured place in the
+# chain instead of being promoted for their (trivially low) latency.
+_LOCAL_BACKENDS = frozenset({"FILE"})
+# Sources whose bytes the recorder keeps for replay.
+_RECORDED_SOURCES = frozenset({"LFDR", "ANU"})
+
+# Hedge delay used until enough primary-backend latencies have been observed.
+DEFAULT_HEDGE_DELAY_S = 1.0
+_HEDGE_MIN_SAMPLES = 8
 
 
 class QRNGProvider:
+    """Entropy from the configured backends, via the spool and pool if enabled.
+
+    One instance is safe to share between threads: breakers, health tests,
+    history, pool, spool and recorder each guard their own state.
+    """
+
     def __init__(
         self,
         settings: Settings | None = None,
         lfdr: LfdrClient | None = None,
         anu: AnuClient | None = None,
+        file: FileClient | None = None,
     ) -> None:
         self._settings = settings or get_settings()
-        self._lfdr = lfdr or LfdrClient(self._settings)
-        self._anu = anu or AnuClient(self._settings)
-        self.history: list[tuple[str, bytes]] = []
+        given = {"LFDR": lfdr, "ANU": anu, "FILE": file}
+        self._clients = {}
+        for name in (backend.strip().upper() for backend in self._settings.backends):
+            if name not in given:
+                raise QRNGError(f"Unknown QRNG backend: {name}")
+            self._clients[name] = given[name] or _default_client(name, self._settings)
+        self._recorder: EntropyRecorder | None = None
+        if self._settings.record_file:
+            self._recorder = EntropyRecorder(self._settings.record_file)
+        self._health = _new_health(self._settings, self._clients)
+        self._entropy_tests = _new_entropy_tests(self._settings, self._clients)
+        self.history = EntropyHistory(
+            self._settings.history_capacity, primary=next(iter(self._clients), "LFDR")
+        )
+        self._closed = threading.Event()
+        self._prober: threading.Thread | None = None
+        self._prober_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._pool: EntropyPool | None = None
+        if self._settings.pool_size > 0:
+            self._pool = EntropyPool(
+                self._fetch,
+                capacity=self._settings.pool_size,
+                block_size=self._settings.pool_block_size,
+                low_watermark=self._settings.pool_low_watermark,
+                high_watermark=self._settings.pool_high_watermark,
+            )
+        self._spool: EntropySpool | None = None
+        if self._settings.spool_dir:
+            self._spool = EntropySpool(
+                self._settings.spool_dir,
+                self._fetch,
+                target_size=self._settings.spool_target,
+                max_size=self._settings.spool_max,
+                block_size=self._settings.pool_block_size,
+            )
 
     def get_bytes(self, length: int) -> bytes:
-        errors: list[str] = []
-        try:
-            data = self._lfdr.get_bytes(length)
-            self.history.append(("LFDR", data))
-            return data
-        except QRNGError as exc:
-            errors.append(f"LFDR: {exc}")
+        segments = self._take(length)
+        self.history.record(segments)
+        if len(segments) == 1:
+            return segments[0][1]
+        return b"".join(data for _, data in segments)
+
+    def _take(self, length: int) -> list[tuple[str, bytes]]:
+        # Durable spool first, then the in-memory pool, then a live fetch.
+        if self._spool is not None:
+            segments = self._spool.take(length)
+            if segments is not None:
+                return segments
+        if self._pool is not None and 0 < length <= self._pool.capacity:
+            segments = self._pool.take(length, self._settings.timeout_s)
+            if segments is None:
+                reason = self._pool.stats().last_error or "refill timed out"
+                raise QRNGError(f"Entropy pool empty: {reason}")
+            return segments
+        return [self._fetch(length)]
+
+    def pool_stats(self) -> PoolStats | None:
+        if self._pool is None:
+            return None
+        return self._pool.stats()
+
+    def spool_stats(self) -> SpoolStats | None:
+        if self._spool is None:
+            return None
+        return self._spool.stats()
+
+    def health(self) -> list[BackendHealthSnapshot]:
+        return [health.snapshot() for health in self._health.values()]
+
+    def entropy_tests(self) -> list[EntropyTestSnapshot]:
+        return [test.snapshot() for test in self._entropy_tests.values()]
+
+    def hedge_delay(self) -> float:
+        if self._settings.hedge_delay_s is not None:
+            return self._settings.hedge_delay_s
+        primary = self._health[self._backends()[0][0]]
+        p95 = primary.latency_quantile(0.95, min_samples=_HEDGE_MIN_SAMPLES)
+        return DEFAULT_HEDGE_DELAY_S if p95 is None else p95
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._spool is not None:
+            self._spool.close()
+        if self._pool is not None:
+            self._pool.close()
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._recorder is not None:
+            self._recorder.close()
+        for client in self._clients.values():
+            if isinstance(client, FileClient):
+                client.close()
+
+    def _backends(self) -> list[tuple[str, Callable[[int], bytes]]]:
+        return [(name, self._clients[name].get_bytes) for name in _order_backends(self._health)]
+
+    def _call(self, name: str, fn: Callable[[int], bytes], length: int) -> bytes:
+        health = self._health[name]
+        start = time.monotonic()
         try:
-            data = self._anu.get_bytes(length)
-            self.history.append(("ANU", data))
-            return data
+            data = fn(length)
+            _check_entropy(self._entropy_tests, name, data)
         except QRNGError as exc:
-            errors.append(f"ANU: {exc}")
+            _record_failure(health, exc)
+            if health.state is BreakerState.OPEN:
+                self._start_prober()
+            raise
+        health.record_success(time.monotonic() - start)
+        return data
+
+    def _start_prober(self) -> None:
+        with self._prober_lock:
+            if self._prober is None and not self._closed.is_set():
+                self._prober = threading.Thread(target=self._probe_loop, name="qrng-probe", daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self) -> None:
+        # Re-probe open backends off the request path, one byte at a time.
+        interval = max(0.05, min(h.cooldown_s for h in self._health.values()) / 2)
+        while not self._closed.wait(interval):
+            for name, health in self._health.items():
+                if not health.begin_probe():
+                    continue
+                start = time.monotonic()
+                try:
+                    _check_entropy(self._entropy_tests, name, self._clients[name].get_bytes(1))
+                except QRNGError as exc:
+                    _record_failure(health, exc)
+                else:
+                    health.record_success(time.monotonic() - start)
+
+    def _fetch(self, length: int) -> tuple[str, bytes]:
+        source, data = self._fetch_backends(length)
+        if self._recorder is not None and source in _RECORDED_SOURCES:
+            self._recorder.append(source, data)
+        return source, data
+
+    def _fetch_backends(self, length: int) -> tuple[str, bytes]:
+        errors: list[str] = []
+        if self._settings.hedge:
+            result = self._fetch_hedged(length, errors)
+            if result is not None:
+                return result
+        else:
+            for name, fn in self._backends():
+                try:
+                    return name, self._call(name, fn, length)
+                except QRNGError as exc:
+                    errors.append(f"{name}: {exc}")
         if self._settings.allow_fallback:
-            data = os.urandom(length)
-            self.history.append(("CLASSIC", data))
-            return data
+            return "CLASSIC", os.urandom(length)
         raise QRNGError("All QRNG backends failed: " + " | ".join(errors))
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        # Created on first use; concurrent callers must not each build one.
+        with self._executor_lock:
+            if self._closed.is_set():
+                raise QRNGError("QRNG provider is closed")
+            if self._executor is None:
+                # Losing requests keep their worker until they time out, so
+                # size for QRNG_MAX_IN_FLIGHT concurrent fetches, each of
+                # which may be racing every backend.
+                workers = max(4, self._settings.max_in_flight * len(self._clients))
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qrng-hedge")
+            return self._executor
+
+    def _fetch_hedged(self, length: int, errors: list[str]) -> tuple[str, bytes] | None:
+        # Start the primary backend; if it has not answered within the hedge
+        # delay (or has failed), race the next one. First valid answer wins.
+        # The delay counts from when a request starts running, not from when
+        # it was queued behind other callers' requests.
+        executor = self._hedge_executor()
+        queue = list(self._backends())
+        pending: dict[Future, str] = {}
+
+        def launch() -> None:
+            name, fn = queue.pop(0)
+            started = threading.Event()
+
+            def call() -> bytes:
+                started.set()
+                return self._call(name, fn, length)
+
+            future = executor.submit(call)
+            future.add_done_callback(lambda _: started.set())  # cancelled before it ran
+            pending[future] = name
+            started.wait()
+
+        launch()
+        while pending:
+            timeout = self.hedge_delay() if queue else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    data = future.result()
+                except QRNGError as exc:
+                    errors.append(f"{name}: {exc}")
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                return name, data
+            if queue and not pending:
+                launch()
+        return None
+
+
+def _default_client(name: str, settings: Settings) -> LfdrClient | AnuClient | FileClient:
+    if name == "LFDR":
+        return LfdrClient(settings)
+    if name == "ANU":
+        return AnuClient(settings)
+    return FileClient(settings.entropy_file)
+
+
+def _new_health(settings: Settings, names: Iterable[str]) -> dict[str, BackendHealth]:
+    return {
+        name: BackendHealth(
+            name,
+            failure_threshold=settings.breaker_failures,
+            cooldown_s=settings.breaker_cooldown_s,
+        )
+        for name in names
+    }
+
+
+def _new_entropy_tests(settings: Settings, names: Iterable[str]) -> dict[str, EntropyHealthTest]:
+    if not settings.health_tests:
+        return {}
+    return {name: EntropyHealthTest(name, min_entropy=settings.health_min_entropy) for name in names}
+
+
+def _check_entropy(tests: dict[str, EntropyHealthTest], name: str, data: bytes) -> None:
+    # A source failing its health tests is treated like a failed request:
+    # the bytes are dropped and the backend is quarantined (see below).
+    test = tests.get(name)
+    if test is None:
+        return
+    reason = test.update(data)
+    if reason is not None:
+        raise EntropyHealthError(f"{name} failed health test: {reason}")
+
+
+def _record_failure(health: BackendHealth, exc: QRNGError) -> None:
+    # A health-test failure opens the breaker at once: a stuck source would
+    # otherwise serve its bytes on the requests between test failures.
+    health.record_failure(str(exc), trip=isinstance(exc, EntropyHealthError))
+
+
+def _order_backends(health: dict[str, BackendHealth]) -> list[str]:
+    # Closed network backends ordered by observed latency (unmeasured ones
+    # keep their configured place behind measured ones); local backends stay
+    # where the settings put them. If every breaker is open there is nothing
+    # better to do than try them all in order.
+    names = [name for name, state in health.items() if state.available()]
+    if not names:
+        names = list(health)
+    adaptive = iter(
+        sorted(
+            (name for name in names if name not in _LOCAL_BACKENDS),
+            key=lambda name: _latency_key(health[name]),
+        )
+    )
+    return [name if name in _LOCAL_BACKENDS else next(adaptive) for name in names]
+
+
+def _latency_key(health: BackendHealth) -> float:
+    latency = health.latency_ewma_s
+    return float("inf") if latency is None else latency
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+
+from config.settings import Settings, get_settings
+from core.entropy_tests import EntropyTestSnapshot
+from core.health import BackendHealthSnapshot, BreakerState
+from core.history import EntropyHistory
+from core.qrng import (
+    FileClient,
+    QRNGError,
+    _anu_request,
+    _check_entropy,
+    _lfdr_request,
+    _new_entropy_tests,
+    _new_health,
+    _order_backends,
+    _parse_anu,
+    _parse_json,
+    _parse_lfdr,
+    _record_failure,
+)
+from core.transport import AsyncHTTPTransport, TransportError
+
+
+async def _read_json_async(
+    url: str,
+    headers: dict[str, str] | None,
+    timeout_s: float,
+    transport: AsyncHTTPTransport,
+) -> dict:
+    try:
+        payload = await transport.get(url, headers, timeout_s)
+    except TransportError as exc:
+        raise QRNGError(str(exc)) from exc
+    return _parse_json(payload)
+
+
+@dataclass(frozen=True)
+class AsyncLfdrClient:
+    settings: Settings
+    transport: AsyncHTTPTransport = field(default_factory=AsyncHTTPTransport)
+
+    async def get_bytes(self, length: int) -> bytes:
+        url, headers = _lfdr_request(self.settings, length)
+        data = await _read_json_async(url, headers, self.settings.timeout_s, self.transport)
+        return _parse_lfdr(data, length)
+
+
+@dataclass(frozen=True)
+class AsyncAnuClient:
+    settings: Settings
+    transport: AsyncHTTPTransport = field(default_factory=AsyncHTTPTransport)
+
+    async def get_bytes(self, length: int) -> bytes:
+        url, headers = _anu_request(self.settings, length)
+        data = await _read_json_async(url, headers, self.settings.timeout_s, self.transport)
+        return _parse_anu(data, length)
+
+
+class AsyncFileClient:
+    """FileClient for the async provider.
+
+    Each read fsyncs the persisted offset, so it runs on a worker thread
+    rather than blocking the event loop.
+    """
+
+    def __init__(self, path: str | None) -> None:
+        self.file = FileClient(path)
+
+    async def get_bytes(self, length: int) -> bytes:
+        return await asyncio.to_thread(self.file.get_bytes, length)
+
+
+class AsyncQRNGProvider:
+    """asyncio version of QRNGProvider over the backends in ``settings.backends``.
+
+    ``get_bytes`` may be cancelled at any point, takes an optional per-call
+    deadline, and at most ``max_in_flight`` calls run concurrently.
+    """
+
+    def __init__(
+        self,
+        settings: Settings | None = None,
+        lfdr: AsyncLfdrClient | None = None,
+        anu: AsyncAnuClient | None = None,
+        max_in_flight: int | None = None,
+        file: AsyncFileClient | None = None,
+    ) -> None:
+        self._settings = settings or get_settings()
+        self._transport = AsyncHTTPTransport()
+        given = {"LFDR": lfdr, "ANU": anu, "FILE": file}
+        self._clients = {}
+        for name in (backend.strip().upper() for backend in self._settings.backends):
+            if name not in given:
+                raise QRNGError(f"Unknown QRNG backend: {name}")
+            self._clients[name] = given[name] or self._default_client(name)
+        self._health = _new_health(self._settings, self._clients)
+        self._entropy_tests = _new_entropy_tests(self._settings, self._clients)
+        self._limit = asyncio.Semaphore(max_in_flight or self._settings.max_in_flight)
+        self._probes: set[asyncio.Task] = set()
+        self.history = EntropyHistory(
+            self._settings.history_capacity, primary=next(iter(self._clients), "LFDR")
+        )
+
+    async def get_bytes(self, length: int, deadline_s: float | None = None) -> bytes:
+        try:
+            source, data = await asyncio.wait_for(self._fetch(length), deadline_s)
+        except asyncio.TimeoutError as exc:
+            raise QRNGError(f"QRNG deadline of {deadline_s}s exceeded") from exc
+        self.history.record([(source, data)])
+        return data
+
+    def health(self) -> list[BackendHealthSnapshot]:
+        return [health.snapshot() for health in self._health.values()]
+
+    def entropy_tests(self) -> list[EntropyTestSnapshot]:
+        return [test.snapshot() for test in self._entropy_tests.values()]
+
+    async def aclose(self) -> None:
+        for task in list(self._probes):
+            task.cancel()
+        await self._transport.aclose()
+        for client in self._clients.values():
+            if isinstance(client, AsyncFileClient):
+                client.file.close()
+
+    def _default_client(self, name: str) -> AsyncLfdrClient | AsyncAnuClient | AsyncFileClient:
+        if name == "LFDR":
+            return AsyncLfdrClient(self._settings, self._transport)
+        if name == "ANU":
+            return AsyncAnuClient(self._settings, self._transport)
+        return AsyncFileClient(self._settings.entropy_file)
+
+    async def _fetch(self, length: int) -> tuple[str, bytes]:
+        async with self._limit:
+            self._schedule_probes()
+            errors: list[str] = []
+            for name in _order_backends(self._health):
+                health = self._health[name]
+                start = time.monotonic()
+                try:
+                    data = await self._clients[name].get_bytes(length)
+                    _check_entropy(self._entropy_tests, name, data)
+                except QRNGError as exc:
+                    _record_failure(health, exc)
+                    errors.append(f"{name}: {exc}")
+                    continue
+                health.record_success(time.monotonic() - start)
+                return name, data
+        if self._settings.allow_fallback:
+            return "CLASSIC", os.urandom(length)
+        raise QRNGError("All QRNG backends failed: " + " | ".join(errors))
+
+    def _schedule_probes(self) -> None:
+        # Open breakers past their cooldown are probed in a side task so the
+        # caller never waits on a backend that is known to be failing.
+        for name, health in self._health.items():
+            if health.state is BreakerState.OPEN and health.begin_probe():
+                task = asyncio.ensure_future(self._probe(name))
+                self._probes.add(task)
+                task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, name: str) -> None:
+        health = self._health[name]
+        start = time.monotonic()
+        try:
+            _check_entropy(self._entropy_tests, name, await self._clients[name].get_bytes(1))
+        except QRNGError as exc:
+            _record_failure(health, exc)
+        except asyncio.CancelledError:
+            health.record_failure("probe cancelled")
+            raise
+        else:
+            health.record_success(time.monotonic() - start)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Classic token bucket: ``burst`` tokens, refilled at ``rate_per_s``.
+
+    A rate of zero or less disables the limit.
+    """
+
+    def __init__(self, rate_per_s: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate_per_s = rate_per_s
+        self.burst = max(1.0, float(burst))
+        self._clock = clock
+        self._tokens = self.burst
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def try_take(self, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0.0 on success, else seconds until they would be there.
+
+        A cost above ``burst`` could never be granted and raises ValueError.
+        """
+        if self.rate_per_s <= 0:
+            return 0.0
+        if cost > self.burst:
+            raise ValueError(f"cost {cost} exceeds burst {self.burst}")
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate_per_s)
+            self._stamp = now
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return 0.0
+            return (cost - self._tokens) / self.rate_per_s
+
+    def refund(self, cost: float = 1.0) -> None:
+        """Give back tokens taken for work that was never used (capped at ``burst``)."""
+        if self.rate_per_s <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + cost)
+
+    def idle_since(self) -> float:
+        with self._lock:
+            return self._stamp
+
+    def full(self) -> bool:
+        with self._lock:
+            refilled = self._tokens + (self._clock() - self._stamp) * self.rate_per_s
+            return refilled >= self.burst
+
+
+class SessionQuotas:
+    """One token bucket per session id for a shared resource.
+
+    Buckets that have refilled completely and sat unused for ``idle_s`` are
+    dropped, so the table only holds recently active sessions.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        burst: float,
+        idle_s: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.idle_s = idle_s
+        self._clock = clock
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+
+    def try_take(self, session: str, cost: float = 1.0) -> float:
+        if self.rate_per_s <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            if now - self._last_sweep >= min(self.idle_s, 60.0):
+                self._sweep(now)
+            bucket = self._buckets.get(session)
+            if bucket is None:
+                bucket = self._buckets[session] = TokenBucket(self.rate_per_s, self.burst, self._clock)
+        return bucket.try_take(cost)
+
+    def refund(self, session: str, cost: float = 1.0) -> None:
+        """Return ``cost`` to the session's bucket; a no-op once the bucket was dropped."""
+        with self._lock:
+            bucket = self._buckets.get(session)
+        if bucket is not None:
+            bucket.refund(cost)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        stale = [
+            session
+            for session, bucket in self._buckets.items()
+            if now - bucket.idle_since() >= self.idle_s and bucket.full()
+        ]
+        for session in stale:
+            del self._buckets[session]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Generator, Iterable
+
+_TRAILING_PUNCT = "?？!！。.,，、~～…；;:： "
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question: NFKC, single spaces, no trailing punctuation."""
+    text = unicodedata.normalize("NFKC", question)
+    return _SPACES.sub(" ", text).strip().rstrip(_TRAILING_PUNCT)
+
+
+def cache_key(prompt: str, model: str, question: str = "") -> str:
+    """Key of a first-turn answer: the rendered prompt and the model.
+
+    ``question`` (as rendered into the prompt) is swapped for its normalized
+    form in the key only, so near-identical questions share a key while the
+    model still receives the question as typed.
+    """
+    stripped = question.strip()
+    if stripped:
+        prompt = prompt.replace(stripped, normalize_question(stripped))
+    payload = json.dumps([prompt, model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    memory_hits: int
+    disk_hits: int
+    stores: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """LRU + TTL cache of finished LLM answers, with an optional SQLite tier.
+
+    ``stream`` replays a cached answer through the same generator interface
+    as a live response; a live response is stored only once it has streamed
+    to the end.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        ttl_s: float = 7 * 86400.0,
+        path: str | Path | None = None,
+        replay_chars: int = 24,
+    ) -> None:
+        self.capacity = max(1, capacity)
+        self.ttl_s = ttl_s
+        self.replay_chars = max(1, replay_chars)
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._memory_hits = self._disk_hits = self._stores = 0
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL NOT NULL, text TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_s:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                self._memory_hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+            if self._db is not None:
+                row = self._db.execute("SELECT created, text FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[0] <= self.ttl_s:
+                    self._remember(key, row[0], row[1])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    return row[1]
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            self._misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        if not text:
+            return
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, text)
+            self._stores += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, created, text) VALUES (?, ?, ?)",
+                    (key, created, text),
+                )
+                self._db.commit()
+
+    def stream(self, key: str, produce: Callable[[], Iterable[str]]) -> Generator[str, None, None]:
+        cached = self.get(key)
+        if cached is not None:
+            for i in range(0, len(cached), self.replay_chars):
+                yield cached[i:i + self.replay_chars]
+            return
+        chunks: list[str] = []
+        for piece in produce():
+            chunks.append(piece)
+            yield piece
+        self.put(key, "".join(chunks).strip())
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                memory_hits=self._memory_hits,
+                disk_hits=self._disk_hits,
+                stores=self._stores,
+                entries=len(self._memory),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, created: float, text: str) -> None:
+        self._memory[key] = (created, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
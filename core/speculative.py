@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, Iterable
+
+
+class SpeculativeCancelled(RuntimeError):
+    pass
+
+
+class SpeculativeStream:
+    """A streamed answer produced in the background into a buffer.
+
+    ``attach`` replays what has arrived so far and then follows the live
+    stream. If nobody attaches within ``timeout_s`` a timer cancels the
+    stream even while the producer is blocked, and calls ``release`` (e.g.
+    to return an LLM slot) right away; the producer itself is closed at its
+    next chunk, which drops the upstream request. ``release`` runs exactly
+    once: on that timeout, on ``cancel``, or when the producer finishes.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        produce: Callable[[], Iterable[str]],
+        timeout_s: float,
+        clock: Callable[[], float] = time.monotonic,
+        release: Callable[[], None] | None = None,
+    ) -> None:
+        self.key = key
+        self._produce = produce
+        self._clock = clock
+        self._release = release
+        self.created = clock()
+        self.deadline = self.created + timeout_s
+        self._cond = threading.Condition()
+        self._chunks: list[str] = []
+        self._done = False
+        self._error: BaseException | None = None
+        self._attached = False
+        self._cancelled = False
+
+    @property
+    def done(self) -> bool:
+        with self._cond:
+            return self._done
+
+    @property
+    def cancelled(self) -> bool:
+        with self._cond:
+            return self._cancelled
+
+    @property
+    def text(self) -> str:
+        with self._cond:
+            return "".join(self._chunks)
+
+    def expired(self) -> bool:
+        with self._cond:
+            return not self._attached and self._clock() >= self.deadline
+
+    def claim(self) -> bool:
+        """Mark the stream as wanted; False if it was already cancelled or expired."""
+        with self._cond:
+            if self._cancelled or (not self._attached and self._clock() >= self.deadline):
+                self._cancelled = True
+                return False
+            self._attached = True
+            return True
+
+    def run(self) -> None:
+        timer = threading.Timer(max(0.0, self.deadline - self._clock()), self._expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            self._pump()
+        finally:
+            timer.cancel()
+            self._release_once()
+
+    def _pump(self) -> None:
+        stream = iter(self._produce())
+        try:
+            for piece in stream:
+                with self._cond:
+                    if self._cancelled or (not self._attached and self._clock() >= self.deadline):
+                        self._cancelled = True
+                        break
+                    self._chunks.append(piece)
+                    self._cond.notify_all()
+        except Exception as exc:  # noqa: BLE001 - handed to the reader
+            with self._cond:
+                self._error = exc
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def cancel(self) -> None:
+        with self._cond:
+            if not self._done:
+                self._cancelled = True
+            self._cond.notify_all()
+            unattached = not self._attached
+        if unattached:
+            self._release_once()
+
+    def _expire(self) -> None:
+        # Timer thread: fires whether or not the producer is making progress.
+        with self._cond:
+            if self._attached or self._done:
+                return
+            self._cancelled = True
+            self._cond.notify_all()
+        self._release_once()
+
+    def _release_once(self) -> None:
+        with self._cond:
+            release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def attach(self) -> Generator[str, None, None]:
+        with self._cond:
+            if self._cancelled:
+                raise SpeculativeCancelled("speculative answer was cancelled")
+            self._attached = True
+        sent = 0
+        while True:
+            with self._cond:
+                while sent == len(self._chunks) and not self._done:
+                    self._cond.wait()
+                pending = self._chunks[sent:]
+                done, error, cancelled = self._done, self._error, self._cancelled
+            if pending:
+                sent += len(pending)
+                yield "".join(pending)
+                continue
+            if error is not None:
+                raise error
+            if cancelled:
+                raise SpeculativeCancelled("speculative answer was cancelled")
+            if done:
+                return
+
+
+class SpeculativeStreams:
+    """At most one speculative answer per session, run on a small worker pool."""
+
+    def __init__(
+        self,
+        timeout_s: float = 60.0,
+        workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.timeout_s = timeout_s
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="llm-speculative")
+        self._lock = threading.Lock()
+        self._streams: dict[str, SpeculativeStream] = {}
+        self.started = self.claimed = self.expired = 0
+
+    def start(
+        self,
+        session: str,
+        key: str,
+        produce: Callable[[], Iterable[str]],
+        release: Callable[[], None] | None = None,
+    ) -> SpeculativeStream:
+        stream = SpeculativeStream(key, produce, self.timeout_s, self._clock, release)
+        with self._lock:
+            self._sweep()
+            previous = self._streams.pop(session, None)
+            self._streams[session] = stream
+            self.started += 1
+        if previous is not None:
+            previous.cancel()
+        try:
+            self._executor.submit(stream.run)
+        except RuntimeError:  # closed: the stream never runs, so give back what it holds
+            stream.cancel()
+            raise
+        return stream
+
+    def claim(self, session: str, key: str) -> SpeculativeStream | None:
+        """Take the session's stream if it answers ``key`` and is still usable."""
+        with self._lock:
+            stream = self._streams.get(session)
+            if stream is None or stream.key != key:
+                return None
+            del self._streams[session]
+            if not stream.claim():
+                self.expired += 1
+                return None
+            self.claimed += 1
+            return stream
+
+    def discard(self, session: str) -> None:
+        with self._lock:
+            stream = self._streams.pop(session, None)
+        if stream is not None:
+            stream.cancel()
+
+    def close(self) -> None:
+        with self._lock:
+            streams = list(self._streams.values())
+            self._streams.clear()
+        for stream in streams:
+            stream.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _sweep(self) -> None:
+        for session, stream in list(self._streams.items()):
+            if stream.expired():
+                del self._streams[session]
+                stream.cancel()
+                self.expired += 1
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from core.entropy_file import EntropyRecorder, read_index, write_atomic
+
+Fetch = Callable[[int], tuple[str, bytes]]
+
+_CHECKPOINT = "consumed"
+
+
+@dataclass(frozen=True)
+class SpoolStats:
+    available: int
+    disk_bytes: int
+    segments: int
+    served: int
+    topups: int
+    topup_errors: int
+    last_error: str | None
+
+
+@dataclass
+class _Segment:
+    number: int
+    path: Path
+    runs: list[tuple[str, int, int]] = field(default_factory=list)  # source, offset, length
+
+    @property
+    def size(self) -> int:
+        if not self.runs:
+            return 0
+        _, offset, length = self.runs[-1]
+        return offset + length
+
+
+class EntropySpool:
+    """Durable on-disk spool of prefetched quantum bytes.
+
+    Bytes live in append-only segment files (the entropy_file data + index
+    format, so every run keeps its source tag). The read position is a
+    ``segment offset`` checkpoint rewritten atomically *before* bytes are
+    handed out, so no byte is served twice, even across crashes. Fully
+    consumed segments are deleted, including the one being appended to. A
+    background thread tops the spool up
+    towards ``target_size`` without letting the directory exceed
+    ``max_size``. One process per spool directory.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        fetch: Fetch,
+        target_size: int = 4096,
+        max_size: int = 1 << 20,
+        block_size: int = 1024,
+        segment_size: int = 64 * 1024,
+        retry_delay_s: float = 1.0,
+        background: bool = True,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._fetch = fetch
+        self.target_size = target_size
+        self.max_size = max(max_size, 1)
+        self.block_size = max(1, block_size)
+        self.segment_size = max(1, min(segment_size, self.max_size))
+        self._retry_delay_s = retry_delay_s
+
+        self._cond = threading.Condition()
+        self._segments = self._load_segments()
+        self._cursor = self._load_checkpoint()
+        self._writer: EntropyRecorder | None = None
+        self._served = 0
+        self._topups = 0
+        self._topup_errors = 0
+        self._last_error: str | None = None
+        self._closed = False
+        self._compact()
+
+        self._thread: threading.Thread | None = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="qrng-spool", daemon=True)
+            self._thread.start()
+
+    def take(self, length: int) -> list[tuple[str, bytes]] | None:
+        """Pop ``length`` bytes as ``(source, data)`` runs, or None if not spooled yet."""
+        with self._cond:
+            if length < 1 or self._available() < length:
+                self._cond.notify_all()
+                return None
+            segments, cursor = self._read(length)
+            write_atomic(self.directory / _CHECKPOINT, f"{cursor[0]} {cursor[1]}\n")
+            self._cursor = cursor
+            self._served += length
+            self._compact()
+            self._cond.notify_all()
+            return segments
+
+    def fill(self) -> None:
+        """Top the spool up to ``target_size`` on the calling thread."""
+        while True:
+            with self._cond:
+                want = self._wanted()
+                if self._closed or want < 1:
+                    return
+            source, data = self._fetch(want)
+            with self._cond:
+                self._append(source, data)
+
+    def stats(self) -> SpoolStats:
+        with self._cond:
+            return SpoolStats(
+                available=self._available(),
+                disk_bytes=self._disk_bytes(),
+                segments=len(self._segments),
+                served=self._served,
+                topups=self._topups,
+                topup_errors=self._topup_errors,
+                last_error=self._last_error,
+            )
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        with self._cond:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and self._wanted() < 1:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                self.fill()
+            except Exception as exc:  # noqa: BLE001 - keep the top-up thread alive
+                with self._cond:
+                    self._topup_errors += 1
+                    self._last_error = str(exc)
+                    self._cond.wait(self._retry_delay_s)
+
+    def _wanted(self) -> int:
+        return min(
+            self.block_size,
+            self.target_size - self._available(),
+            self.max_size - self._disk_bytes(),
+        )
+
+    def _available(self) -> int:
+        seg_no, offset = self._cursor
+        return sum(s.size for s in self._segments if s.number >= seg_no) - offset
+
+    def _disk_bytes(self) -> int:
+        return sum(s.size for s in self._segments)
+
+    def _read(self, length: int) -> tuple[list[tuple[str, bytes]], tuple[int, int]]:
+        out: list[tuple[str, bytes]] = []
+        seg_no, offset = self._cursor
+        remaining = length
+        for segment in self._segments:
+            if segment.number < seg_no or remaining == 0:
+                continue
+            with open(segment.path, "rb") as fh:
+                for source, run_offset, run_length in segment.runs:
+                    run_end = run_offset + run_length
+                    if run_end <= offset or remaining == 0:
+                        continue
+                    start = max(run_offset, offset)
+                    n = min(run_end - start, remaining)
+                    fh.seek(start)
+                    out.append((source, fh.read(n)))
+                    offset = start + n
+                    remaining -= n
+            seg_no = segment.number
+            if remaining:
+                offset = 0
+        return out, (seg_no, offset)
+
+    def _append(self, source: str, data: bytes) -> None:
+        if not data:
+            return
+        active = self._segments[-1] if self._segments else None
+        if active is None or active.size >= self.segment_size:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            number = (active.number if active else self._cursor[0]) + 1
+            if active is None:
+                self._cursor = (number, 0)
+            active = _Segment(number, self.directory / f"seg-{number:08d}.bin")
+            self._segments.append(active)
+        if self._writer is None:
+            self._writer = EntropyRecorder(active.path)
+        offset = self._writer.size
+        self._writer.append(source, data)
+        active.runs.append((source, offset, len(data)))
+        self._topups += 1
+        self._last_error = None
+
+    def _compact(self) -> None:
+        # Everything before the cursor's segment has been served; so has the
+        # cursor's segment itself once the cursor reaches its end. The active
+        # segment is dropped too, or a spool whose max_size is close to its
+        # segment size would stop topping up once it had served max_size.
+        seg_no, offset = self._cursor
+        keep: list[_Segment] = []
+        for segment in self._segments:
+            consumed = segment.number < seg_no or (
+                segment.number == seg_no and 0 < segment.size <= offset
+            )
+            if not consumed:
+                keep.append(segment)
+                continue
+            if segment is self._segments[-1] and self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for path in (segment.path, Path(f"{segment.path}.idx")):
+                path.unlink(missing_ok=True)
+        if keep and keep[0].number > seg_no:
+            self._cursor = (keep[0].number, 0)
+        elif not keep and self._segments:
+            self._cursor = (max(seg_no, self._segments[-1].number) + 1, 0)
+        self._segments = keep
+
+    def _load_segments(self) -> list[_Segment]:
+        segments = []
+        for path in sorted(self.directory.glob("seg-*.bin")):
+            number = int(path.stem.split("-")[1])
+            size = path.stat().st_size
+            # Runs whose data did not reach the disk before a crash are dropped,
+            # and so is data whose index record did not: the next append must
+            # start right after the last indexed run, not after a gap.
+            runs = [run for run in read_index(path) if run[1] + run[2] <= size]
+            segment = _Segment(number, path, runs)
+            if size > segment.size:
+                os.truncate(path, segment.size)
+            segments.append(segment)
+        return segments
+
+    def _load_checkpoint(self) -> tuple[int, int]:
+        path = self.directory / _CHECKPOINT
+        if path.exists():
+            seg_no, offset = path.read_text(encoding="ascii").split()
+            if not self._segments:
+                # Crashed after the last segment was served and deleted.
+                return int(seg_no) + 1, 0
+            return int(seg_no), int(offset)
+        if self._segments:
+            return self._segments[0].number, 0
+        return 0, 0
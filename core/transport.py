@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import ssl
+import threading
+import time
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass_environment
+
+
+class TransportError(OSError):
+    pass
+
+
+# Errors that mean a reused keep-alive connection was closed by the peer.
+_STALE_ERRORS = (ConnectionError, HTTPException)
+
+_PoolKey = tuple[str, str, int]
+
+_REDIRECTS = frozenset({301, 302, 303, 307, 308})
+
+
+class _Proxy:
+    """An HTTP proxy: plain requests go to it in absolute form, HTTPS is tunnelled."""
+
+    def __init__(self, url: str) -> None:
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise TransportError(f"Unsupported proxy: {url}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.headers: dict[str, str] = {}
+        if parts.username:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            self.headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode("ascii")
+
+
+def _proxy_for(proxies: dict[str, str], key: _PoolKey) -> _Proxy | None:
+    scheme, host, port = key
+    url = proxies.get(scheme)
+    if not url or proxy_bypass_environment(f"{host}:{port}", proxies):
+        return None
+    return _Proxy(url)
+
+
+def _redirect(url: str, status: int, location: str | None, origin: tuple[str, str]) -> tuple[str, bool]:
+    """The next URL of a redirect, and whether it stays on ``origin``."""
+    if status not in _REDIRECTS or not location:
+        raise TransportError(f"HTTP Error {status} (no redirect target)")
+    url = urljoin(url, location)
+    return url, urlsplit(url)[:2] == origin
+
+
+def _split_url(url: str) -> tuple[_PoolKey, str]:
+    parts = urlsplit(url)
+    if parts.scheme not in {"http", "https"} or not parts.hostname:
+        raise TransportError(f"Unsupported URL: {url}")
+    key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    return key, target
+
+
+class HTTPTransport:
+    """Thread-safe pool of persistent HTTP(S) connections, keyed by host.
+
+    At most ``max_idle_per_host`` idle connections are kept per host; idle
+    connections older than ``idle_timeout_s`` are closed instead of reused.
+    A request that fails on a reused connection is retried once on a fresh
+    one, since the server may have dropped it while it sat in the pool.
+
+    Proxies come from ``proxies`` (default: ``urllib.request.getproxies()``,
+    i.e. ``HTTP(S)_PROXY`` / ``NO_PROXY``). Redirects are followed up to
+    ``max_redirects`` times; request headers are only resent to the same
+    scheme and host.
+    """
+
+    def __init__(
+        self,
+        max_idle_per_host: int = 4,
+        idle_timeout_s: float = 30.0,
+        proxies: dict[str, str] | None = None,
+        max_redirects: int = 5,
+    ) -> None:
+        self._max_idle = max(0, max_idle_per_host)
+        self._idle_timeout_s = idle_timeout_s
+        self._proxies = getproxies() if proxies is None else proxies
+        self._max_redirects = max(0, max_redirects)
+        self._lock = threading.Lock()
+        self._idle: dict[_PoolKey, list[tuple[HTTPConnection, float]]] = {}
+        self._routes: dict[_PoolKey, _Proxy | None] = {}
+        self.connections_opened = 0
+
+    def get(self, url: str, headers: dict[str, str] | None, timeout_s: float) -> bytes:
+        origin = urlsplit(url)[:2]
+        for _ in range(self._max_redirects + 1):
+            status, body, location = self._get(url, headers, timeout_s)
+            if 300 <= status < 400:
+                url, same_origin = _redirect(url, status, location, origin)
+                if not same_origin:
+                    headers = None
+                continue
+            if status >= 400:
+                raise TransportError(f"HTTP Error {status}")
+            return body
+        raise TransportError(f"more than {self._max_redirects} redirects")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return sum(len(conns) for conns in self._idle.values())
+
+    def _get(self, url: str, headers: dict[str, str] | None, timeout_s: float) -> tuple[int, bytes, str | None]:
+        key, target = _split_url(url)
+        proxy = self._route(key)
+        if proxy is not None and key[0] == "http":
+            # Plain HTTP through a proxy: absolute-form target plus proxy credentials.
+            target = url.split("#", 1)[0]
+            headers = {**proxy.headers, **(headers or {})}
+        conn, reused = self._acquire(key, timeout_s)
+        try:
+            result = self._request(conn, target, headers, timeout_s)
+        except (HTTPException, OSError) as exc:
+            conn.close()
+            if not (reused and isinstance(exc, _STALE_ERRORS)):
+                raise TransportError(str(exc)) from exc
+            conn = self._connect(key, timeout_s)
+            try:
+                result = self._request(conn, target, headers, timeout_s)
+            except (HTTPException, OSError) as retry_exc:
+                conn.close()
+                raise TransportError(str(retry_exc)) from retry_exc
+
+        status, body, location, reusable = result
+        if reusable:
+            self._release(key, conn)
+        else:
+            conn.close()
+        return status, body, location
+
+    def _request(
+        self,
+        conn: HTTPConnection,
+        target: str,
+        headers: dict[str, str] | None,
+        timeout_s: float,
+    ) -> tuple[int, bytes, str | None, bool]:
+        conn.timeout = timeout_s
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout_s)
+        conn.request("GET", target, headers=headers or {})
+        resp = conn.getresponse()
+        body = resp.read()
+        return resp.status, body, resp.getheader("Location"), not resp.will_close
+
+    def _route(self, key: _PoolKey) -> _Proxy | None:
+        with self._lock:
+            if key in self._routes:
+                return self._routes[key]
+        proxy = _proxy_for(self._proxies, key)
+        with self._lock:
+            self._routes[key] = proxy
+        return proxy
+
+    def _acquire(self, key: _PoolKey, timeout_s: float) -> tuple[HTTPConnection, bool]:
+        now = time.monotonic()
+        expired: list[HTTPConnection] = []
+        conn: HTTPConnection | None = None
+        with self._lock:
+            conns = self._idle.get(key, [])
+            while conns:
+                candidate, last_used = conns.pop()
+                if now - last_used > self._idle_timeout_s:
+                    expired.append(candidate)
+                    continue
+                conn = candidate
+                break
+        for stale in expired:
+            stale.close()
+        if conn is not None:
+            return conn, True
+        return self._connect(key, timeout_s), False
+
+    def _connect(self, key: _PoolKey, timeout_s: float) -> HTTPConnection:
+        scheme, host, port = key
+        cls = HTTPSConnection if scheme == "https" else HTTPConnection
+        proxy = self._route(key)
+        with self._lock:
+            self.connections_opened += 1
+        if proxy is None:
+            return cls(host, port, timeout=timeout_s)
+        conn = cls(proxy.host, proxy.port, timeout=timeout_s)
+        if scheme == "https":
+            conn.set_tunnel(host, port, headers=proxy.headers)
+        return conn
+
+    def _release(self, key: _PoolKey, conn: HTTPConnection) -> None:
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self._max_idle:
+                conns.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+
+_Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncHTTPTransport:
+    """asyncio counterpart of HTTPTransport (HTTP/1.1 GET with keep-alive).
+
+    Proxies and redirects are handled as in HTTPTransport; ``timeout_s``
+    covers the whole redirect chain. Connections belong to the event loop
+    that opened them, so use one instance per loop.
+    """
+
+    def __init__(
+        self,
+        max_idle_per_host: int = 4,
+        idle_timeout_s: float = 30.0,
+        proxies: dict[str, str] | None = None,
+        max_redirects: int = 5,
+    ) -> None:
+        self._max_idle = max(0, max_idle_per_host)
+        self._idle_timeout_s = idle_timeout_s
+        self._proxies = getproxies() if proxies is None else proxies
+        self._max_redirects = max(0, max_redirects)
+        self._idle: dict[_PoolKey, list[tuple[_Stream, float]]] = {}
+        self._routes: dict[_PoolKey, _Proxy | None] = {}
+        self._ssl: ssl.SSLContext | None = None
+        self.connections_opened = 0
+
+    async def get(self, url: str, headers: dict[str, str] | None, timeout_s: float) -> bytes:
+        try:
+            return await asyncio.wait_for(self._follow(url, headers), timeout_s)
+        except asyncio.TimeoutError as exc:
+            raise TransportError(f"timed out after {timeout_s}s") from exc
+
+    async def _follow(self, url: str, headers: dict[str, str] | None) -> bytes:
+        origin = urlsplit(url)[:2]
+        for _ in range(self._max_redirects + 1):
+            key, target = _split_url(url)
+            proxy = self._route(key)
+            request_headers = headers
+            if proxy is not None and key[0] == "http":
+                target = url.split("#", 1)[0]
+                request_headers = {**proxy.headers, **(headers or {})}
+            status, body, location = await self._get(key, target, request_headers)
+            if 300 <= status < 400:
+                url, same_origin = _redirect(url, status, location, origin)
+                if not same_origin:
+                    headers = None
+                continue
+            if status >= 400:
+                raise TransportError(f"HTTP Error {status}")
+            return body
+        raise TransportError(f"more than {self._max_redirects} redirects")
+
+    async def aclose(self) -> None:
+        idle, self._idle = self._idle, {}
+        for streams in idle.values():
+            for (_, writer), _ in streams:
+                writer.close()
+
+    async def _get(
+        self, key: _PoolKey, target: str, headers: dict[str, str] | None
+    ) -> tuple[int, bytes, str | None]:
+        stream, reused = self._acquire(key)
+        try:
+            if stream is None:
+                stream = await self._connect(key)
+            try:
+                status, body, location, reusable = await self._request(stream, key, target, headers)
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                stream[1].close()
+                if not reused:
+                    raise TransportError(str(exc) or type(exc).__name__) from exc
+                stream = None
+                stream = await self._connect(key)
+                status, body, location, reusable = await self._request(stream, key, target, headers)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            # Connect failures (refused, DNS) land here too, before any stream exists.
+            if stream is not None:
+                stream[1].close()
+            if isinstance(exc, TransportError):
+                raise
+            raise TransportError(str(exc) or type(exc).__name__) from exc
+        except BaseException:
+            # Cancelled or timed out mid-response: the connection is unusable.
+            if stream is not None:
+                stream[1].close()
+            raise
+        if reusable:
+            self._release(key, stream)
+        else:
+            stream[1].close()
+        return status, body, location
+
+    async def _request(
+        self,
+        stream: _Stream,
+        key: _PoolKey,
+        target: str,
+        headers: dict[str, str] | None,
+    ) -> tuple[int, bytes, str | None, bool]:
+        reader, writer = stream
+        scheme, host, port = key
+        default_port = 443 if scheme == "https" else 80
+        lines = [
+            f"GET {target} HTTP/1.1",
+            f"Host: {host}" if port == default_port else f"Host: {host}:{port}",
+            "Accept: */*",
+            "Connection: keep-alive",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        version, status, fields = await _read_head(reader)
+        keep_alive = version == "HTTP/1.1" and fields.get("connection", "").lower() != "close"
+        if fields.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip(), 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+            body = bytes(body)
+        elif "content-length" in fields:
+            body = await reader.readexactly(int(fields["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return status, body, fields.get("location"), keep_alive
+
+    def _route(self, key: _PoolKey) -> _Proxy | None:
+        if key not in self._routes:
+            self._routes[key] = _proxy_for(self._proxies, key)
+        return self._routes[key]
+
+    def _acquire(self, key: _PoolKey) -> tuple[_Stream | None, bool]:
+        now = time.monotonic()
+        streams = self._idle.get(key, [])
+        while streams:
+            stream, last_used = streams.pop()
+            if now - last_used > self._idle_timeout_s or stream[0].at_eof():
+                stream[1].close()
+                continue
+            return stream, True
+        return None, False
+
+    async def _connect(self, key: _PoolKey) -> _Stream:
+        scheme, host, port = key
+        context = None
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        proxy = self._route(key)
+        self.connections_opened += 1
+        if proxy is None:
+            return await asyncio.open_connection(host, port, ssl=context)
+        reader, writer = await asyncio.open_connection(proxy.host, proxy.port)
+        if scheme == "https":
+            try:
+                await _tunnel(reader, writer, host, port, proxy, context)
+            except BaseException:
+                writer.close()
+                raise
+        return reader, writer
+
+    def _release(self, key: _PoolKey, stream: _Stream) -> None:
+        streams = self._idle.setdefault(key, [])
+        if len(streams) < self._max_idle:
+            streams.append((stream, time.monotonic()))
+        else:
+            stream[1].close()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[str, int, dict[str, str]]:
+    """Status line and lower-cased header fields of an HTTP/1.x response."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed by peer")
+    version, status, _ = (status_line.decode("latin-1").split(" ", 2) + [""])[:3]
+    fields: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        fields[name.strip().lower()] = value.strip()
+    return version, int(status), fields
+
+
+async def _tunnel(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    host: str,
+    port: int,
+    proxy: _Proxy,
+    context: ssl.SSLContext | None,
+) -> None:
+    # HTTPS through a proxy: CONNECT, then TLS to the target over the tunnel.
+    lines = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}"]
+    lines.extend(f"{name}: {value}" for name, value in proxy.headers.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    _, status, _ = await _read_head(reader)
+    if status != 200:
+        raise TransportError(f"Proxy CONNECT failed: HTTP {status}")
+    await writer.start_tls(context, server_hostname=host)
+
+
+_default: HTTPTransport | None = None
+_default_lock = threading.Lock()
+
+
+def default_transport() -> HTTPTransport:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HTTPTransport()
+        return _default
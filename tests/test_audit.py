@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+
+from core.audit import audit, chi2_sf, decode_entropy, main
+from core.casting import cast_hexagram
+from core.entropy_file import EntropyRecorder
+
+
+class ByteStream:
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self.offset = 0
+
+    def get_bytes(self, length: int) -> bytes:
+        out = self._data[self.offset:self.offset + length]
+        self.offset += length
+        return out
+
+
+def test_decode_entropy_matches_sequential_casts() -> None:
+    data = random.Random(5).randbytes(20_000)
+    base, moving, left = decode_entropy(data)
+    assert left <= 8
+    stream = ByteStream(data)
+    expected = []
+    while len(data) - stream.offset >= 8:
+        result = cast_hexagram(stream)
+        expected.append((result.base.to_int(), result.moving_line))
+    assert list(zip(base.tolist(), moving.tolist()))[: len(expected)] == expected
+
+
+def test_chi2_sf_reference_values() -> None:
+    assert abs(chi2_sf(63.0, 63) - 0.4763) < 1e-3
+    assert abs(chi2_sf(100.0, 63) - 0.00208) < 1e-4
+
+
+def test_audit_splits_recorded_entropy_by_source(tmp_path) -> None:
+    path = tmp_path / "session.bin"
+    rng = random.Random(9)
+    recorder = EntropyRecorder(path)
+    for i in range(40):
+        recorder.append("LFDR" if i % 4 else "ANU", rng.randbytes(2000))
+    recorder.close()
+
+    reports = {r.source: r for r in audit([str(path)], chunk_bytes=4096)}
+    assert set(reports) == {"ALL", "ANU", "LFDR"}
+    assert reports["ALL"].casts == reports["ANU"].casts + reports["LFDR"].casts
+    assert all(t.chi_square_p > 1e-4 for t in reports["ALL"].tests)
+
+
+def test_audit_flags_biased_cast_log(tmp_path) -> None:
+    rng = np.random.default_rng(1)
+    log = np.zeros(60_000, dtype=[("base", "u1"), ("moving_line", "u1"), ("source", "u1")])
+    log["base"] = rng.integers(0, 64, len(log))
+    log["moving_line"] = rng.integers(1, 7, len(log))
+    log["source"] = 1
+    fair = tmp_path / "fair.npy"
+    np.save(fair, log)
+    assert main([str(fair)]) == 0
+
+    log["moving_line"][::5] = 6
+    biased = tmp_path / "biased.npy"
+    np.save(biased, log)
+    assert main([str(biased), "--out", str(tmp_path / "audit.json")]) == 1
+
+
+def test_audit_fails_on_stuck_entropy(tmp_path, capsys) -> None:
+    for size in (100, 8192):
+        path = tmp_path / f"stuck-{size}.bin"
+        path.write_bytes(b"\xff" * size)
+        base, _, left = decode_entropy(path.read_bytes())
+        assert len(base) == 0 and left == size
+        assert main([str(path)]) == 1
+        assert f"{size} bytes could not be decoded" in capsys.readouterr().out
+
+
+def test_decode_entropy_keeps_casts_before_a_stuck_tail() -> None:
+    good = random.Random(2).randbytes(6000)
+    base, _, left = decode_entropy(good + b"\xff" * 4000)
+    assert len(base) >= len(decode_entropy(good)[0]) - 1
+    assert left >= 4000 - 8
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import http.client
+import json
+
+from bench.stub_server import StubLLMServer
+from bench.suite import BENCHMARKS, Benchmark, MemoryProvider, main, run_benchmark
+from core.casting import cast_hexagram
+
+
+def test_run_benchmark_reports_latency_and_allocations() -> None:
+    provider = MemoryProvider(size=4096)
+    result = run_benchmark(Benchmark("cast", lambda: lambda: cast_hexagram(provider), inner=20, rounds=5))
+    assert result["ops"] == 100
+    assert result["ops_per_s"] > 0
+    assert result["p50_us"] <= result["p95_us"] <= result["p99_us"]
+    assert result["alloc_blocks_per_op"] >= 0
+
+
+def test_bench_main_writes_json(tmp_path) -> None:
+    out = tmp_path / "run.json"
+    main(["--quick", "--only", "provider_get_bytes_stub_lfdr_errors", "--out", str(out)])
+    payload = json.loads(out.read_text(encoding="utf-8"))
+    assert set(payload["results"]) == {"provider_get_bytes_stub_lfdr_errors"}
+    assert {b.name for b in BENCHMARKS} >= set(payload["results"])
+
+
+def test_stub_llm_server_streams_sse_over_keep_alive() -> None:
+    with StubLLMServer(reply="元亨利贞", chunk_chars=1) as server:
+        host, port = server.server_address[:2]
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        for _ in range(2):
+            body = json.dumps({"model": "stub", "stream": True, "messages": []})
+            conn.request("POST", "/v1/chat/completions", body=body, headers={"Content-Type": "application/json"})
+            events = conn.getresponse().read().decode("utf-8").split("\n\n")
+            deltas = [json.loads(e[6:])["choices"][0]["delta"] for e in events if e.startswith("data: {")]
+            assert "".join(d.get("content", "") for d in deltas) == "元亨利贞"
+            assert "data: [DONE]" in events
+        conn.close()
+        assert server.connections == 1
+        assert len(server.requests) == 2
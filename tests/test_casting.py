@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import pytest
 
-from core.casting import cast_hexagram
+from core.casting import BitReader, cast_hexagram, cast_many, cast_stream
 from core.hexagrams import Hexagram
 
 
 class FakeProvider:
     def __init__(self, data: bytes) -> None:
         self._data = bytearray(data)
+        self.calls: list[int] = []
 
     def get_bytes(self, length: int) -> bytes:
+        self.calls.append(length)
         if length > len(self._data):
             raise RuntimeError("Insufficient data")
         out = self._data[:length]
@@ -19,12 +21,86 @@ class FakeProvider:
 
 
 def test_cast_hexagram_bits_and_moving_line() -> None:
-    # 0x2d -> bits (lsb first): 1,0,1,1,0,1
-    # next byte 0x05 -> moving line index = 6
-    provider = FakeProvider(bytes([0x2D, 0x05]))
+    # 0x6d -> bits (lsb first): 1,0,1,1,0,1 | 1,0
+    # 0x01 -> next bit 1; dice roller reads 1,0,1 = 5 -> moving line 6
+    provider = FakeProvider(bytes([0x6D, 0x01]))
     result = cast_hexagram(provider)
 
     assert result.base.bits == (1, 0, 1, 1, 0, 1)
     assert result.moving_line == 6
     assert result.changed.bits == (1, 0, 1, 1, 0, 0)
     assert isinstance(result.base, Hexagram)
+    assert provider.calls == [2]
+
+
+def test_cast_hexagram_refills_one_byte_after_rejections() -> None:
+    # all-ones bits keep the roller rejecting (c = 7) through 0xff 0xff;
+    # the refilled 0x00 byte then settles it on 0 -> moving line 1
+    provider = FakeProvider(bytes([0xFF, 0xFF, 0x00]))
+    result = cast_hexagram(provider)
+
+    assert result.base.bits == (1, 1, 1, 1, 1, 1)
+    assert result.moving_line == 1
+    assert provider.calls == [2, 1]
+
+
+def test_bit_reader_randbelow_maps_each_accepted_prefix_once() -> None:
+    # the roller reads bits msb-first into c; reader hands them out lsb-first
+    for value in range(6):
+        first_byte = ((value >> 2) & 1) | ((value >> 1) & 1) << 1 | (value & 1) << 2
+        reader = BitReader(FakeProvider(bytes([first_byte])))
+        assert reader.randbelow(6) == value
+
+
+def test_cast_many_matches_sequential_casts() -> None:
+    # mix of regular 2-byte casts and roller-rejecting 0xff runs
+    data = bytes(range(0, 256, 3)) + bytes([0xC5, 0xFF, 0x11]) + bytes(range(7, 256, 5)) * 2
+    sequential_provider = FakeProvider(data)
+    sequential = []
+    while True:
+        try:
+            sequential.append(cast_hexagram(sequential_provider))
+        except RuntimeError:
+            break
+    n = len(sequential) - 1
+    batch = cast_many(FakeProvider(data), n)
+
+    assert len(batch) == n
+    assert list(batch) == sequential[:n]
+    assert batch.base.dtype.name == "uint8"
+    assert [int(v) for v in batch.changed] == [r.changed.to_int() for r in sequential[:n]]
+
+
+def test_cast_stream_yields_blocks_matching_cast_many() -> None:
+    data = (bytes(range(0, 256, 3)) + bytes([0xFF, 0xFF, 0x01])) * 8
+    n = 300
+    expected = list(cast_many(FakeProvider(data), n))
+    provider = FakeProvider(data)
+    batches = list(cast_stream(provider, n, block_size=64, depth=1))
+
+    assert [len(b) for b in batches] == [32] * 9 + [12]
+    assert [r for b in batches for r in b] == expected
+    # prefetch stops at the 2 bytes/cast budget; rejections are topped up on demand
+    assert sum(provider.calls) == len(data) - len(provider._data)
+    assert max(provider.calls) == 64
+
+
+def test_irregular_cast_past_the_buffer_fetches_only_new_bytes() -> None:
+    # ff ff ff keeps the roller rejecting; the cast needs two bytes beyond its first two.
+    tail = bytes([0xFF, 0xFF, 0xFF, 0x00])
+    data = bytes([0x6D, 0x01, 0x12, 0x34]) + tail + bytes([0x5A, 0x33])
+    sequential_provider = FakeProvider(data)
+    sequential = [cast_hexagram(sequential_provider) for _ in range(3)]
+    assert sequential_provider.calls == [2, 2, 2, 1, 1]
+
+    provider = FakeProvider(data)
+    assert list(cast_many(provider, 3)) == sequential
+    assert provider.calls == [6, 1, 1]
+
+    provider = FakeProvider(tail[2:])
+    assert cast_hexagram(provider, reserved=tail[:2]) == sequential[2]
+    assert provider.calls == [1, 1]
+
+    provider = FakeProvider(tail[1:])
+    assert cast_hexagram(provider, reserved=tail[:1]) == sequential[2]
+    assert provider.calls == [1, 1, 1]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import io
+import json
+
+from core.casting import cast_many
+from ui.cli import CSV_HEADER, bulk
+
+
+class BytesProvider:
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._offset = 0
+
+    def get_bytes(self, length: int) -> bytes:
+        out = self._data[self._offset:self._offset + length]
+        self._offset += length
+        return out
+
+
+DATA = bytes((i * 37 + 11) % 256 for i in range(4096))
+
+
+def test_bulk_formats_match_casts() -> None:
+    expected = list(cast_many(BytesProvider(DATA), 500))
+
+    out = io.BytesIO()
+    bulk(BytesProvider(DATA), 500, "jsonl", out, block_size=128, depth=1, progress=False)
+    rows = [json.loads(line) for line in out.getvalue().decode("utf-8").splitlines()]
+    assert [(r["base"], r["moving_line"], r["changed"]) for r in rows] == [
+        (c.base.index, c.moving_line, c.changed.index) for c in expected
+    ]
+    assert rows[0]["base_name"] == expected[0].base.display_name
+
+    out = io.BytesIO()
+    bulk(BytesProvider(DATA), 500, "csv", out, block_size=128, depth=1, progress=False)
+    lines = out.getvalue().decode("utf-8").splitlines()
+    assert lines[0] + "\n" == CSV_HEADER.decode() and len(lines) == 501
+
+    out = io.BytesIO()
+    written = bulk(BytesProvider(DATA), 500, "bin", out, block_size=128, depth=1, progress=False)
+    records = out.getvalue()
+    assert written == len(records) == 1000
+    assert [(records[i], records[i + 1]) for i in range(0, 1000, 2)] == [
+        (c.base.index, c.moving_line) for c in expected
+    ]
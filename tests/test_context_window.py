@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import threading
+
+from core.context_window import SUMMARY_PREFIX, ConversationWindow, estimate_tokens, message_tokens
+
+
+def _chat(turns: int) -> list[dict[str, str]]:
+    messages = [{"role": "system", "content": "卦象提示" * 10}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"第{i}问" + "问" * 40})
+        messages.append({"role": "assistant", "content": f"第{i}答" + "答" * 80})
+    return messages
+
+
+def test_estimate_tokens_counts_cjk_per_char() -> None:
+    assert estimate_tokens("乾为天") == 3
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("") == 0
+
+
+def test_view_keeps_seed_and_recent_turns_within_budget() -> None:
+    window = ConversationWindow(budget_tokens=400)
+    messages = _chat(6)
+    view = window.view(messages)
+    assert view[0] == messages[0]
+    assert view[-1] == messages[-1]
+    assert sum(message_tokens(m) for m in view) <= 400
+    assert len(view) < len(messages)
+    assert len(messages) == 13  # caller's history is untouched
+
+
+def test_overflow_is_compacted_in_background() -> None:
+    calls: list[tuple[str, int]] = []
+    release = threading.Event()
+
+    def summarize(previous: str, turns: list[dict[str, str]]) -> str:
+        release.wait(5)
+        calls.append((previous, len(turns)))
+        return f"摘要{len(calls)}"
+
+    window = ConversationWindow(budget_tokens=500, summarize=summarize)
+    messages = _chat(6)
+    first = window.view(messages)  # returns immediately, compaction pending
+    assert not any(m["content"].startswith(SUMMARY_PREFIX) for m in first)
+    release.set()
+    window.wait(5)
+    assert window.compactions == 1 and window.summary == "摘要1"
+
+    second = window.view(messages)
+    assert second[1] == {"role": "system", "content": SUMMARY_PREFIX + "摘要1"}
+    assert second[-1] == messages[-1]
+    folded = calls[0][1]
+    assert not any(m in second for m in messages[1:1 + folded])
+
+    messages += _chat(3)[1:]
+    window.view(messages)
+    window.wait(5)
+    assert calls[1][0] == "摘要1"  # later compactions roll the previous summary forward
+
+
+def test_failed_compaction_is_retried_and_budget_zero_disables() -> None:
+    attempts = []
+
+    def flaky(previous: str, turns: list[dict[str, str]]) -> str:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("rate limited")
+        return "ok"
+
+    window = ConversationWindow(budget_tokens=300, summarize=flaky)
+    messages = _chat(6)
+    window.view(messages)
+    window.wait(5)
+    assert window.last_error == "rate limited"
+    window.view(messages)
+    window.wait(5)
+    assert window.summary == "ok" and window.last_error is None
+
+    assert ConversationWindow(budget_tokens=0).view(messages) == messages
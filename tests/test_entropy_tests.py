@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import random
+from dataclasses import replace
+
+from config.settings import get_settings
+from core.entropy_tests import EntropyHealthTest, apt_cutoff, rct_cutoff
+from core.health import BreakerState
+from core.qrng import QRNGProvider
+
+
+def test_cutoffs_follow_min_entropy() -> None:
+    assert rct_cutoff(8.0) == 4
+    assert rct_cutoff(4.0) == 6
+    assert apt_cutoff(8.0) < apt_cutoff(4.0) < 512
+
+
+def test_random_bytes_pass_in_any_batching() -> None:
+    test = EntropyHealthTest("LFDR")
+    data = random.Random(7).randbytes(64 * 1024)
+    pos = 0
+    rng = random.Random(1)
+    while pos < len(data):
+        step = rng.choice((1, 2, 7, 1024, 5000))
+        assert test.update(data[pos:pos + step]) is None
+        pos += step
+    snapshot = test.snapshot()
+    assert snapshot.samples == len(data)
+    assert snapshot.chi_square is not None and snapshot.failures == 0
+
+
+def test_repetition_count_spans_batches() -> None:
+    test = EntropyHealthTest("LFDR", min_entropy=4.0)
+    assert test.update(b"\x01\x05\x05\x05") is None
+    assert test.update(b"\x05\x05") is None
+    reason = test.update(b"\x05\x02")
+    assert reason is not None and "repetition" in reason
+    assert test.snapshot().failures == 1
+
+
+def test_adaptive_proportion_and_chi_square_catch_bias() -> None:
+    biased = bytes(b if i % 3 else 0x2A for i, b in enumerate(os.urandom(512)))
+    apt = EntropyHealthTest("ANU", min_entropy=8.0)
+    assert "adaptive proportion" in apt.update(biased)
+
+    # Half the byte values never appear: passes RCT/APT, fails the histogram.
+    rng = random.Random(3)
+    skewed = bytes(rng.randrange(128) for _ in range(4096))
+    chi = EntropyHealthTest("ANU")
+    assert "chi-square" in chi.update(skewed)
+
+
+class StuckClient:
+    def get_bytes(self, length: int) -> bytes:
+        return bytes(length)
+
+
+class RandomClient:
+    def get_bytes(self, length: int) -> bytes:
+        return os.urandom(length)
+
+
+def test_provider_quarantines_source_failing_health_tests() -> None:
+    settings = replace(get_settings(), breaker_failures=1, breaker_cooldown_s=60.0)
+    provider = QRNGProvider(settings=settings, lfdr=StuckClient(), anu=RandomClient())
+    try:
+        provider.get_bytes(16)
+        assert [source for source, _ in provider.history] == ["ANU"]
+        health = {snapshot.name: snapshot for snapshot in provider.health()}
+        assert health["LFDR"].state is BreakerState.OPEN
+        assert "health test" in health["LFDR"].last_error
+        tests = {snapshot.name: snapshot for snapshot in provider.entropy_tests()}
+        assert tests["LFDR"].failures == 1 and tests["ANU"].failures == 0
+    finally:
+        provider.close()
+
+
+def test_constant_source_stays_quarantined() -> None:
+    # Default breaker threshold and small requests: without an immediate trip
+    # the stuck source would pass between failures and keep serving casts.
+    settings = replace(get_settings(), breaker_cooldown_s=60.0)
+    provider = QRNGProvider(settings=settings, lfdr=StuckClient(), anu=RandomClient())
+    try:
+        for _ in range(12):
+            provider.get_bytes(2)
+        sources = [source for source, _ in provider.history]
+        assert sources.count("LFDR") < 3 and sources[-9:] == ["ANU"] * 9
+        health = {snapshot.name: snapshot for snapshot in provider.health()}
+        assert health["LFDR"].state is BreakerState.OPEN
+    finally:
+        provider.close()
+
+
+def test_failure_keeps_the_stuck_run() -> None:
+    test = EntropyHealthTest("LFDR", min_entropy=4.0)
+    assert "repetition" in test.update(bytes(8))
+    assert "repetition" in test.update(bytes(1))
+
+
+def test_scalar_and_vectorized_paths_agree() -> None:
+    data = random.Random(11).randbytes(3 * 4096 + 100)
+    small, large = EntropyHealthTest("LFDR"), EntropyHealthTest("LFDR")
+    for pos in range(0, len(data), 2):
+        assert small.update(data[pos:pos + 2]) is None
+    assert large.update(data) is None
+    a, b = small.snapshot(), large.snapshot()
+    assert (a.longest_run, a.apt_peak, a.chi_square) == (b.longest_run, b.apt_peak, b.chi_square)
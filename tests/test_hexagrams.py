@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pickle
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from core.hexagrams import HEXAGRAM_NAMES, Hexagram
+
+
+def test_hexagrams_are_interned_by_bits_and_index() -> None:
+    h = Hexagram(bits=(1, 0, 1, 1, 0, 1))
+    assert h is Hexagram(bits=[1, 0, 1, 1, 0, 1])
+    assert h is Hexagram.from_int(h.to_int())
+    assert h.to_int() == 0b101101
+    assert pickle.loads(pickle.dumps(h)) is h
+    with pytest.raises(FrozenInstanceError):
+        h.bits = (0,) * 6  # type: ignore[misc]
+
+
+def test_hexagram_table_covers_all_names() -> None:
+    names = {Hexagram.from_int(i).hexagram_name for i in range(64)}
+    assert names == set(HEXAGRAM_NAMES.values())
+    assert Hexagram.from_int(0b111111).display_name == "上乾下乾（乾）"
+    assert Hexagram.from_int(0b000111).display_name == "上坤下乾（泰）"
+
+
+def test_hexagram_changed_flips_moving_line() -> None:
+    h = Hexagram(bits=(1, 0, 1, 1, 0, 1))
+    assert h.changed(6).bits == (1, 0, 1, 1, 0, 0)
+    assert h.changed(1).changed(1) is h
+    assert h.render(6).splitlines()[0] == "-----  *"
+    assert h.render().splitlines() == ["-----", "-- --", "-----", "-----", "-- --", "-----"]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from core.history import EntropyHistory
+
+
+def test_history_keeps_entries_and_counts() -> None:
+    history = EntropyHistory(capacity=16)
+    history.record([("LFDR", b"\x01\x02")])
+    mark = history.mark()
+    history.record([("LFDR", b"\x03"), ("ANU", b"\x04\x05")])
+    history.record([("LFDR", b"\x06")])
+
+    assert list(history) == [
+        ("LFDR", b"\x01\x02"),
+        ("LFDR", b"\x03"),
+        ("ANU", b"\x04\x05"),
+        ("LFDR", b"\x06"),
+    ]
+    assert history.since(mark) == [("LFDR", b"\x03"), ("ANU", b"\x04\x05"), ("LFDR", b"\x06")]
+    stats = history.stats()
+    assert stats.requests == 3
+    assert stats.fallbacks == 1
+    assert stats.bytes_by_source == {"LFDR": 4, "ANU": 2}
+
+
+def test_history_is_bounded_ring() -> None:
+    history = EntropyHistory(capacity=4)
+    for value in range(10):
+        history.record([("ANU", bytes([value]))])
+    assert list(history) == [("ANU", bytes([v])) for v in range(6, 10)]
+    assert history.since(0) == list(history)
+    history.record([("CLASSIC", bytes(range(6)))])
+    assert list(history) == [("CLASSIC", bytes(range(2, 6)))]
+    assert history.stats().bytes_by_source == {"ANU": 10, "CLASSIC": 6}
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("openai")
+
+from bench.stub_server import StubLLMServer  # noqa: E402
+from core import llm  # noqa: E402
+from core.llm import (  # noqa: E402
+    LLMConfig,
+    close_clients,
+    get_client,
+    reset_client,
+    stream_chat_completion,
+    stream_interpretation,
+    summarizer,
+)
+from core.response_cache import ResponseCache  # noqa: E402
+
+
+def test_client_cache_reuses_connections() -> None:
+    with StubLLMServer(reply="乾元亨利贞") as server:
+        config = LLMConfig(base_url=server.api_url, model="stub", api_key="test")
+        try:
+            for _ in range(3):
+                assert "".join(stream_chat_completion([{"role": "user", "content": "问"}], config)) == "乾元亨利贞"
+            assert server.connections == 1
+            assert get_client(config) is get_client(config)
+        finally:
+            close_clients()
+    assert not llm._clients
+
+
+def test_reset_client_builds_a_new_one() -> None:
+    config = LLMConfig(base_url="http://127.0.0.1:9/v1", model="stub", api_key="test")
+    first = get_client(config)
+    reset_client(config)
+    assert get_client(config) is not first
+    other = LLMConfig(base_url=config.base_url, model="other", api_key="test")
+    assert get_client(other) is not get_client(config)
+    close_clients()
+
+
+def test_stream_interpretation_replays_cached_answer() -> None:
+    cache = ResponseCache()
+    with StubLLMServer(reply="潜龙勿用") as server:
+        config = LLMConfig(base_url=server.api_url, model="stub", api_key="test")
+        try:
+            first = "".join(stream_interpretation("本卦：乾", config, cache=cache))
+            second = "".join(stream_interpretation("本卦：乾", config, cache=cache))
+        finally:
+            close_clients()
+    assert first == second == "潜龙勿用"
+    assert len(server.requests) == 1
+    assert cache.stats().hits == 1
+
+
+def test_summarizer_runs_inside_admission() -> None:
+    events: list[str] = []
+
+    class Admission:
+        def __enter__(self) -> None:
+            events.append("enter")
+
+        def __exit__(self, *exc: object) -> None:
+            events.append("exit")
+
+    with StubLLMServer(reply="摘要") as server:
+        config = LLMConfig(base_url=server.api_url, model="stub", api_key="test")
+        try:
+            summarize = summarizer(config, Admission)
+            assert summarize("", [{"role": "user", "content": "问"}]) == "摘要"
+        finally:
+            close_clients()
+    assert events == ["enter", "exit"]
+
+    def refuse() -> Admission:
+        raise llm.LLMError("busy")
+
+    with pytest.raises(llm.LLMError):
+        summarizer(config, refuse)("", [{"role": "user", "content": "问"}])
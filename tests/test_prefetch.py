@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import replace
+
+from config.settings import get_settings
+from core.casting import cast_hexagram
+from core.prefetch import EntropyPrefetcher
+from core.qrng import QRNGError, QRNGProvider
+from core.quota import SessionQuotas
+
+
+class SequenceClient:
+    """Serves consecutive bytes 0, 1, 2, ...; can be held back or made to fail."""
+
+    def __init__(self) -> None:
+        self.next = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def get_bytes(self, length: int) -> bytes:
+        self.release.wait(5)
+        if self.fail:
+            raise QRNGError("down")
+        out = bytes((self.next + i) % 256 for i in range(length))
+        self.next += length
+        return out
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _provider(client: SequenceClient) -> QRNGProvider:
+    settings = replace(get_settings(), backends=("lfdr",), health_tests=False, allow_fallback=False)
+    return QRNGProvider(settings=settings, lfdr=client)
+
+
+def test_reserved_bytes_are_used_once_and_counted() -> None:
+    client = SequenceClient()
+    provider = _provider(client)
+    prefetcher = EntropyPrefetcher(provider)
+    try:
+        prefetcher.reserve("a")
+        prefetcher.reserve("a")  # one reservation per session
+        reserved = prefetcher.take("a", timeout=5)
+        assert reserved == b"\x00\x01"
+        assert prefetcher.take("a", timeout=5) is None  # never handed out twice
+
+        client.release.clear()
+        prefetcher.reserve("b")
+        threading.Timer(0.05, client.release.set).start()
+        assert prefetcher.take("b", timeout=5) == b"\x02\x03"
+
+        prefetcher.reserve("c")
+        prefetcher.discard("c")
+        stats = prefetcher.stats()
+        assert (stats.reserved, stats.takes, stats.ready, stats.waited, stats.missed) == (3, 3, 1, 1, 1)
+        assert stats.discarded == 1 and stats.pending == 0
+    finally:
+        prefetcher.close()
+        provider.close()
+
+
+def test_cast_with_reserved_bytes_matches_live_cast_and_failures_fall_back() -> None:
+    live = cast_hexagram(_provider(SequenceClient()))
+    client = SequenceClient()
+    provider = _provider(client)
+    prefetcher = EntropyPrefetcher(provider)
+    try:
+        prefetcher.reserve("s")
+        assert cast_hexagram(provider, prefetcher.take("s", timeout=5)) == live
+
+        client.fail = True
+        prefetcher.reserve("s")
+        assert prefetcher.take("s", timeout=5) is None
+        assert prefetcher.stats().missed == 1
+    finally:
+        prefetcher.close()
+        provider.close()
+
+
+def test_reservations_are_charged_to_the_session_quota_and_capped() -> None:
+    clock = FakeClock()
+    client = SequenceClient()
+    provider = _provider(client)
+    quota = SessionQuotas(rate_per_s=1.0, burst=4, clock=clock)
+    prefetcher = EntropyPrefetcher(provider, quota=quota, max_pending=2, max_age_s=10.0, clock=clock)
+    try:
+        assert prefetcher.reserve("a") and prefetcher.reserve("a")  # charged once
+        assert prefetcher.take("a", timeout=5) is not None
+        assert prefetcher.reserve("a")
+        assert prefetcher.take("a", timeout=5) is not None
+        assert not prefetcher.reserve("a")  # bucket empty: no fetch
+        assert quota.try_take("a", 2) > 0
+
+        assert prefetcher.reserve("b") and prefetcher.reserve("c")
+        assert not prefetcher.reserve("d")  # max_pending reached
+        assert prefetcher.stats().skipped == 2
+
+        clock.now = 11.0
+        assert prefetcher.take("b", timeout=5) is None  # stale, dropped
+        assert prefetcher.stats().pending == 0
+        assert client.next == 8  # a, a, b, c: nothing for the skipped ones
+    finally:
+        prefetcher.close()
+        provider.close()
+
+
+def test_unused_reservations_are_refunded_to_the_session_quota() -> None:
+    clock = FakeClock()
+    client = SequenceClient()
+    provider = _provider(client)
+    quota = SessionQuotas(rate_per_s=0.001, burst=2, clock=clock)
+    prefetcher = EntropyPrefetcher(provider, quota=quota, max_age_s=10.0, clock=clock)
+    try:
+        for _ in range(3):  # every rerun re-reserves once the last one went stale
+            assert prefetcher.reserve("a")
+            clock.now += 11.0
+        assert prefetcher.stats().discarded == 3
+        assert quota.try_take("a", 2) == 0.0  # none of the three was charged for good
+
+        quota.refund("a", 2)
+        client.fail = True
+        assert prefetcher.reserve("a")
+        assert prefetcher.take("a", timeout=5) is None
+        assert quota.try_take("a", 2) == 0.0  # the failed fetch was refunded too
+    finally:
+        prefetcher.close()
+        provider.close()
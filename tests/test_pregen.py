@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+
+from core.hexagrams import Hexagram
+from core.pregen import PAIRS, InterpretationStore, pair_index, pregenerate
+
+
+class FlakyLLM:
+    """Answers with the prompt's first line; every third call fails once."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._failed: set[str] = set()
+
+    def __call__(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            if self.calls % 3 == 0 and prompt not in self._failed:
+                self._failed.add(prompt)
+                raise RuntimeError("429 too many requests")
+        return f"解：{len(prompt)}"
+
+
+def test_pregenerate_all_pairs_with_retries(tmp_path) -> None:
+    path = tmp_path / "baseline.bin"
+    store = InterpretationStore(path)
+    llm = FlakyLLM()
+    template = "{base_name}|{moving_line}|{question}"
+    failed = pregenerate(store, llm, workers=4, rate_per_s=0, retries=2, backoff_s=0, template=template)
+    store.close()
+    assert failed == []
+    assert len(store) == PAIRS
+
+    reopened = InterpretationStore(path)
+    base = Hexagram.from_int(45)
+    assert reopened.get(45, 3) == f"解：{len(f'{base.display_name}|3|近期整体运势如何，应当如何把握')}"
+
+
+def test_pregenerate_resumes_and_ignores_torn_record(tmp_path) -> None:
+    path = tmp_path / "baseline.bin"
+    store = InterpretationStore(path)
+    store.append(pair_index(0, 1), "已有")
+    store.close()
+    with open(f"{path}.idx", "ab") as fh:
+        fh.write(b"\x01\x02")  # torn record from a crash
+
+    store = InterpretationStore(path)
+    assert store.done() == {0}
+    calls = []
+    failed = pregenerate(store, lambda p: calls.append(p) or "新", rate_per_s=0, template="{base_name}{moving_line}")
+    store.close()
+    assert failed == [] and len(calls) == PAIRS - 1
+    reopened = InterpretationStore(path)
+    assert reopened.get(0, 1) == "已有" and reopened.get(63, 6) == "新"
+
+
+def test_pregenerate_reports_exhausted_retries(tmp_path) -> None:
+    store = InterpretationStore(tmp_path / "b.bin")
+
+    def down(prompt: str) -> str:
+        raise RuntimeError("down")
+
+    failed = pregenerate(store, down, workers=8, rate_per_s=0, retries=1, backoff_s=0, template="{base_name}")
+    assert len(failed) == PAIRS and len(store) == 0
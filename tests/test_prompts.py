@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from core.casting import CastingResult
+from core.hexagrams import Hexagram
+from core.prompts import compile_prompt, format_prompt, get_prompt_template, reload_prompt_templates
+
+
+def _cast() -> CastingResult:
+    base = Hexagram.from_int(0)
+    return CastingResult(base=base, changed=base.changed(2), moving_line=2)
+
+
+def test_template_is_compiled_once_and_reloaded_on_edit(tmp_path) -> None:
+    path = tmp_path / "prompt.txt"
+    path.write_text("{base_name}:{question}", encoding="utf-8")
+    first = get_prompt_template(path)
+    assert get_prompt_template(path) is first
+    assert first.fields == {"base_name", "question"}
+
+    path.write_text("{moving_line}爻 {question}", encoding="utf-8")
+    stamp = path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+    second = get_prompt_template(path)
+    assert second is not first
+    assert second.render(_cast(), "问事业？") == "2爻 问事业？"
+
+    reload_prompt_templates()
+    assert get_prompt_template(path) == second
+
+
+def test_unknown_fields_are_rejected_up_front() -> None:
+    with pytest.raises(ValueError, match="hexagram"):
+        compile_prompt("{hexagram} {question}")
+    assert format_prompt(_cast(), "问", "{changed_name}") == _cast().changed.display_name
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
 import pytest
 
-from core.qrng import QRNGError, QRNGProvider
+from config.settings import get_settings
+from core.health import BackendHealth, BreakerState
+from core.entropy_file import read_index
+from core.qrng import FileClient, QRNGError, QRNGProvider
 
 
 class FailingClient:
@@ -27,3 +35,188 @@ def test_qrng_all_failed() -> None:
     provider = QRNGProvider(lfdr=FailingClient(), anu=FailingClient())
     with pytest.raises(QRNGError):
         provider.get_bytes(1)
+
+
+class CountingClient:
+    def __init__(self, fill: int = 0xAB) -> None:
+        self.calls: list[int] = []
+        self._fill = fill
+
+    def get_bytes(self, length: int) -> bytes:
+        self.calls.append(length)
+        return bytes([self._fill]) * length
+
+
+def test_qrng_pool_serves_tagged_bytes_from_blocks() -> None:
+    # Constant fill would trip the repetition count test; see test_entropy_tests.
+    settings = replace(
+        get_settings(), pool_size=64, pool_block_size=32, timeout_s=2.0, health_tests=False
+    )
+    lfdr = CountingClient()
+    provider = QRNGProvider(settings=settings, lfdr=lfdr, anu=FailingClient())
+    try:
+        assert provider.get_bytes(2) == b"\xab\xab"
+        assert provider.get_bytes(1) == b"\xab"
+        assert list(provider.history) == [("LFDR", b"\xab\xab"), ("LFDR", b"\xab")]
+        assert all(n == 32 for n in lfdr.calls)
+        stats = provider.pool_stats()
+        assert stats is not None and stats.refills >= 1
+    finally:
+        provider.close()
+
+
+def test_qrng_pool_empty_times_out() -> None:
+    settings = replace(get_settings(), pool_size=16, timeout_s=0.05)
+    provider = QRNGProvider(settings=settings, lfdr=FailingClient(), anu=FailingClient())
+    try:
+        with pytest.raises(QRNGError):
+            provider.get_bytes(1)
+    finally:
+        provider.close()
+
+
+class SlowClient:
+    def __init__(self, payload: bytes, delay_s: float) -> None:
+        self._payload = payload
+        self._delay_s = delay_s
+
+    def get_bytes(self, length: int) -> bytes:
+        time.sleep(self._delay_s)
+        return self._payload[:length]
+
+
+def test_qrng_hedged_request_prefers_fast_backend() -> None:
+    settings = replace(get_settings(), hedge=True, hedge_delay_s=0.01)
+    provider = QRNGProvider(
+        settings=settings,
+        lfdr=SlowClient(b"\x01", 0.5),
+        anu=StaticClient(b"\x02"),
+    )
+    try:
+        start = time.monotonic()
+        assert provider.get_bytes(1) == b"\x02"
+        assert time.monotonic() - start < 0.4
+        assert list(provider.history) == [("ANU", b"\x02")]
+    finally:
+        provider.close()
+
+
+def test_qrng_hedging_does_not_queue_behind_slow_losers() -> None:
+    # More concurrent casts than the old fixed pool of 4 workers: each one's
+    # slow LFDR request must not delay the others' ANU hedges.
+    settings = replace(get_settings(), hedge=True, hedge_delay_s=0.01, health_tests=False)
+    provider = QRNGProvider(
+        settings=settings,
+        lfdr=SlowClient(b"\x01", 0.5),
+        anu=StaticClient(b"\x02"),
+    )
+    try:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as callers:
+            results = list(callers.map(lambda _: provider.get_bytes(1), range(8)))
+        assert results == [b"\x02"] * 8
+        assert time.monotonic() - start < 0.4
+    finally:
+        provider.close()
+
+
+def test_qrng_hedged_all_failed_respects_fallback() -> None:
+    settings = replace(get_settings(), hedge=True, hedge_delay_s=0.01, allow_fallback=False)
+    provider = QRNGProvider(settings=settings, lfdr=FailingClient(), anu=FailingClient())
+    try:
+        with pytest.raises(QRNGError):
+            provider.get_bytes(1)
+    finally:
+        provider.close()
+
+
+class CountingFailingClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_bytes(self, length: int) -> bytes:
+        self.calls += 1
+        raise QRNGError("down")
+
+
+def test_qrng_breaker_opens_and_skips_failing_backend() -> None:
+    settings = replace(get_settings(), breaker_failures=1, breaker_cooldown_s=60.0)
+    lfdr = CountingFailingClient()
+    provider = QRNGProvider(settings=settings, lfdr=lfdr, anu=StaticClient(b"\x07"))
+    try:
+        for _ in range(4):
+            assert provider.get_bytes(1) == b"\x07"
+        assert lfdr.calls == 1
+        health = {snapshot.name: snapshot for snapshot in provider.health()}
+        assert health["LFDR"].state is BreakerState.OPEN
+        assert health["ANU"].state is BreakerState.CLOSED
+        assert health["ANU"].latency_ewma_s is not None
+    finally:
+        provider.close()
+
+
+def test_backend_health_probe_closes_breaker() -> None:
+    health = BackendHealth("LFDR", failure_threshold=1, cooldown_s=0.0)
+    health.record_failure("down")
+    assert not health.available()
+    assert health.begin_probe()
+    assert health.state is BreakerState.HALF_OPEN
+    health.record_success(0.1)
+    assert health.available()
+
+
+def test_qrng_record_and_replay_entropy_file(tmp_path) -> None:
+    path = tmp_path / "session.bin"
+    settings = replace(get_settings(), record_file=str(path))
+    recorder = QRNGProvider(settings=settings, lfdr=FailingClient(), anu=StaticClient(b"\x10\x20\x30"))
+    first = recorder.get_bytes(2)
+    second = recorder.get_bytes(3)
+    recorder.close()
+    assert read_index(path) == [("ANU", 0, 2), ("ANU", 2, 3)]
+
+    replay_settings = replace(get_settings(), backends=("file",), entropy_file=str(path))
+    replay = QRNGProvider(settings=replay_settings)
+    assert replay.get_bytes(4) == first + second[:2]
+    replay.close()
+
+    resumed = QRNGProvider(settings=replay_settings)
+    assert resumed.get_bytes(1) == second[2:]
+    with pytest.raises(QRNGError):
+        resumed.get_bytes(1)
+    assert list(resumed.history) == [("FILE", second[2:])]
+    resumed.close()
+
+
+def test_file_client_views_are_zero_copy(tmp_path) -> None:
+    path = tmp_path / "pool.bin"
+    path.write_bytes(bytes(range(8)))
+    client = FileClient(path)
+    view = client.view(3)
+    assert isinstance(view, memoryview)
+    assert view.tobytes() == b"\x00\x01\x02"
+    assert client.get_bytes(2) == b"\x03\x04"
+    assert client.remaining() == 3
+    del view
+    client.close()
+
+
+def test_qrng_shared_provider_is_thread_safe() -> None:
+    class RandomClient:
+        def get_bytes(self, length: int) -> bytes:
+            time.sleep(0.001)
+            return os.urandom(length)
+
+    settings = replace(get_settings(), hedge=True, hedge_delay_s=0.0005, pool_size=0)
+    provider = QRNGProvider(settings=settings, lfdr=RandomClient(), anu=RandomClient())
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            sizes = list(pool.map(lambda _: len(provider.get_bytes(2)), range(400)))
+        assert sizes == [2] * 400
+        stats = provider.history.stats()
+        assert stats.requests == 400
+        assert sum(stats.bytes_by_source.values()) == 800
+    finally:
+        provider.close()
+    provider.close()  # idempotent
+    with pytest.raises(QRNGError):
+        provider.get_bytes(1)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+from dataclasses import replace
+
+import pytest
+
+from bench.stub_server import StubQRNGServer
+from config.settings import get_settings
+from core.casting import cast_hexagram, cast_hexagram_async
+from core.qrng import QRNGError
+from core.qrng_async import AsyncQRNGProvider
+
+
+class FakeAsyncProvider:
+    def __init__(self, data: bytes) -> None:
+        self._data = bytearray(data)
+        self.calls: list[int] = []
+
+    async def get_bytes(self, length: int, deadline_s: float | None = None) -> bytes:
+        self.calls.append(length)
+        out = bytes(self._data[:length])
+        del self._data[:length]
+        return out
+
+
+class SyncProvider:
+    def __init__(self, data: bytes) -> None:
+        self._data = bytearray(data)
+
+    def get_bytes(self, length: int) -> bytes:
+        out = bytes(self._data[:length])
+        del self._data[:length]
+        return out
+
+
+class SlowAsyncClient:
+    async def get_bytes(self, length: int) -> bytes:
+        await asyncio.sleep(1.0)
+        return bytes(length)
+
+
+def test_async_provider_falls_back_to_anu() -> None:
+    async def run(base_url: str) -> None:
+        settings = replace(
+            get_settings(),
+            lfdr_url=f"{base_url}/missing",
+            anu_url=f"{base_url}/anu",
+            anu_key="test",
+        )
+        provider = AsyncQRNGProvider(settings=settings)
+        try:
+            data = await provider.get_bytes(4)
+        finally:
+            await provider.aclose()
+        assert len(data) == 4
+        assert list(provider.history) == [("ANU", data)]
+
+    with StubQRNGServer() as server:
+        asyncio.run(run(server.base_url))
+
+
+def test_async_provider_follows_configured_backends(tmp_path) -> None:
+    entropy = tmp_path / "entropy.bin"
+    entropy.write_bytes(bytes(range(16)))
+
+    class Unused:
+        async def get_bytes(self, length: int) -> bytes:
+            raise AssertionError("backend not in QRNG_BACKENDS was used")
+
+    async def run() -> None:
+        settings = replace(get_settings(), backends=("file",), entropy_file=str(entropy))
+        provider = AsyncQRNGProvider(settings=settings, lfdr=Unused(), anu=Unused())
+        try:
+            assert await provider.get_bytes(4) == bytes(range(4))
+        finally:
+            await provider.aclose()
+        assert [snapshot.name for snapshot in provider.health()] == ["FILE"]
+        with pytest.raises(QRNGError, match="Unknown"):
+            AsyncQRNGProvider(settings=replace(settings, backends=("nope",)))
+
+    asyncio.run(run())
+
+
+def test_async_provider_falls_back_when_lfdr_is_unreachable() -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+
+    async def run(base_url: str) -> None:
+        settings = replace(
+            get_settings(),
+            lfdr_url=f"http://127.0.0.1:{closed_port}/lfdr",
+            anu_url=f"{base_url}/anu",
+            anu_key="test",
+        )
+        provider = AsyncQRNGProvider(settings=settings)
+        try:
+            data = await provider.get_bytes(4)
+        finally:
+            await provider.aclose()
+        assert list(provider.history) == [("ANU", data)]
+        health = {snapshot.name: snapshot for snapshot in provider.health()}
+        assert health["LFDR"].failures == 1
+        assert health["LFDR"].last_error
+
+    with StubQRNGServer() as server:
+        asyncio.run(run(server.base_url))
+
+
+def test_async_provider_deadline() -> None:
+    async def run() -> None:
+        provider = AsyncQRNGProvider(lfdr=SlowAsyncClient(), anu=SlowAsyncClient())
+        with pytest.raises(QRNGError):
+            await provider.get_bytes(1, deadline_s=0.05)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("data", [bytes([0x6D, 0x01]), bytes([0xFF, 0xFF, 0x00])])
+def test_cast_hexagram_async_matches_sync(data: bytes) -> None:
+    provider = FakeAsyncProvider(data)
+    result = asyncio.run(cast_hexagram_async(provider))
+    assert result == cast_hexagram(SyncProvider(data))
+    assert provider.calls[0] == 2
+
+
+def test_cast_hexagram_async_closes_its_own_provider(monkeypatch) -> None:
+    created: list[FakeAsyncProvider] = []
+
+    class OwnedProvider(FakeAsyncProvider):
+        closed = False
+
+        def __init__(self) -> None:
+            super().__init__(bytes([0x6D, 0x01]))
+            created.append(self)
+
+        async def aclose(self) -> None:
+            self.closed = True
+
+    monkeypatch.setattr("core.casting.AsyncQRNGProvider", OwnedProvider)
+    asyncio.run(cast_hexagram_async())
+    assert len(created) == 1 and created[0].closed
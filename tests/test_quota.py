@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+
+from core.quota import SessionQuotas, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills_at_rate() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_s=2.0, burst=4, clock=clock)
+    assert [bucket.try_take() for _ in range(4)] == [0.0] * 4
+    assert bucket.try_take() == 0.5
+    clock.now = 0.5
+    assert bucket.try_take() == 0.0
+    assert bucket.try_take(2) == 1.0
+    assert TokenBucket(rate_per_s=0, burst=1).try_take(100) == 0.0
+    with pytest.raises(ValueError):
+        bucket.try_take(5)
+
+
+def test_sessions_are_limited_independently_and_idle_ones_dropped() -> None:
+    clock = FakeClock()
+    quotas = SessionQuotas(rate_per_s=1.0, burst=2, idle_s=10.0, clock=clock)
+    assert quotas.try_take("heavy", 2) == 0.0
+    assert quotas.try_take("heavy", 2) == 2.0
+    assert quotas.try_take("light", 2) == 0.0  # not affected by the heavy user
+    assert len(quotas) == 2
+
+    clock.now = 30.0
+    assert quotas.try_take("new") == 0.0
+    assert len(quotas) == 1
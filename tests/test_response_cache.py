@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from core.casting import CastingResult
+from core.hexagrams import Hexagram
+from core.prompts import format_prompt
+from core.response_cache import ResponseCache, cache_key, normalize_question
+
+
+def test_near_identical_questions_share_a_key() -> None:
+    assert normalize_question("  今年  事业如何？ ") == "今年 事业如何"
+    base = Hexagram.from_int(0)
+    cast = CastingResult(base=base, changed=base.changed(2), moving_line=2)
+    template = "{base_name} {question}"
+
+    def key(question: str, model: str = "m") -> str:
+        return cache_key(format_prompt(cast, question, template), model, question)
+
+    assert format_prompt(cast, " 今年事业如何？ ", template).endswith("今年事业如何？")
+    assert key(" 今年事业如何 ") == key("今年事业如何？")
+    assert key("今年财运如何？") != key("今年事业如何？")
+    assert key("今年事业如何？", "other") != key("今年事业如何？")
+
+
+def test_stream_stores_full_answer_then_replays_it() -> None:
+    cache = ResponseCache(replay_chars=2)
+    calls = []
+
+    def produce():
+        calls.append(1)
+        yield from ["元亨", "利贞。"]
+
+    assert "".join(cache.stream("k", produce)) == "元亨利贞。"
+    replay = list(cache.stream("k", produce))
+    assert replay == ["元亨", "利贞", "。"]
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.stores) == (1, 1, 1)
+
+
+def test_incomplete_stream_is_not_cached() -> None:
+    cache = ResponseCache()
+
+    def failing():
+        yield "半"
+        raise RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        list(cache.stream("k", failing))
+    stream = cache.stream("k", lambda: iter(["全文"]))
+    next(stream)
+    stream.close()
+    assert cache.get("k") is None
+
+
+def test_lru_ttl_and_sqlite_tier(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "llm.sqlite3"
+    cache = ResponseCache(capacity=1, ttl_s=60.0, path=path)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.stats().entries == 1
+    assert cache.get("a") == "A"  # evicted from memory, found on disk
+    assert cache.stats().disk_hits == 1
+    cache.close()
+
+    reopened = ResponseCache(ttl_s=60.0, path=path)
+    assert reopened.get("b") == "B"
+    now = time.time()
+    monkeypatch.setattr("core.response_cache.time.time", lambda: now + 120)
+    assert reopened.get("b") is None
+    reopened.close()
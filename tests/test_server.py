@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+import time
+from dataclasses import replace
+
+import pytest
+
+from bench.bench_server import ServerThread, run_load
+from bench.stub_server import StubQRNGServer
+from config.settings import get_settings
+from core.qrng import QRNGProvider
+from ui.server import CastServer
+
+
+class GatedInterpreter:
+    """Streams fixed chunks; waits on ``gate`` before each one once it is cleared."""
+
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+        self.prompts: list[str] = []
+
+    def __call__(self, prompt: str, question: str):
+        self.prompts.append(prompt)
+        self.started.set()
+        for chunk in self.chunks:
+            self.gate.wait(5)
+            yield chunk
+
+
+@pytest.fixture
+def qrng():
+    with StubQRNGServer(seed=1) as server:
+        settings = replace(
+            get_settings(), lfdr_url=f"{server.base_url}/lfdr", backends=("lfdr",), allow_fallback=False
+        )
+        provider = QRNGProvider(settings)
+        yield provider
+        provider.close()
+
+
+def _get(server: CastServer, path: str) -> tuple[int, dict[str, str], bytes]:
+    conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def _events(body: bytes) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_cast_batch_and_errors(qrng) -> None:
+    with ServerThread(CastServer(qrng, port=0, max_batch=50)) as running:
+        server = running.server
+        status, _, body = _get(server, "/cast")
+        cast = json.loads(body)
+        assert status == 200
+        assert cast["changed"]["index"] == cast["base"]["index"] ^ (1 << (cast["moving_line"] - 1))
+
+        status, _, body = _get(server, "/casts?n=20")
+        assert status == 200 and len(json.loads(body)["casts"]) == 20
+        assert _get(server, "/casts?n=51")[0] == 400
+        assert _get(server, "/nope")[0] == 404
+        assert _get(server, "/interpret?question=x")[0] == 503  # no LLM configured
+
+        load = run_load(server.base_url, "/cast", requests=200, clients=8)
+        assert load["status"] == {200: 200}
+        health = json.loads(_get(server, "/health")[2])
+        assert health["backends"][0]["name"] == "LFDR"
+        assert health["server"]["requests"] >= 205
+
+
+def test_rejects_bad_or_oversized_content_length(qrng) -> None:
+    with ServerThread(CastServer(qrng, port=0)) as running:
+        server = running.server
+        for length, status in (("-5", 400), ("abc", 400), (str(1 << 40), 413)):
+            conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+            try:
+                conn.putrequest("GET", "/cast")
+                conn.putheader("Content-Length", length)
+                conn.endheaders()
+                assert conn.getresponse().status == status
+            finally:
+                conn.close()
+        assert _get(server, "/cast")[0] == 200
+
+
+def test_interpret_streams_sse_for_given_cast(qrng) -> None:
+    interpreter = GatedInterpreter(["元亨", "利贞"])
+    with ServerThread(CastServer(qrng, interpreter, port=0)) as running:
+        status, headers, body = _get(running.server, "/interpret?question=%E9%97%AE%E4%BA%8B%EF%BC%9F&base=0&line=1")
+    assert status == 200 and headers["Content-Type"].startswith("text/event-stream")
+    events = _events(body)
+    assert events[0][0] == "cast" and events[0][1]["base"]["index"] == 0 and events[0][1]["moving_line"] == 1
+    assert [data["text"] for kind, data in events if kind == "delta"] == ["元亨", "利贞"]
+    assert events[-1] == ("done", {})
+    assert "问事" in interpreter.prompts[0]
+
+
+def test_backpressure_rejects_when_queue_full_and_shutdown_drains(qrng) -> None:
+    interpreter = GatedInterpreter(["慢", "答"])
+    interpreter.gate.clear()
+    running = ServerThread(CastServer(qrng, interpreter, port=0, concurrency=1, max_queue=0)).start()
+    server = running.server
+    result: dict = {}
+
+    def slow_stream() -> None:
+        result["response"] = _get(server, "/interpret?question=q&base=1&line=2")
+
+    streamer = threading.Thread(target=slow_stream)
+    streamer.start()
+    assert interpreter.started.wait(5)
+    status, headers, _ = _get(server, "/cast")
+    assert status == 503 and headers["Retry-After"] == "1"
+    assert server.stats().rejected == 1
+
+    # Shutdown waits for the in-flight stream instead of cutting it off.
+    stopper = threading.Thread(target=running.stop, kwargs={"grace_s": 5})
+    stopper.start()
+    time.sleep(0.1)
+    interpreter.gate.set()
+    stopper.join(10)
+    streamer.join(10)
+    events = _events(result["response"][2])
+    assert [kind for kind, _ in events] == ["cast", "delta", "delta", "done"]
+    with pytest.raises(OSError):
+        _get(server, "/cast")
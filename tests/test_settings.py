@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+import config.settings as settings_module
+from config.settings import get_settings, reload_settings
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    path = tmp_path / ".env"
+    monkeypatch.setattr(settings_module, "ENV_PATH", path)
+    monkeypatch.delenv("LLM_MODEL", raising=False)
+    monkeypatch.delenv("QRNG_POOL_SIZE", raising=False)
+    yield path
+    path.unlink(missing_ok=True)
+    reload_settings()
+
+
+def _touch(path, text: str, tick: int) -> None:
+    path.write_text(text, encoding="utf-8")
+    stamp = path.stat().st_mtime_ns + tick * 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_settings_are_parsed_once_until_env_file_changes(env_file) -> None:
+    _touch(env_file, "LLM_MODEL=first\nQRNG_POOL_SIZE=64\n", 0)
+    first = reload_settings()
+    assert first.llm_model == "first" and first.pool_size == 64
+    assert get_settings() is first
+
+    _touch(env_file, "LLM_MODEL=second\n", 1)
+    second = get_settings()
+    assert second is not first
+    assert second.llm_model == "second"
+    assert second.pool_size == 0  # dropped from the file, back to the default
+    assert get_settings() is second
+
+
+def test_real_environment_wins_and_invalidates(env_file, monkeypatch) -> None:
+    _touch(env_file, "LLM_MODEL=from-file\n", 0)
+    monkeypatch.setenv("LLM_MODEL", "from-env")
+    cached = reload_settings()
+    assert cached.llm_model == "from-env"
+
+    monkeypatch.setenv("LLM_MODEL", "changed")
+    assert get_settings().llm_model == "changed"
+    monkeypatch.delenv("LLM_MODEL")
+    assert get_settings().llm_model == "from-file"
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from core.speculative import SpeculativeCancelled, SpeculativeStreams
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _wait_for(predicate) -> None:
+    deadline = time.monotonic() + 5
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class GatedProducer:
+    """Yields one chunk per ``step()``; records whether the stream was closed."""
+
+    def __init__(self, chunks: list[str]) -> None:
+        self._chunks = chunks
+        self._gate = threading.Semaphore(0)
+        self.closed = threading.Event()
+        self.emitted = 0
+
+    def step(self, n: int = 1) -> None:
+        for _ in range(n):
+            self._gate.release()
+
+    def __call__(self):
+        try:
+            for chunk in self._chunks:
+                self._gate.acquire(timeout=5)
+                self.emitted += 1
+                yield chunk
+        finally:
+            self.closed.set()
+
+
+def test_attach_replays_buffer_then_follows_live_stream() -> None:
+    streams = SpeculativeStreams(timeout_s=60)
+    producer = GatedProducer(["乾", "为", "天"])
+    try:
+        streams.start("s", "prompt", producer)
+        producer.step(2)
+        assert streams.claim("s", "other prompt") is None
+        stream = streams.claim("s", "prompt")
+        assert stream is not None
+        _wait_for(lambda: stream.text == "乾为")
+        reader = stream.attach()
+        assert next(reader) == "乾为"  # replayed in one piece
+        producer.step()
+        assert "".join(reader) == "天"
+        assert producer.closed.wait(5)
+        assert streams.claim("s", "prompt") is None  # used once
+    finally:
+        streams.close()
+
+
+def test_unopened_answer_is_cancelled_after_timeout() -> None:
+    clock = FakeClock()
+    streams = SpeculativeStreams(timeout_s=30, clock=clock)
+    producer = GatedProducer(["a", "b", "c", "d"])
+    try:
+        stream = streams.start("s", "prompt", producer)
+        producer.step()
+        _wait_for(lambda: stream.text == "a")
+        clock.now = 31.0
+        producer.step(3)
+        assert producer.closed.wait(5)
+        assert producer.emitted == 2  # stopped at the first chunk past the deadline
+        assert stream.cancelled
+        assert streams.claim("s", "prompt") is None
+        assert streams.expired == 1
+        with pytest.raises(SpeculativeCancelled):
+            next(stream.attach())
+    finally:
+        streams.close()
+
+
+def test_producer_errors_reach_the_reader_and_new_cast_replaces_old() -> None:
+    def failing():
+        yield "部分"
+        raise RuntimeError("upstream 500")
+
+    streams = SpeculativeStreams(timeout_s=60)
+    try:
+        first = streams.start("s", "old", GatedProducer(["x"]))
+        streams.start("s", "new", failing)
+        assert first.cancelled
+        stream = streams.claim("s", "new")
+        assert stream is not None
+        with pytest.raises(RuntimeError, match="upstream 500"):
+            list(stream.attach())
+        assert stream.text == "部分"
+    finally:
+        streams.close()
+
+
+def test_blocked_producer_is_cancelled_and_released_at_the_deadline() -> None:
+    unblock = threading.Event()
+    released = threading.Event()
+
+    def stalled():
+        yield "a"
+        unblock.wait(5)  # upstream stalls: no chunk ever reaches the deadline check
+        yield "b"
+
+    streams = SpeculativeStreams(timeout_s=0.05)
+    try:
+        stream = streams.start("s", "prompt", stalled, release=released.set)
+        assert released.wait(2)
+        assert stream.cancelled and not stream.done
+        assert streams.claim("s", "prompt") is None
+        unblock.set()
+        _wait_for(lambda: stream.done)
+        assert stream.text == "a"
+    finally:
+        unblock.set()
+        streams.close()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+from dataclasses import replace
+
+from config.settings import get_settings
+from core.qrng import QRNGProvider
+from core.spool import EntropySpool
+
+
+class CountingFetch:
+    def __init__(self) -> None:
+        self.served = bytearray()
+
+    def __call__(self, length: int) -> tuple[str, bytes]:
+        data = os.urandom(length)
+        self.served += data
+        return "LFDR", data
+
+
+def test_spool_never_serves_a_byte_twice_across_restarts(tmp_path) -> None:
+    fetch = CountingFetch()
+    spool = EntropySpool(tmp_path, fetch, target_size=64, block_size=16, background=False)
+    spool.fill()
+    assert spool.stats().available == 64
+    first = spool.take(10)
+    spool.close()  # simulate a restart: only the files survive
+
+    reopened = EntropySpool(tmp_path, fetch, target_size=64, block_size=16, background=False)
+    assert reopened.stats().available == 54
+    second = reopened.take(54)
+    assert reopened.take(1) is None
+    reopened.close()
+
+    served = b"".join(data for _, data in first + second)
+    assert served == bytes(fetch.served)
+    assert {source for source, _ in first + second} == {"LFDR"}
+
+
+def test_spool_compacts_consumed_segments_and_respects_max_size(tmp_path) -> None:
+    spool = EntropySpool(
+        tmp_path, CountingFetch(), target_size=64, max_size=48, block_size=8,
+        segment_size=16, background=False,
+    )
+    spool.fill()
+    stats = spool.stats()
+    assert stats.disk_bytes == 48 and stats.segments == 3
+    spool.take(40)
+    assert spool.stats().segments == 1
+    assert len(list(tmp_path.glob("seg-*.bin"))) == 1
+    spool.fill()
+    assert spool.stats().available == 8 + 32
+    spool.close()
+
+
+def test_spool_keeps_topping_up_when_max_size_is_below_segment_size(tmp_path) -> None:
+    spool = EntropySpool(
+        tmp_path, CountingFetch(), target_size=1024, max_size=8192, block_size=512,
+        background=False,
+    )
+    for _ in range(20):
+        spool.fill()
+        assert spool.take(1024) is not None
+    assert spool.stats().disk_bytes <= 8192
+    spool.close()
+
+
+def test_spool_drops_data_of_a_torn_append(tmp_path) -> None:
+    spool = EntropySpool(tmp_path, CountingFetch(), target_size=200, block_size=200, background=False)
+    spool.fill()
+    spool.close()
+    # Crash between writing the data and its index record.
+    (segment,) = tmp_path.glob("seg-*.bin")
+    with open(segment, "ab") as fh:
+        fh.write(os.urandom(50))
+
+    reopened = EntropySpool(tmp_path, CountingFetch(), target_size=300, block_size=100, background=False)
+    assert segment.stat().st_size == 200
+    reopened.fill()
+    assert reopened.stats().available == 300
+    served = reopened.take(300)
+    assert sum(len(data) for _, data in served) == 300
+    reopened.close()
+
+
+def test_provider_serves_from_spool_before_network(tmp_path) -> None:
+    spool = EntropySpool(tmp_path, CountingFetch(), target_size=32, background=False)
+    spool.fill()
+    spool.close()
+
+    class NoNetwork:
+        def get_bytes(self, length: int) -> bytes:
+            raise AssertionError("network used")
+
+    settings = replace(get_settings(), spool_dir=str(tmp_path), spool_target=0)
+    provider = QRNGProvider(settings=settings, lfdr=NoNetwork(), anu=NoNetwork())
+    assert len(provider.get_bytes(2)) == 2
+    assert list(provider.history)[0][0] == "LFDR"
+    assert provider.spool_stats().available == 30
+    provider.close()
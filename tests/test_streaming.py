@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from ui.streaming import StreamRenderer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_renders_are_coalesced_per_frame() -> None:
+    clock = FakeClock()
+    frames: list[str] = []
+    renderer = StreamRenderer(frames.append, min_interval_s=0.1, flush_chars=1000, clock=clock)
+    for i in range(100):
+        renderer.feed(f"{i % 10}")
+        clock.now += 0.01
+    assert renderer.finish() == "0123456789" * 10
+    assert renderer.chunks == 100
+    # first chunk immediately, then about one render per 0.1s, plus the tail
+    assert 9 <= renderer.renders <= 12
+    assert frames[0] == "0" and frames[-1] == renderer.text
+    assert all(b.startswith(a) for a, b in zip(frames, frames[1:]))
+
+
+def test_large_backlog_flushes_before_interval_and_finish_is_idempotent() -> None:
+    clock = FakeClock()
+    frames: list[str] = []
+    renderer = StreamRenderer(frames.append, min_interval_s=10.0, flush_chars=7, clock=clock)
+    for piece in ["起", "卦", "四字", "五六七八", "九"]:
+        renderer.feed(piece)
+    assert frames == ["起", "起卦四字五六七八"]
+    assert renderer.finish() == "起卦四字五六七八九"
+    assert renderer.finish() == "起卦四字五六七八九"
+    assert renderer.renders == 3
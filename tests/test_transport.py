@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bench.stub_server import StubQRNGServer
+from config.settings import get_settings
+from core.qrng import AnuClient, LfdrClient, QRNGError
+from core.transport import AsyncHTTPTransport, HTTPTransport, TransportError
+
+
+@pytest.fixture()
+def server():
+    with StubQRNGServer() as stub:
+        yield stub
+
+
+def test_transport_reuses_keep_alive_connection(server: StubQRNGServer) -> None:
+    transport = HTTPTransport()
+    settings = replace(
+        get_settings(),
+        lfdr_url=f"{server.base_url}/lfdr",
+        anu_url=f"{server.base_url}/anu",
+        anu_key="test",
+    )
+    lfdr = LfdrClient(settings, transport=transport)
+    anu = AnuClient(settings, transport=transport)
+    for _ in range(5):
+        assert len(lfdr.get_bytes(3)) == 3
+        assert len(anu.get_bytes(2)) == 2
+    assert transport.connections_opened == 1
+    assert server.connections == 1
+    transport.close()
+
+
+def test_transport_evicts_idle_connections(server: StubQRNGServer) -> None:
+    transport = HTTPTransport(idle_timeout_s=-1.0)
+    for _ in range(3):
+        transport.get(f"{server.base_url}/lfdr?length=1", None, timeout_s=2.0)
+    assert transport.connections_opened == 3
+    transport.close()
+
+
+def test_transport_http_error_maps_to_qrng_error(server: StubQRNGServer) -> None:
+    transport = HTTPTransport()
+    with pytest.raises(TransportError):
+        transport.get(f"{server.base_url}/missing", None, timeout_s=2.0)
+    settings = replace(get_settings(), lfdr_url=f"{server.base_url}/missing")
+    with pytest.raises(QRNGError):
+        LfdrClient(settings, transport=transport).get_bytes(1)
+    transport.close()
+
+
+class _Redirector(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    paths: list[tuple[str, str | None]] = []
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        self.paths.append((self.path, self.headers.get("x-api-key")))
+        if self.path.startswith("/loop"):
+            self._reply(302, b"", location="/loop")
+        elif self.path.startswith("/moved"):
+            self._reply(301, b"", location=self.server.target)
+        else:
+            self._reply(200, b"proxied" if self.path.startswith("http://") else b"direct")
+
+    def _reply(self, status: int, body: bytes, location: str | None = None) -> None:
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture()
+def helper():
+    _Redirector.paths = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Redirector)
+    httpd.target = ""
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_transport_follows_redirects_and_stops_loops(server: StubQRNGServer, helper) -> None:
+    base = f"http://127.0.0.1:{helper.server_address[1]}"
+    helper.target = f"{server.base_url}/lfdr?length=4"
+    transport = HTTPTransport(max_redirects=3)
+    body = transport.get(f"{base}/moved", {"x-api-key": "secret"}, timeout_s=2.0)
+    assert len(body) > 0 and body != b"direct"
+    assert _Redirector.paths == [("/moved", "secret")]
+
+    with pytest.raises(TransportError, match="redirects"):
+        transport.get(f"{base}/loop", {"x-api-key": "secret"}, timeout_s=2.0)
+    assert [key for _, key in _Redirector.paths[1:]] == ["secret"] * 4  # same host: key kept
+    transport.close()
+
+
+def test_transport_uses_proxy_unless_bypassed(helper) -> None:
+    proxy = f"http://127.0.0.1:{helper.server_address[1]}"
+    transport = HTTPTransport(proxies={"http": proxy, "no": "127.0.0.1"})
+    assert transport.get("http://qrng.test/lfdr?length=1", None, timeout_s=2.0) == b"proxied"
+    assert transport.get(f"{proxy}/lfdr", None, timeout_s=2.0) == b"direct"
+    assert _Redirector.paths == [("http://qrng.test/lfdr?length=1", None), ("/lfdr", None)]
+    transport.close()
+
+
+def test_async_transport_follows_redirects_and_uses_proxy(server: StubQRNGServer, helper) -> None:
+    base = f"http://127.0.0.1:{helper.server_address[1]}"
+    helper.target = f"{server.base_url}/lfdr?length=4"
+
+    async def run() -> None:
+        transport = AsyncHTTPTransport(max_redirects=3)
+        body = await transport.get(f"{base}/moved", {"x-api-key": "secret"}, timeout_s=2.0)
+        assert len(body) > 0 and body != b"direct"
+        with pytest.raises(TransportError, match="redirects"):
+            await transport.get(f"{base}/loop", None, timeout_s=2.0)
+        await transport.aclose()
+
+        proxied = AsyncHTTPTransport(proxies={"http": base, "no": "127.0.0.1"})
+        assert await proxied.get("http://qrng.test/lfdr?length=1", None, timeout_s=2.0) == b"proxied"
+        assert await proxied.get(f"{base}/lfdr", None, timeout_s=2.0) == b"direct"
+        await proxied.aclose()
+
+    asyncio.run(run())
+    assert _Redirector.paths[0] == ("/moved", "secret")
+    assert _Redirector.paths[-2:] == [("http://qrng.test/lfdr?length=1", None), ("/lfdr", None)]
@@ -1,19 +1,39 @@
 from __future__ import annotations
 
+import math
 import os
 import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 import streamlit as st
+from streamlit.delta_generator import DeltaGenerator
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from config.settings import get_settings
-from core.casting import CastingResult, cast_hexagram
-from core.llm import LLMError, build_llm_config, stream_chat_completion
+from config.settings import Settings, get_settings
+from core.casting import CAST_BYTES, CastingResult, cast_hexagram
+from core.health import format_health
+from core.llm import (
+    LLMError,
+    build_llm_config,
+    context_window,
+    stream_chat_completion,
+    stream_interpretation,
+)
+from core.pregen import InterpretationStore
+from core.prompts import format_prompt
+from core.prefetch import EntropyPrefetcher, format_prefetch
+from core.qrng import QRNGProvider
+from core.quota import SessionQuotas
+from core.speculative import SpeculativeCancelled, SpeculativeStreams
 from ui.cli import render_hexagram
+from ui.streaming import StreamRenderer
 
 
 def _load_streamlit_secrets() -> None:
@@ -283,27 +303,215 @@ if "is_streaming" not in st.session_state:
     st.session_state.is_streaming = False
 if "pending_user_input" not in st.session_state:
     st.session_state.pending_user_input = None
+if "qrng_health" not in st.session_state:
+    st.session_state.qrng_health = []
+if "context_window" not in st.session_state:
+    st.session_state.context_window = None
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 _load_streamlit_secrets()
 
-def _load_prompt_template() -> str:
-    prompt_path = ROOT / "prompts" / "llm_prompt.txt"
-    try:
-        return prompt_path.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return "我起卦占断，所问：{question}\n本卦：{base_name}\n动爻：第 {moving_line} 爻\n之卦：{changed_name}\n请结合卦象给出解读与建议。"
-
-
-def _format_prompt(result: CastingResult, question: str) -> str:
-    template = _load_prompt_template()
-    return template.format(
-        question=question.strip(),
-        base_name=result.base.display_name,
-        moving_line=result.moving_line,
-        changed_name=result.changed.display_name,
+
+@dataclass
+class _Shared:
+    provider: QRNGProvider
+    entropy_quota: SessionQuotas
+    llm_quota: SessionQuotas
+    llm_slots: threading.BoundedSemaphore
+    prefetcher: EntropyPrefetcher | None
+    speculative: SpeculativeStreams | None
+
+    def close(self) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.speculative is not None:
+            self.speculative.close()
+        self.provider.close()
+
+
+def _build_shared(settings: Settings) -> _Shared:
+    provider = QRNGProvider(settings)
+    # A cast must fit in the bucket, or it could never be granted.
+    entropy_quota = SessionQuotas(settings.session_entropy_rate, max(settings.session_entropy_burst, CAST_BYTES))
+    return _Shared(
+        provider=provider,
+        entropy_quota=entropy_quota,
+        llm_quota=SessionQuotas(settings.session_llm_rate, settings.session_llm_burst),
+        llm_slots=threading.BoundedSemaphore(max(1, settings.llm_max_concurrency)),
+        prefetcher=EntropyPrefetcher(provider, quota=entropy_quota) if settings.prefetch else None,
+        speculative=(
+            SpeculativeStreams(settings.llm_speculative_timeout_s, workers=settings.llm_max_concurrency)
+            if settings.llm_speculative
+            else None
+        ),
     )
 
 
+# How long a replaced bundle stays open for sessions that fetched it before
+# the settings changed and are still mid-cast or mid-stream.
+_RETIRE_GRACE_S = 120.0
+
+
+class _SharedSlot:
+    """The current _Shared bundle; replaced when settings change.
+
+    The old bundle is closed after ``_RETIRE_GRACE_S`` rather than at once:
+    other sessions may already hold it in the same rerun.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key: int | None = None
+        self._shared: _Shared | None = None
+
+    def get(self, settings: Settings) -> _Shared:
+        key = hash(settings)
+        with self._lock:
+            if self._shared is None or self._key != key:
+                previous = self._shared
+                self._shared, self._key = _build_shared(settings), key
+                if previous is not None:
+                    _retire(previous)
+            return self._shared
+
+
+def _retire(shared: _Shared, grace_s: float = _RETIRE_GRACE_S) -> None:
+    timer = threading.Timer(grace_s, shared.close)
+    timer.daemon = True
+    timer.start()
+
+
+@st.cache_resource
+def _shared_slot() -> _SharedSlot:
+    # One provider (warm connections, pool, breakers) for every session.
+    return _SharedSlot()
+
+
+def _shared() -> _Shared:
+    return _shared_slot().get(get_settings())
+
+
+@st.cache_resource(max_entries=1)
+def _load_baseline(path: str, mtime: float) -> InterpretationStore:
+    # mtime is part of the cache key, so a regenerated file is picked up;
+    # one entry only, or every append during a pregen run would stay cached.
+    return InterpretationStore(path)
+
+
+def _baseline_text(result: CastingResult) -> str | None:
+    path = get_settings().baseline_path
+    if not path or not os.path.exists(path):
+        return None
+    return _load_baseline(path, os.path.getmtime(path)).get_cast(result)
+
+
+def _chat_messages(result: CastingResult, question: str) -> List[dict[str, str]]:
+    messages: List[dict[str, str]] = []
+    # seed context
+    if not any(role == "system" for role, _ in st.session_state.chat_history):
+        messages.append({"role": "user", "content": format_prompt(result, question)})
+    for role, content in st.session_state.chat_history:
+        messages.append({"role": role, "content": content})
+    return messages
+
+
+def _start_speculative(result: CastingResult, question: str) -> None:
+    """Start the first-turn answer in the background right after a cast."""
+    shared = _shared()
+    if shared.speculative is None:
+        return
+    session_id = st.session_state.session_id
+    shared.speculative.discard(session_id)
+    try:
+        config = build_llm_config(get_settings())
+    except LLMError:
+        return
+    # 只占用空闲的并发名额，且计入本会话的配额；不足时等用户点击再请求
+    slots = shared.llm_slots
+    if not slots.acquire(blocking=False):
+        return
+    if shared.llm_quota.try_take(session_id):
+        slots.release()
+        return
+    prompt = format_prompt(result, question)
+    # 无人查看时到期即归还名额；请求本身的网络等待也以同一时限为界
+    timeout_s = shared.speculative.timeout_s
+
+    def produce() -> Iterator[str]:
+        return stream_interpretation(prompt, config, question=question, timeout_s=timeout_s)
+
+    shared.speculative.start(session_id, prompt, produce, release=slots.release)
+
+
+def _summary_admission(shared: _Shared, session_id: str, timeout_s: float):
+    """Admission for background summaries: same slots and quota as a reply."""
+
+    @contextmanager
+    def admit() -> Iterator[None]:
+        if not shared.llm_slots.acquire(timeout=timeout_s):
+            raise LLMError("AI 解读繁忙，摘要稍后再试")
+        try:
+            if shared.llm_quota.try_take(session_id):
+                raise LLMError("本会话 AI 配额不足，摘要稍后再试")
+            yield
+        finally:
+            shared.llm_slots.release()
+
+    return admit
+
+
+def _stream_reply(placeholder: DeltaGenerator, result: CastingResult, question: str) -> None:
+    shared = _shared()
+    settings = get_settings()
+    first_turn = [role for role, _ in st.session_state.chat_history] == ["system"]
+    speculative = None
+    if first_turn and shared.speculative is not None:
+        speculative = shared.speculative.claim(st.session_state.session_id, st.session_state.chat_history[0][1])
+    if speculative is None:
+        # 全局并发上限：所有会话共享，排队超时即提示繁忙；拿到名额后再扣配额，超时不会白扣
+        if not shared.llm_slots.acquire(timeout=settings.timeout_s):
+            st.warning("AI 解读繁忙，请稍后再试。")
+            return
+        wait_s = shared.llm_quota.try_take(st.session_state.session_id)
+        if wait_s:
+            shared.llm_slots.release()
+            st.warning(f"追问过于频繁，请 {math.ceil(wait_s)} 秒后再试。")
+            return
+    with st.spinner(""):
+        try:
+            st.session_state.is_streaming = True
+            if speculative is not None:
+                # 起卦后已在后台生成：先回放已到达的部分，再接续实时流
+                stream = speculative.attach()
+            elif first_turn:
+                # 仅含卦象提示时走解读缓存，相同卦象与问题直接回放
+                prompt = st.session_state.chat_history[0][1]
+                stream = stream_interpretation(prompt, build_llm_config(settings), question=question)
+            else:
+                config = build_llm_config(settings)
+                # 界面保留完整历史，发给模型的是按 token 预算截取并附摘要的视图
+                if st.session_state.context_window is None:
+                    # 后台摘要同样占用并发名额并计入本会话配额
+                    admit = _summary_admission(shared, st.session_state.session_id, settings.timeout_s)
+                    st.session_state.context_window = context_window(config, settings, admit)
+                messages = st.session_state.context_window.view(_chat_messages(result, question))
+                stream = stream_chat_completion(messages, config)
+            renderer = StreamRenderer(placeholder.markdown)
+            for chunk in stream:
+                renderer.feed(chunk)
+            full = renderer.finish().strip()
+            st.session_state.chat_history.append(("assistant", full))
+            if settings.ui_debug:
+                st.caption(f"流式 {renderer.chunks} 段 · 渲染 {renderer.renders} 次")
+        except (LLMError, SpeculativeCancelled) as exc:
+            st.error(f"AI 解读失败：{exc}")
+        finally:
+            st.session_state.is_streaming = False
+            if speculative is None:
+                shared.llm_slots.release()
+
+
 def _render_chat_area(result: CastingResult, question: str) -> None:
     st.markdown('<div class="q-divider"></div>', unsafe_allow_html=True)
     st.markdown('<div class="q-title">AI 解读</div>', unsafe_allow_html=True)
@@ -323,25 +531,12 @@ def _render_chat_area(result: CastingResult, question: str) -> None:
         has_assistant = any(role == "assistant" for role, _ in st.session_state.chat_history)
         if st.session_state.show_llm and not has_assistant:
             with st.chat_message("assistant", avatar="⚫️"):
-                with st.spinner(""):
-                    try:
-                        st.session_state.is_streaming = True
-                        settings = get_settings()
-                        config = build_llm_config(settings)
-                        messages: List[dict[str, str]] = []
-                        for role, content in st.session_state.chat_history:
-                            messages.append({"role": role, "content": content})
-                        chunks: list[str] = []
-                        placeholder = st.empty()
-                        for chunk in stream_chat_completion(messages, config):
-                            chunks.append(chunk)
-                            placeholder.markdown("".join(chunks))
-                        full = "".join(chunks).strip()
-                        st.session_state.chat_history.append(("assistant", full))
-                    except LLMError as exc:
-                        st.error(f"AI 解读失败：{exc}")
-                    finally:
-                        st.session_state.is_streaming = False
+                # 预生成的通用解读先行展示，个性化回答到达后替换
+                placeholder = st.empty()
+                baseline = _baseline_text(result)
+                if baseline:
+                    placeholder.markdown(baseline)
+                _stream_reply(placeholder, result, question)
 
         if st.session_state.pending_user_input:
             user_input = st.session_state.pending_user_input
@@ -350,31 +545,8 @@ def _render_chat_area(result: CastingResult, question: str) -> None:
             with st.chat_message("user", avatar="🌕"):
                 st.markdown(user_input)
 
-            placeholder = st.chat_message("assistant", avatar="⚫️")
-            with placeholder:
-                with st.spinner(""):
-                    try:
-                        st.session_state.is_streaming = True
-                        settings = get_settings()
-                        config = build_llm_config(settings)
-                        messages: List[dict[str, str]] = []
-                        # seed context
-                        if not any(role == "system" for role, _ in st.session_state.chat_history):
-                            seed = _format_prompt(result, question)
-                            messages.append({"role": "user", "content": seed})
-                        for role, content in st.session_state.chat_history:
-                            messages.append({"role": role, "content": content})
-                        chunks: list[str] = []
-                        out = st.empty()
-                        for chunk in stream_chat_completion(messages, config):
-                            chunks.append(chunk)
-                            out.markdown("".join(chunks))
-                        full = "".join(chunks).strip()
-                        st.session_state.chat_history.append(("assistant", full))
-                    except LLMError as exc:
-                        st.error(f"AI 解读失败：{exc}")
-                    finally:
-                        st.session_state.is_streaming = False
+            with st.chat_message("assistant", avatar="⚫️"):
+                _stream_reply(st.empty(), result, question)
 
         if not st.session_state.is_streaming and not st.session_state.pending_user_input:
             user_input = st.chat_input("可继续追问，或让 AI 解释卦意")
@@ -426,13 +598,36 @@ else:
             label_visibility="collapsed",
         )
         can_cast = bool(question.strip())
+        shared = _shared()
+        prefetcher = shared.prefetcher
+        # 用户输入问题时即在后台预取一次起卦所需的字节
+        if prefetcher is not None:
+            prefetcher.reserve(st.session_state.session_id)
         if st.button("所问既明，起卦在此。", disabled=not can_cast, use_container_width=True):
             with st.spinner("起卦接引中……"):
-                result = cast_hexagram()
-            st.session_state.last_cast = result
-            st.session_state.last_question = question.strip()
-            st.session_state.show_llm = False
-            st.session_state.chat_history = []
+                reserved = None
+                if prefetcher is not None:
+                    # 预取字节只用一次：取出即从会话解绑，失败则现取
+                    reserved = prefetcher.take(st.session_state.session_id, get_settings().timeout_s)
+                # 预取的字节在预约时已计入会话配额；过期或失败的预约会退回配额
+                wait_s = 0.0 if reserved else shared.entropy_quota.try_take(st.session_state.session_id, CAST_BYTES)
+                result = None
+                if not wait_s:
+                    try:
+                        result = cast_hexagram(shared.provider, reserved or b"")
+                    finally:
+                        st.session_state.qrng_health = shared.provider.health()
+                        if prefetcher is not None:
+                            prefetcher.reserve(st.session_state.session_id)
+            if result is None:
+                st.warning(f"起卦过于频繁，请 {math.ceil(wait_s)} 秒后再试。")
+            else:
+                st.session_state.last_cast = result
+                st.session_state.last_question = question.strip()
+                st.session_state.show_llm = False
+                st.session_state.chat_history = []
+                st.session_state.context_window = None
+                _start_speculative(result, st.session_state.last_question)
 
         # 展示最新一次起卦结果
         if st.session_state.last_cast:
@@ -444,13 +639,18 @@ else:
             )
             st.subheader(f"之卦：{result.changed.display_name}")
             st.code(render_hexagram(result.changed.bits), language="text")
+            if st.session_state.qrng_health:
+                st.caption(" · ".join(format_health(s) for s in st.session_state.qrng_health))
+            if prefetcher is not None:
+                st.caption(format_prefetch(prefetcher.stats()))
 
             st.markdown('<div class="q-divider"></div>', unsafe_allow_html=True)
             if st.button("AI 解读此卦", use_container_width=True):
                 st.session_state.show_llm = True
                 # 立即触发首轮解读（作为系统上下文，不显示）
-                system_prompt = _format_prompt(st.session_state.last_cast, st.session_state.last_question)
+                system_prompt = format_prompt(st.session_state.last_cast, st.session_state.last_question)
                 st.session_state.chat_history = [("system", system_prompt)]
+                st.session_state.context_window = None
                 st.rerun()
 
         if st.session_state.show_llm and st.session_state.last_cast:
@@ -1,46 +1,187 @@
 from __future__ import annotations
 
 import argparse
+import io
+import json
+import sys
+import time
+from typing import BinaryIO, Callable
 
-from core.casting import cast_hexagram
-from core.qrng import QRNGProvider
+import numpy as np
 
+from config.settings import get_settings
+from core.casting import CastBatch, cast_hexagram, cast_stream
+from core.entropy_tests import format_entropy_test
+from core.health import format_health
+from core.hexagrams import Hexagram
+from core.qrng import QRNGError, QRNGProvider
 
-def _line_str(bit: int) -> str:
-    return "-----" if bit == 1 else "-- --"
+FORMATS = ("jsonl", "csv", "bin")
+CSV_HEADER = b"base,base_name,moving_line,changed,changed_name\n"
+_WRITE_BUFFER = 1 << 20
 
 
 def render_hexagram(bits: tuple[int, ...], moving_line: int | None = None) -> str:
-    lines = []
-    for idx in range(5, -1, -1):
-        line = _line_str(bits[idx])
-        if moving_line is not None and moving_line - 1 == idx:
-            line = f"{line}  *"
-        lines.append(line)
-    return "\n".join(lines)
+    return Hexagram(bits=bits).render(moving_line)
 
 
-def main() -> None:
+def _row_table(fmt: str) -> list[bytes]:
+    # One pre-encoded row per (base, moving line): a batch is then a join of lookups.
+    rows = []
+    for index in range(64):
+        base = Hexagram.from_int(index)
+        for line in range(1, 7):
+            changed = base.changed(line)
+            if fmt == "jsonl":
+                record = {
+                    "base": index,
+                    "base_name": base.display_name,
+                    "moving_line": line,
+                    "changed": changed.index,
+                    "changed_name": changed.display_name,
+                }
+                row = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            else:
+                row = f"{index},{base.display_name},{line},{changed.index},{changed.display_name}\n"
+            rows.append(row.encode("utf-8"))
+    return rows
+
+
+def batch_encoder(fmt: str) -> Callable[[CastBatch], bytes]:
+    """Encoder turning a CastBatch into ``fmt`` records.
+
+    ``bin`` is two bytes per cast: base index (0..63), then moving line (1..6).
+    """
+    if fmt == "bin":
+        return lambda batch: np.column_stack((batch.base, batch.moving_line)).astype(np.uint8).tobytes()
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format: {fmt}")
+    table = _row_table(fmt)
+
+    def encode(batch: CastBatch) -> bytes:
+        pairs = batch.base.astype(np.intp) * 6 + batch.moving_line - 1
+        return b"".join([table[i] for i in pairs.tolist()])
+
+    return encode
+
+
+class _Progress:
+    """Throttled one-line progress on stderr."""
+
+    def __init__(self, total: int, interval_s: float = 0.5) -> None:
+        self.total = total
+        self.interval_s = interval_s
+        self.start = time.perf_counter()
+        self._last = self.start
+
+    def update(self, done: int, written: int, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not final and now - self._last < self.interval_s:
+            return
+        self._last = now
+        elapsed = max(now - self.start, 1e-9)
+        line = (
+            f"\r{done}/{self.total} casts  {done / elapsed:,.0f} casts/s  "
+            f"{written / elapsed / 1e6:.2f} MB/s  {elapsed:.1f}s"
+        )
+        print(line, end="\n" if final else "", file=sys.stderr, flush=True)
+
+
+def bulk(
+    provider: QRNGProvider,
+    count: int,
+    fmt: str,
+    out: BinaryIO,
+    block_size: int = 1024,
+    depth: int = 4,
+    progress: bool = True,
+) -> int:
+    """Stream ``count`` casts to ``out`` as ``fmt``; return the bytes written."""
+    encode = batch_encoder(fmt)
+    meter = _Progress(count) if progress else None
+    written = 0
+    done = 0
+    if fmt == "csv":
+        written += out.write(CSV_HEADER)
+    for batch in cast_stream(provider, count, block_size=block_size, depth=depth):
+        written += out.write(encode(batch))
+        done += len(batch)
+        if meter is not None:
+            meter.update(done, written)
+    out.flush()
+    if meter is not None:
+        meter.update(done, written, final=True)
+    return written
+
+
+def _bulk_main(args: argparse.Namespace) -> int:
+    if args.format == "bin" and args.out in (None, "-") and sys.stdout.isatty():
+        print("Refusing to write binary records to a terminal; use --out or a pipe.", file=sys.stderr)
+        return 2
+    if args.out in (None, "-"):
+        out = io.BufferedWriter(io.FileIO(sys.stdout.fileno(), "wb", closefd=False), _WRITE_BUFFER)
+    else:
+        out = open(args.out, "wb", buffering=_WRITE_BUFFER)
+    provider = QRNGProvider()
+    try:
+        bulk(provider, args.count, args.format, out, args.block, args.depth, progress=not args.quiet)
+    except BrokenPipeError:
+        return 0  # reader went away (e.g. piped into head)
+    except QRNGError as exc:
+        print(f"\nQRNG error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        provider.close()
+        try:
+            out.close()
+        except BrokenPipeError:
+            pass
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Q-Oracle CLI")
     parser.add_argument("--once", action="store_true", help="cast once and exit")
-    args = parser.parse_args()
+    parser.add_argument("--count", type=int, help="bulk mode: stream this many casts")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl", help="bulk output format")
+    parser.add_argument("--out", help="bulk output file (default stdout)")
+    parser.add_argument(
+        "--block", type=int, default=get_settings().pool_block_size, help="entropy bytes per request"
+    )
+    parser.add_argument("--depth", type=int, default=4, help="entropy requests kept in flight")
+    parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    args = parser.parse_args(argv)
+
+    if args.count is not None:
+        if args.count < 0:
+            parser.error("--count must be >= 0")
+        return _bulk_main(args)
 
     provider = QRNGProvider()
-    result = cast_hexagram(provider)
+    try:
+        mark = provider.history.mark()
+        result = cast_hexagram(provider)
 
-    print(f"本卦: {result.base.display_name}")
-    print(render_hexagram(result.base.bits, moving_line=result.moving_line))
-    print("")
-    print(f"之卦: {result.changed.display_name}")
-    print(render_hexagram(result.changed.bits))
-    print("")
-    for idx, (source, data) in enumerate(provider.history, start=1):
-        print(f"随机源[{idx}] {source}: {data.hex()}")
+        print(f"本卦: {result.base.display_name}")
+        print(render_hexagram(result.base.bits, moving_line=result.moving_line))
+        print("")
+        print(f"之卦: {result.changed.display_name}")
+        print(render_hexagram(result.changed.bits))
+        print("")
+        for idx, (source, data) in enumerate(provider.history.since(mark), start=1):
+            print(f"随机源[{idx}] {source}: {data.hex()}")
+        for snapshot in provider.health():
+            print(f"后端状态 {format_health(snapshot)}")
+        for snapshot in provider.entropy_tests():
+            print(f"健康检测 {format_entropy_test(snapshot)}")
+    finally:
+        provider.close()
 
     if not args.once:
         print("")
         print("提示: 使用 --once 仅生成一次结果")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,476 @@
+"""Headless HTTP casting service (asyncio, standard library only).
+
+    python -m ui.server                                  # 127.0.0.1:8765
+    python -m ui.server --host 0.0.0.0 --port 8080 --concurrency 32 --max-queue 128
+
+Endpoints (all GET):
+    /cast                                one cast as JSON
+    /casts?n=100                         n casts (at most --max-batch) as JSON
+    /interpret?question=...[&base=0..63&line=1..6]
+                                         Server-Sent Events: a ``cast`` event, ``delta``
+                                         events with the interpretation, then ``done``
+                                         (or ``error``); casts first unless base/line given
+    /health                              backend breakers and server counters
+
+Every endpoint shares one QRNGProvider. At most --concurrency requests run at
+once and at most --max-queue wait for a slot; beyond that the server answers
+503 with Retry-After. SIGINT/SIGTERM stop accepting connections and give
+in-flight requests --grace seconds to finish.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from config.settings import Settings, get_settings
+from core.casting import CastingResult, cast_hexagram, cast_many
+from core.hexagrams import Hexagram
+from core.prompts import format_prompt
+from core.qrng import QRNGError, QRNGProvider
+
+# (rendered prompt, question) -> streamed answer chunks
+Interpret = Callable[[str, str], Iterable[str]]
+
+_MAX_HEADER_BYTES = 16 * 1024
+# Every endpoint is a GET, so a request body is only drained, never used.
+_MAX_BODY_BYTES = 16 * 1024
+# Endpoints that take a concurrency slot; /health is answered inline.
+_ROUTES = {"/cast": "_cast", "/casts": "_casts", "/interpret": "_interpret"}
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: dict[str, str] | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+@dataclass(frozen=True)
+class ServerStats:
+    requests: int
+    active: int
+    queued: int
+    rejected: int
+    errors: int
+    streams: int
+
+
+def hexagram_json(hexagram: Hexagram) -> dict:
+    return {"index": hexagram.index, "name": hexagram.display_name, "bits": list(hexagram.bits)}
+
+
+def cast_json(result: CastingResult) -> dict:
+    return {
+        "base": hexagram_json(result.base),
+        "moving_line": result.moving_line,
+        "changed": hexagram_json(result.changed),
+    }
+
+
+def llm_interpreter(settings: Settings) -> Interpret:
+    # Imported here so that serving casts needs no LLM SDK.
+    from core.llm import build_llm_config, stream_interpretation
+
+    config = build_llm_config(settings)
+    return lambda prompt, question: stream_interpretation(prompt, config, question=question)
+
+
+class CastServer:
+    """asyncio HTTP/1.1 server for casts and streamed interpretations.
+
+    Blocking work (QRNG fetches, the LLM stream) runs on a thread pool sized
+    to ``concurrency``. Streamed answers pass through a queue of at most
+    ``stream_buffer`` chunks, so a slow client slows the upstream read
+    instead of growing memory.
+    """
+
+    def __init__(
+        self,
+        provider: QRNGProvider,
+        interpret: Interpret | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        concurrency: int = 16,
+        max_queue: int = 64,
+        max_batch: int = 1000,
+        stream_buffer: int = 32,
+        idle_timeout_s: float = 30.0,
+    ) -> None:
+        self.provider = provider
+        self.interpret = interpret
+        self.host = host
+        self.port = port
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_batch = max_batch
+        self.stream_buffer = max(1, stream_buffer)
+        self.idle_timeout_s = idle_timeout_s
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="cast-server")
+        self._slots: asyncio.Semaphore | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: dict[asyncio.Task, bool] = {}  # task -> busy with a request
+        self._closing = False
+        self._requests = self._active = self._queued = self._rejected = self._errors = self._streams = 0
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=_MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def stats(self) -> ServerStats:
+        return ServerStats(
+            requests=self._requests,
+            active=self._active,
+            queued=self._queued,
+            rejected=self._rejected,
+            errors=self._errors,
+            streams=self._streams,
+        )
+
+    async def shutdown(self, grace_s: float = 10.0) -> None:
+        """Stop accepting, close idle connections, let running requests finish."""
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        pending = list(self._connections)
+        if pending:
+            _, late = await asyncio.wait(pending, timeout=grace_s)
+            for task in late:
+                task.cancel()
+            if late:
+                await asyncio.wait(late)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # -- connection handling -------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = False
+        try:
+            while not self._closing:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout_s)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_json(writer, 431, {"error": "headers too large"}, keep_alive=False)
+                    break
+                self._connections[task] = True
+                keep_alive = await self._handle_request(head, reader, writer)
+                self._connections[task] = False
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _handle_request(
+        self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        self._requests += 1
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self._send_json(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._send_json(writer, 400, {"error": "bad Content-Length"}, keep_alive=False)
+            return False
+        if length > _MAX_BODY_BYTES:
+            await self._send_json(writer, 413, {"error": "request body too large"}, keep_alive=False)
+            return False
+        if length:
+            try:
+                await reader.readexactly(length)  # GET only; a body is read and ignored
+            except asyncio.IncompleteReadError:
+                return False
+        keep_alive = (
+            not self._closing
+            and headers.get("connection", "").lower() != "close"
+            and version.upper() == "HTTP/1.1"
+        )
+
+        try:
+            if method != "GET":
+                raise _HTTPError(405, "only GET is supported", {"Allow": "GET"})
+            parts = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            path = unquote(parts.path).rstrip("/") or "/"
+            if path == "/health":
+                return await self._send_json(writer, 200, self._health(), keep_alive)
+            if path not in _ROUTES:
+                raise _HTTPError(404, f"no such endpoint: {parts.path}")
+            route = getattr(self, _ROUTES[path])
+            async with self._slot():
+                return await route(query, writer, keep_alive)
+        except _HTTPError as exc:
+            return await self._send_json(writer, exc.status, {"error": str(exc)}, keep_alive, exc.headers)
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as exc:  # noqa: BLE001 - a bug must not kill the connection silently
+            self._errors += 1
+            return await self._send_json(writer, 500, {"error": f"internal error: {exc}"}, keep_alive=False)
+
+    def _slot(self) -> "_Slot":
+        if self._slots.locked() and self._queued >= self.max_queue:
+            self._rejected += 1
+            raise _HTTPError(503, "server busy", {"Retry-After": "1"})
+        return _Slot(self)
+
+    async def _blocking(self, fn: Callable, *args: object):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except QRNGError as exc:
+            self._errors += 1
+            raise _HTTPError(503, f"QRNG unavailable: {exc}") from exc
+
+    # -- endpoints -------------------------------------------------------------
+
+    async def _cast(self, query: dict[str, str], writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        result = await self._blocking(cast_hexagram, self.provider)
+        return await self._send_json(writer, 200, cast_json(result), keep_alive)
+
+    async def _casts(self, query: dict[str, str], writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        n = _int_param(query, "n", 1, self.max_batch, default=1)
+        batch = await self._blocking(cast_many, self.provider, n)
+        return await self._send_json(writer, 200, {"n": n, "casts": [cast_json(r) for r in batch]}, keep_alive)
+
+    def _health(self) -> dict:
+        return {
+            "backends": [asdict(snapshot) for snapshot in self.provider.health()],
+            "server": asdict(self.stats()),
+        }
+
+    async def _interpret(self, query: dict[str, str], writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        if self.interpret is None:
+            raise _HTTPError(503, "LLM not configured")
+        question = query.get("question", "").strip()
+        if not question:
+            raise _HTTPError(400, "question is required")
+        if "base" in query or "line" in query:
+            base = Hexagram.from_int(_int_param(query, "base", 0, 63))
+            line = _int_param(query, "line", 1, 6)
+            result = CastingResult(base=base, changed=base.changed(line), moving_line=line)
+        else:
+            result = await self._blocking(cast_hexagram, self.provider)
+        prompt = format_prompt(result, question)
+
+        self._streams += 1
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        writer.write(_sse("cast", cast_json(result)))
+        await writer.drain()
+        await self._relay(prompt, question, writer)
+        return False
+
+    async def _relay(self, prompt: str, question: str, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[tuple[str, object]] = asyncio.Queue(self.stream_buffer)
+        stop = threading.Event()
+
+        def put(item: tuple[str, object]) -> bool:
+            # Blocks the worker while the queue is full, until the client
+            # catches up or goes away.
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    future.result(0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def pump() -> None:
+            stream = iter(self.interpret(prompt, question))
+            try:
+                for piece in stream:
+                    if stop.is_set() or not put(("delta", piece)):
+                        return
+                put(("done", None))
+            except Exception as exc:  # noqa: BLE001 - reported to the client as an event
+                put(("error", str(exc)))
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+
+        worker = loop.run_in_executor(self._executor, pump)
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "delta":
+                    writer.write(_sse("delta", {"text": payload}))
+                else:
+                    if kind == "error":
+                        self._errors += 1
+                    writer.write(_sse(kind, {} if payload is None else {"error": payload}))
+                await writer.drain()
+                if kind != "delta":
+                    break
+        finally:
+            stop.set()
+            # The worker notices at its next chunk; do not hold shutdown on a
+            # stalled upstream.
+            await asyncio.wait([worker], timeout=1.0)
+
+    async def _send_json(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: dict,
+        keep_alive: bool,
+        headers: dict[str, str] | None = None,
+    ) -> bool:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(payload)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+        return keep_alive
+
+
+class _Slot:
+    """Holds one of the server's concurrency slots, counting queued waiters."""
+
+    def __init__(self, server: CastServer) -> None:
+        self._server = server
+
+    async def __aenter__(self) -> None:
+        server = self._server
+        server._queued += 1
+        try:
+            await server._slots.acquire()
+        finally:
+            server._queued -= 1
+        server._active += 1
+
+    async def __aexit__(self, *exc: object) -> None:
+        self._server._active -= 1
+        self._server._slots.release()
+
+
+def _int_param(query: dict[str, str], name: str, low: int, high: int, default: int | None = None) -> int:
+    raw = query.get(name)
+    if raw is None:
+        if default is None:
+            raise _HTTPError(400, f"{name} is required")
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise _HTTPError(400, f"{name} must be an integer") from None
+    if not low <= value <= high:
+        raise _HTTPError(400, f"{name} must be in [{low}, {high}]")
+    return value
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def serve(server: CastServer, grace_s: float) -> None:
+    await server.start()
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopped.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # not on the main thread / not supported on this platform
+    print(f"Serving on {server.base_url}", file=sys.stderr)
+    await stopped.wait()
+    print("Shutting down...", file=sys.stderr)
+    await server.shutdown(grace_s)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Q-Oracle HTTP casting service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=16, help="requests handled at once")
+    parser.add_argument("--max-queue", type=int, default=64, help="requests waiting for a slot before 503")
+    parser.add_argument("--max-batch", type=int, default=1000, help="largest n for /casts")
+    parser.add_argument("--grace", type=float, default=10.0, help="seconds given to in-flight requests on shutdown")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    try:
+        interpret = llm_interpreter(settings)
+    except (ImportError, RuntimeError) as exc:
+        print(f"/interpret disabled: {exc}", file=sys.stderr)
+        interpret = None
+    provider = QRNGProvider(settings)
+    server = CastServer(
+        provider,
+        interpret,
+        host=args.host,
+        port=args.port,
+        concurrency=args.concurrency,
+        max_queue=args.max_queue,
+        max_batch=args.max_batch,
+    )
+    try:
+        asyncio.run(serve(server, args.grace))
+    finally:
+        provider.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+
+class StreamRenderer:
+    """Coalesces streamed chunks into a bounded number of placeholder renders.
+
+    Chunks are buffered and ``render`` is called with the full text at most
+    once per ``min_interval_s``, or earlier once ``flush_chars`` new
+    characters are waiting. The first chunk renders immediately so the
+    first token shows up without delay; ``finish`` always renders the tail.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[str], object],
+        min_interval_s: float = 0.08,
+        flush_chars: int = 400,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._render = render
+        self._min_interval_s = min_interval_s
+        self._flush_chars = flush_chars
+        self._clock = clock
+        self._text = ""
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._last_render: float | None = None
+        self.chunks = 0
+        self.renders = 0
+
+    @property
+    def text(self) -> str:
+        if self._pending:
+            return self._text + "".join(self._pending)
+        return self._text
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.chunks += 1
+        self._pending.append(chunk)
+        self._pending_chars += len(chunk)
+        now = self._clock()
+        if (
+            self._last_render is None
+            or now - self._last_render >= self._min_interval_s
+            or self._pending_chars >= self._flush_chars
+        ):
+            self._flush(now)
+
+    def finish(self) -> str:
+        if self._pending:
+            self._flush(self._clock())
+        return self._text
+
+    def _flush(self, now: float) -> None:
+        self._text += "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        self._last_render = now
+        self.renders += 1
+        self._render(self._text)